@@ -1,24 +1,37 @@
 # backend/app/api/admin_routes.py
 from datetime import datetime
-from typing import List, Dict
+from typing import List, Dict, Literal
 
-from fastapi import APIRouter, Depends, HTTPException
+from bson import ObjectId
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from pydantic import BaseModel, HttpUrl
+from pymongo import ReturnDocument
 
-from app.api.auth_routes import get_current_admin, CurrentUser
+from app.api.auth_routes import get_current_admin, CurrentUser, invalidate_cached_user
 
 from app.api.deps import get_db
-from app.services.pdf_processor import (
-    download_pdf_from_url,
-    extract_text_chunks_with_metadata,
-)
-from app.services.vector_store import (
-    get_sentence_model,
-    embed_chunks_and_build_faiss_index,
-)
+from app.services.chunk_store import delete_policy_chunks
+from app.services.index_store import evict_policy_index, delete_policy_index, resident_indexes
+from app.services.ingestion import cancel_jobs, create_job, enqueue_job, get_job
+from app.services.answer_cache import answer_cache
+from app.services.global_index import GLOBAL_POLICY_PROJECTION, global_index
+from app.services import analytics_service
+from app.services.query_log_writer import query_log_writer
+from app.models.analytics import Granularity, TopQuestion, TrendPoint
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
+# everything PolicyOut needs and nothing else (never chunk payloads)
+POLICY_OUT_PROJECTION = {
+    "insurance_type": 1,
+    "policy_name": 1,
+    "policy_year": 1,
+    "document_url": 1,
+    "published": 1,
+    "ingest_status": 1,
+    "ingest_job_id": 1,
+}
+
 
 class PolicyCreate(BaseModel):
     insurance_type: str  # "Health", "Motor", "Travel"
@@ -35,25 +48,33 @@ class PolicyOut(BaseModel):
     policy_year: str
     document_url: HttpUrl
     published: bool
+    ingest_status: str = "ready"
+    job_id: str | None = None
 
 
-@router.post("/policies", response_model=PolicyOut)
+def _policy_oid(policy_id: str) -> ObjectId:
+    try:
+        return ObjectId(policy_id)
+    except Exception:
+        raise HTTPException(status_code=404, detail="Policy not found")
+
+
+@router.post("/policies", response_model=PolicyOut, status_code=202)
 def create_policy(payload: PolicyCreate, db=Depends(get_db)):
     existing = db.policies.find_one(
         {
             "insurance_type": payload.insurance_type,
             "policy_name": payload.policy_name,
             "policy_year": payload.policy_year,
-        }
+        },
+        {"_id": 1, "ingest_status": 1},
     )
     if existing:
-        raise HTTPException(status_code=400, detail="Policy version already exists")
-
-    pdf_file = download_pdf_from_url(str(payload.document_url))
-    chunks = extract_text_chunks_with_metadata(str(payload.document_url), pdf_file)
-
-    model = get_sentence_model()
-    embeddings, index = embed_chunks_and_build_faiss_index(chunks, model)
+        if existing.get("ingest_status") != "failed":
+            raise HTTPException(status_code=400, detail="Policy version already exists")
+        # a failed ingestion may be retried by uploading again
+        db.policies.delete_one({"_id": existing["_id"]})
+        delete_policy_chunks(db, str(existing["_id"]))
 
     now = datetime.utcnow()
     doc = {
@@ -62,12 +83,18 @@ def create_policy(payload: PolicyCreate, db=Depends(get_db)):
         "policy_year": payload.policy_year,
         "document_url": str(payload.document_url),
         "published": payload.publish,
-        "chunks": chunks,
+        # not queryable until the ingestion job has persisted its index
+        "index_ready": False,
+        "ingest_status": "queued",
         "created_at": now,
         "updated_at": now,
     }
     result = db.policies.insert_one(doc)
 
+    job_id = create_job(db, result.inserted_id, str(payload.document_url))
+    db.policies.update_one({"_id": result.inserted_id}, {"$set": {"ingest_job_id": job_id}})
+    enqueue_job(db, job_id)
+
     return PolicyOut(
         id=str(result.inserted_id),
         insurance_type=payload.insurance_type,
@@ -75,6 +102,45 @@ def create_policy(payload: PolicyCreate, db=Depends(get_db)):
         policy_year=payload.policy_year,
         document_url=payload.document_url,
         published=payload.publish,
+        ingest_status="queued",
+        job_id=job_id,
+    )
+
+
+class JobStageOut(BaseModel):
+    status: str
+    progress: float
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+    bytes: int | None = None
+    pages: int | None = None
+    chunks: int | None = None
+
+
+class JobOut(BaseModel):
+    id: str
+    policy_id: str
+    status: str
+    stages: Dict[str, JobStageOut]
+    error: str | None = None
+    created_at: datetime
+    updated_at: datetime
+
+
+@router.get("/jobs/{job_id}", response_model=JobOut)
+def get_ingest_job(job_id: str, db=Depends(get_db)):
+    job = get_job(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return JobOut(
+        id=str(job["_id"]),
+        policy_id=job["policy_id"],
+        status=job["status"],
+        stages={name: JobStageOut(**stage) for name, stage in job["stages"].items()},
+        error=job.get("error"),
+        created_at=job["created_at"],
+        updated_at=job["updated_at"],
     )
 
 
@@ -85,13 +151,19 @@ class PublishUpdate(BaseModel):
 @router.patch("/policies/{policy_id}", response_model=PolicyOut)
 def update_publish_status(policy_id: str, body: PublishUpdate, db=Depends(get_db)):
     res = db.policies.find_one_and_update(
-        {"_id": policy_id},
+        {"_id": _policy_oid(policy_id)},
         {"$set": {"published": body.published, "updated_at": datetime.utcnow()}},
+        projection={**POLICY_OUT_PROJECTION, **GLOBAL_POLICY_PROJECTION},
         return_document=True,
     )
     if not res:
         raise HTTPException(status_code=404, detail="Policy not found")
 
+    # drop the resident copy; the next query re-reads the bundle from INDEX_DIR
+    evict_policy_index(policy_id)
+    # add to / remove from the cross-policy index right away (other workers catch up on sync)
+    global_index.apply_policy(res)
+
     return PolicyOut(
         id=str(res["_id"]),
         insurance_type=res["insurance_type"],
@@ -99,15 +171,33 @@ def update_publish_status(policy_id: str, body: PublishUpdate, db=Depends(get_db
         policy_year=res["policy_year"],
         document_url=res["document_url"],
         published=res["published"],
+        ingest_status=res.get("ingest_status", "ready"),
+        job_id=res.get("ingest_job_id"),
     )
 
 
 @router.get("/policies", response_model=List[PolicyOut])
-def list_policies(published: bool | None = None, db=Depends(get_db)):
+def list_policies(
+    response: Response,
+    published: bool | None = None,
+    cursor: str | None = None,
+    limit: int = Query(100, ge=1, le=500),
+    db=Depends(get_db),
+):
+    # keyset pagination on _id; the next page's cursor is returned in X-Next-Cursor
     query = {}
     if published is not None:
         query["published"] = published
-    docs = list(db.policies.find(query))
+    if cursor:
+        try:
+            query["_id"] = {"$gt": ObjectId(cursor)}
+        except Exception:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    docs = list(db.policies.find(query, POLICY_OUT_PROJECTION).sort("_id", 1).limit(limit))
+    if len(docs) == limit:
+        response.headers["X-Next-Cursor"] = str(docs[-1]["_id"])
+
     return [
         PolicyOut(
             id=str(d["_id"]),
@@ -116,23 +206,125 @@ def list_policies(published: bool | None = None, db=Depends(get_db)):
             policy_year=d["policy_year"],
             document_url=d["document_url"],
             published=d["published"],
+            ingest_status=d.get("ingest_status", "ready"),
+            job_id=d.get("ingest_job_id"),
         )
         for d in docs
     ]
 
 
+@router.delete("/policies/{policy_id}")
+def delete_policy(policy_id: str, db=Depends(get_db)):
+    res = db.policies.delete_one({"_id": _policy_oid(policy_id)})
+    if res.deleted_count == 0:
+        raise HTTPException(status_code=404, detail="Policy not found")
+
+    # a job still in flight cleans up after itself once it sees the policy is gone
+    cancel_jobs(db, policy_id)
+    delete_policy_chunks(db, policy_id)
+    delete_policy_index(policy_id)
+    answer_cache.invalidate(policy_id)
+    global_index.remove_policy(policy_id)
+    return {"status": "deleted"}
+
+
+@router.get("/global-index")
+def global_index_stats() -> Dict:
+    return global_index.stats()
+
+
+@router.get("/index-cache")
+def index_cache_stats() -> Dict:
+    return resident_indexes.stats()
+
+
+# --------- User management (drops cached token lookups on change) ---------
+
+class RoleUpdate(BaseModel):
+    role: Literal["user", "admin"]
+
+
+def _user_oid(user_id: str) -> ObjectId:
+    try:
+        return ObjectId(user_id)
+    except Exception:
+        raise HTTPException(status_code=404, detail="User not found")
+
+
+@router.patch("/users/{user_id}/role", response_model=CurrentUser)
+def update_user_role(
+    user_id: str,
+    body: RoleUpdate,
+    db=Depends(get_db),
+    current_admin: CurrentUser = Depends(get_current_admin),
+):
+    res = db.users.find_one_and_update(
+        {"_id": _user_oid(user_id)},
+        {"$set": {"role": body.role}},
+        projection={"email": 1, "role": 1},
+        return_document=ReturnDocument.AFTER,
+    )
+    if not res:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    invalidate_cached_user(user_id)
+    return CurrentUser(id=str(res["_id"]), email=res["email"], role=res["role"])
+
+
+@router.delete("/users/{user_id}")
+def delete_user(
+    user_id: str,
+    db=Depends(get_db),
+    current_admin: CurrentUser = Depends(get_current_admin),
+):
+    res = db.users.delete_one({"_id": _user_oid(user_id)})
+    if res.deleted_count == 0:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    invalidate_cached_user(user_id)
+    return {"status": "deleted"}
+
+
 # --------- Analytics endpoints (top questions & recent queries) ---------
 
 
-@router.get("/analytics/top-questions")
-def top_questions(limit: int = 10, db=Depends(get_db)) -> List[Dict]:
-    pipeline = [
-        {"$group": {"_id": "$question", "count": {"$sum": 1}}},
-        {"$sort": {"count": -1}},
-        {"$limit": limit},
-    ]
-    results = list(db.queries.aggregate(pipeline))
-    return [{"question": r["_id"], "count": r["count"]} for r in results]
+@router.get("/analytics/top-questions", response_model=List[TopQuestion])
+def top_questions(
+    limit: int = 10,
+    days: int | None = Query(None, ge=1),
+    policy_id: str | None = None,
+    db=Depends(get_db),
+):
+    # served from the pre-aggregated rollups, never the raw query log
+    return analytics_service.top_questions(
+        db, limit=limit, since=analytics_service.window_start(days=days), policy_id=policy_id
+    )
+
+
+@router.get("/analytics/trend", response_model=List[TrendPoint])
+def query_trend(
+    granularity: Granularity = "day",
+    days: int = Query(7, ge=1, le=366),
+    policy_id: str | None = None,
+    db=Depends(get_db),
+):
+    return analytics_service.query_trend(
+        db,
+        granularity=granularity,
+        since=analytics_service.window_start(days=days),
+        policy_id=policy_id,
+    )
+
+
+@router.post("/analytics/rebuild")
+def rebuild_analytics(db=Depends(get_db)):
+    processed = analytics_service.rebuild_rollups(db)
+    return {"status": "ok", "processed": processed}
+
+
+@router.get("/analytics/log-writer")
+def log_writer_stats() -> Dict[str, int]:
+    return query_log_writer.stats()
 
 
 @router.get("/analytics/recent")
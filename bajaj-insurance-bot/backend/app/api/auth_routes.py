@@ -2,13 +2,22 @@ from datetime import datetime, timedelta, timezone
 from typing import Optional
 
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from pydantic import BaseModel, EmailStr
 
 from bson import ObjectId
 from app.api.deps import get_db
+from app.core.metrics import CACHE_LOOKUPS
+from app.core.tracing import span
+from app.services.auth_cache import user_cache
+from app.services.password_pool import (
+    PasswordPoolBusy,
+    hash_password,
+    hash_password_async,
+    verify_password_async,
+)
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
@@ -17,7 +26,6 @@ SECRET_KEY = "CHANGE_ME_TO_RANDOM_HEX"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
 
@@ -37,21 +45,19 @@ class Token(BaseModel):
     token_type: str
 
 
-def verify_password(plain, hashed):
-    return pwd_context.verify(plain, hashed)
-
-
-def hash_password(pw: str):
-    # optional safety for bcrypt 72‑byte limit
-    if len(pw) > 72:
-        pw = pw[:72]
-    return pwd_context.hash(pw)
+def _password_pool_busy(e: PasswordPoolBusy) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many login attempts in progress, retry shortly",
+        headers={"Retry-After": str(e.retry_after)},
+    )
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
-    expire = datetime.now(timezone.utc) + (expires_delta or timedelta(minutes=15))
-    to_encode.update({"exp": expire})
+    now = datetime.now(timezone.utc)
+    expire = now + (expires_delta or timedelta(minutes=15))
+    to_encode.update({"exp": expire, "iat": now})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
@@ -60,30 +66,39 @@ def get_user_by_email(db, email: str):
 
 
 @router.post("/register", response_model=UserOut)
-def register_user(payload: UserCreate, db=Depends(get_db)):
-    existing = get_user_by_email(db, payload.email)
+async def register_user(payload: UserCreate, db=Depends(get_db)):
+    existing = await run_in_threadpool(get_user_by_email, db, payload.email)
     if existing:
         raise HTTPException(status_code=400, detail="Email already registered")
 
+    try:
+        password_hash = await hash_password_async(payload.password)
+    except PasswordPoolBusy as e:
+        raise _password_pool_busy(e)
+
     doc = {
         "email": payload.email,
-        "password_hash": hash_password(payload.password),
+        "password_hash": password_hash,
         "role": "user",  # ALWAYS normal user
         "created_at": datetime.utcnow(),
     }
-    res = db.users.insert_one(doc)
+    res = await run_in_threadpool(db.users.insert_one, doc)
 
     return UserOut(id=str(res.inserted_id), email=payload.email, role="user")
 
 
 @router.post("/login", response_model=Token)
-def login(
+async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
     db=Depends(get_db),
 ):
     # form_data.username carries email in our case
-    user = get_user_by_email(db, form_data.username)
-    if not user or not verify_password(form_data.password, user["password_hash"]):
+    user = await run_in_threadpool(get_user_by_email, db, form_data.username)
+    try:
+        valid = bool(user) and await verify_password_async(form_data.password, user["password_hash"])
+    except PasswordPoolBusy as e:
+        raise _password_pool_busy(e)
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -144,16 +159,32 @@ def get_current_user(
     except JWTError:
         raise cred_exc
 
+    # signature/expiry are checked above on every call; only the users lookup is cached
+    cache_key = (user_id, payload.get("iat"))
+    cached = user_cache.get(cache_key)
+    CACHE_LOOKUPS.inc(cache="auth", result="hit" if cached is not None else "miss")
+    if cached is not None:
+        return cached
+
     try:
         oid = ObjectId(user_id)
     except Exception:
         raise cred_exc
 
-    user = db.users.find_one({"_id": oid})
+    with span("mongo"):
+        user = db.users.find_one({"_id": oid}, {"email": 1, "role": 1})
     if not user:
         raise cred_exc
 
-    return CurrentUser(id=str(user["_id"]), email=user["email"], role=user["role"])
+    current_user = CurrentUser(id=str(user["_id"]), email=user["email"], role=user["role"])
+    user_cache.put(cache_key, current_user)
+    return current_user
+
+
+def invalidate_cached_user(user_id: str) -> None:
+    # call after changing a user's role or deleting them
+    user_cache.invalidate_user(str(user_id))
+
 
 @router.get("/me", response_model=CurrentUser)
 def read_me(current_user: CurrentUser = Depends(get_current_user)):
@@ -1,14 +1,19 @@
 from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel, HttpUrl
 from typing import List
-import asyncio
-import re
 
-from sentence_transformers import SentenceTransformer
-
-from app.services.pdf_processor import download_pdf_from_url, extract_text_chunks_with_metadata
-from app.services.vector_store import embed_chunks_and_build_faiss_index, retrieve_top_k_faiss
-from app.services.qa_engine import query_groq, build_context_from_chunks
+from app.services.pdf_processor import extract_text_chunks_with_metadata
+from app.services.document_cache import get_or_build_document
+from app.services.vector_store import (
+    get_sentence_model,
+    embed_chunks_and_build_faiss_index,
+    retrieve_top_k_faiss_batch,
+)
+from app.services.qa_engine import query_groq_many
+from app.services.context_packer import PackedContext, pack_context
+from app.core.logger import logger
+from app.services.llm_dispatcher import LLMError
 
 router = APIRouter(tags=["bajaj-model"])
 
@@ -22,41 +27,40 @@ class RAGResponse(BaseModel):
     answers: List[str]
 
 
-@router.post("/bajaj-model", response_model=RAGResponse)
-async def bajaj_model_endpoint(request_data: RAGRequest):
-    try:
-        # 1) Download PDF
-        pdf_file = download_pdf_from_url(str(request_data.documents))
+def _prepare_contexts(document_url: str, questions: List[str]) -> List[PackedContext]:
+    # blocking part (download, parse, embed, search, mmap/disk loads); runs in the threadpool
+    model = get_sentence_model()
 
-        # 2) Build chunks and FAISS index (for now per request)
-        model = SentenceTransformer("all-MiniLM-L6-v2")
-        chunks = extract_text_chunks_with_metadata(str(request_data.documents), pdf_file)
-        _, index = embed_chunks_and_build_faiss_index(chunks, model)
+    # 1) Download (conditional GET) + 2) chunks and FAISS index, reused across requests
+    def build(pdf_file):
+        chunks = extract_text_chunks_with_metadata(document_url, pdf_file)
+        embeddings, index = embed_chunks_and_build_faiss_index(chunks, model)
+        return chunks, embeddings, index
 
-        plain_answers: List[str] = []
+    doc = get_or_build_document(document_url, build)
 
-        for question in request_data.questions:
-            while True:
-                try:
-                    top_chunks = retrieve_top_k_faiss(question, chunks, index, model, top_k=5)
-                    context = build_context_from_chunks(top_chunks)
+    # dense + BM25 (exact clause numbers, codes, defined terms) fused by rank
+    retrieved = retrieve_top_k_faiss_batch(
+        questions, doc.chunks, doc.index, model, top_k=5, lexical=doc.lexical, embeddings=doc.embeddings
+    )
+    return [pack_context(top_chunks) for top_chunks in retrieved]
 
-                    answer = await query_groq(question, context)
-                    clean_answer = answer.strip()
-                    plain_answers.append(clean_answer)
-                    break
 
-                except Exception as e:
-                    error_message = str(e)
-                    if "rate_limit_exceeded" in error_message:
-                        match = re.search(r"try again in ([0-9.]+)s", error_message)
-                        if match:
-                            delay = float(match.group(1)) + 0.5
-                            await asyncio.sleep(delay)
-                        else:
-                            await asyncio.sleep(3)
-                    else:
-                        raise HTTPException(status_code=500, detail=f"Groq API error: {error_message}")
+@router.post("/bajaj-model", response_model=RAGResponse)
+async def bajaj_model_endpoint(request_data: RAGRequest):
+    try:
+        document_url = str(request_data.documents)
+        packed = await run_in_threadpool(_prepare_contexts, document_url, request_data.questions)
+        logger.info(
+            "Packed %d contexts: %d tokens (%d saved)",
+            len(packed),
+            sum(p.tokens for p in packed),
+            sum(p.tokens_saved for p in packed),
+        )
+        try:
+            plain_answers = await query_groq_many(request_data.questions, [p.text for p in packed])
+        except LLMError as e:
+            raise HTTPException(status_code=500, detail=f"Groq API error: {e}")
 
         return RAGResponse(answers=plain_answers)
 
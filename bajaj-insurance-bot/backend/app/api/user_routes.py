@@ -1,20 +1,50 @@
-from typing import List
-from datetime import datetime
 import asyncio
+import json
+from contextlib import aclosing
+from typing import Dict, List
+from datetime import datetime
 
 from fastapi import APIRouter, Depends, HTTPException
-from pydantic import BaseModel
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
 
 from app.api.deps import get_db
+from app.core.logger import logger
+from app.core.metrics import CACHE_LOOKUPS
+from app.core.tracing import span
 from app.services.vector_store import (
     get_sentence_model,
     embed_chunks_and_build_faiss_index,
-    retrieve_top_k_faiss,
+    encode_queries,
+    hybrid_search,
+)
+from app.services.chunk_store import load_chunks_by_id, load_policy_chunks
+from app.services.index_store import (
+    load_policy_index,
+    load_policy_lexical,
+    new_index_version,
+    save_policy_index,
+    save_policy_lexical,
 )
-from app.services.qa_engine import query_groq, build_context_from_chunks
+from app.services.lexical_index import BM25Index
+from app.services.qa_engine import query_groq, query_groq_many, stream_groq
+from app.services.context_packer import PackedContext, pack_context, relabel
+from app.services.global_index import GlobalIndexNotReady, global_index
+from app.services.llm_dispatcher import LLMError
+from app.services.answer_cache import answer_cache
+from app.services.query_log_writer import query_log_writer
 
 router = APIRouter(prefix="/user", tags=["user"])
 
+POLICY_QUERY_PROJECTION = {
+    "insurance_type": 1,
+    "policy_name": 1,
+    "policy_year": 1,
+    "index_version": 1,
+    "updated_at": 1,
+}
+
 
 class UserQuery(BaseModel):
     insurance_type: str
@@ -27,65 +57,306 @@ class UserQueryResponse(BaseModel):
     answers: List[str]
 
 
-@router.post("/query", response_model=UserQueryResponse)
-async def query_policy(payload: UserQuery, db=Depends(get_db)):
-    policy = db.policies.find_one(
-        {
-            "insurance_type": payload.insurance_type,
-            "policy_name": payload.policy_name,
-            "policy_year": payload.policy_year,
-            "published": True,
-        }
-    )
-    if not policy:
-        raise HTTPException(status_code=404, detail="Policy not found or unpublished")
+def _get_policy_index(db, policy, model):
+    # -> (mmapped embeddings, faiss index, BM25 index)
+    policy_id = str(policy["_id"])
+    version = policy.get("index_version")
+    if version:
+        stored = load_policy_index(policy_id, version)
+        if stored is not None:
+            lexical = load_policy_lexical(policy_id, version)
+            if lexical is None:
+                # bundle written before lexical indexes existed
+                lexical = BM25Index.build(c["content"] for c in load_policy_chunks(db, policy_id))
+                save_policy_lexical(policy_id, version, lexical)
+            return stored[0], stored[1], lexical
 
-    chunks = policy.get("chunks")
+    # policy ingested before the index store existed, or this node lacks the bundle
+    # (another pod's disk, wiped volume): rebuild locally under the version Mongo has
+    chunks = load_policy_chunks(db, policy_id)
     if not chunks:
         raise HTTPException(status_code=500, detail="Policy chunks missing")
+    embeddings, index = embed_chunks_and_build_faiss_index(chunks, model)
+    lexical = BM25Index.build(c["content"] for c in chunks)
+    if not version:
+        # only the first backfill stores a version; a concurrent one adopts it
+        version = new_index_version()
+        res = db.policies.update_one(
+            {"_id": policy["_id"], "index_version": None},
+            {"$set": {"index_version": version}},
+        )
+        if res.matched_count == 0:
+            current = db.policies.find_one({"_id": policy["_id"]}, {"index_version": 1})
+            version = (current or {}).get("index_version") or version
+    save_policy_index(policy_id, embeddings, index, version, lexical)
+    return embeddings, index, lexical
+
+
+def _retrieve(db, policy_id: str, stored, questions, query_embeddings, top_k: int = 5):
+    # index row i is chunk_id i; only the hit chunks are fetched from policy_chunks
+    embeddings, index, lexical = stored
+    hits = hybrid_search(questions, query_embeddings, index, lexical, top_k, embeddings)
+    by_id = load_chunks_by_id(db, policy_id, {i for row in hits for i, _ in row})
+    return [[{**by_id[i], "score": score} for i, score in row if i in by_id] for row in hits]
+
+
+def _find_policy(db, payload: UserQuery):
+    with span("mongo"):
+        policy = db.policies.find_one(
+            {
+                "insurance_type": payload.insurance_type,
+                "policy_name": payload.policy_name,
+                "policy_year": payload.policy_year,
+                "published": True,
+                # policies still being ingested have no index yet
+                "index_ready": {"$ne": False},
+            },
+            POLICY_QUERY_PROJECTION,
+        )
+    if not policy:
+        raise HTTPException(status_code=404, detail="Policy not found or unpublished")
+    return policy
+
 
+def _prepare(db, policy, questions: List[str]):
+    # -> (query embeddings, answers with cache hits filled in, {question index: retrieved chunks})
     model = get_sentence_model()
-    _, index = embed_chunks_and_build_faiss_index(chunks, model)
+    query_embeddings = encode_queries(questions, model)
 
-    answers: List[str] = []
+    # near-duplicate questions against an unchanged policy skip retrieval and the LLM
+    policy_id = str(policy["_id"])
+    answers = answer_cache.lookup(policy_id, str(policy.get("updated_at")), query_embeddings)
+    misses = [i for i, a in enumerate(answers) if a is None]
+    CACHE_LOOKUPS.inc(len(answers) - len(misses), cache="answer", result="hit")
+    CACHE_LOOKUPS.inc(len(misses), cache="answer", result="miss")
+    if not misses:
+        return query_embeddings, answers, {}
 
-    for question in payload.questions:
-        while True:
-            try:
-                top_chunks = retrieve_top_k_faiss(
-                    question, chunks, index, model, top_k=5
-                )
-                context = build_context_from_chunks(top_chunks)
-                answer = await query_groq(question, context)
-                answers.append(answer.strip())
-                break
-            except Exception as e:
-                msg = str(e)
-                if "rate_limit_exceeded" in msg:
-                    await asyncio.sleep(3)
-                else:
-                    raise HTTPException(
-                        status_code=500, detail=f"Groq error: {msg}"
-                    )
-
-    # ---- Logging block: log each question/answer pair ----
-    logs = []
-    for q, a in zip(payload.questions, answers):
-        logs.append(
+    retrieved = _retrieve(
+        db,
+        policy_id,
+        _get_policy_index(db, policy, model),
+        [questions[i] for i in misses],
+        query_embeddings[misses],
+        top_k=5,
+    )
+    return query_embeddings, answers, dict(zip(misses, retrieved))
+
+
+def _remember(policy, questions, query_embeddings, answers, retrieved, packed) -> None:
+    # cache fresh answers and queue a log record per answered question
+    policy_id = str(policy["_id"])
+    fresh = [i for i in retrieved if answers[i] is not None]
+    if fresh:
+        answer_cache.store(
+            policy_id,
+            str(policy.get("updated_at")),
+            query_embeddings[fresh],
+            [answers[i] for i in fresh],
+        )
+
+    # ---- Logging block: queued for the background writer, off the request path ----
+    now = datetime.utcnow()
+    records = []
+    for i, (q, a) in enumerate(zip(questions, answers)):
+        if a is None:
+            continue
+        top_chunks = retrieved.get(i)
+        ctx = packed.get(i)
+        records.append(
             {
-                "policy_id": str(policy["_id"]),
+                "policy_id": policy_id,
                 "insurance_type": policy["insurance_type"],
                 "policy_name": policy["policy_name"],
                 "policy_year": policy["policy_year"],
                 "question": q,
                 "answer": a,
-                "similarity": None,  # later: store FAISS similarity
-                "created_at": datetime.utcnow(),
+                # best FAISS score; None when served from the answer cache
+                "similarity": top_chunks[0]["score"] if top_chunks else None,
+                "context_tokens": ctx.tokens if ctx else None,
+                "context_tokens_saved": ctx.tokens_saved if ctx else None,
+                "created_at": now,
             }
         )
-
-    if logs:
-        db.queries.insert_many(logs)
+    query_log_writer.submit(records)
     # ------------------------------------------------------
 
+
+@router.post("/query", response_model=UserQueryResponse)
+async def query_policy(payload: UserQuery, db=Depends(get_db)):
+    policy = _find_policy(db, payload)
+    query_embeddings, answers, retrieved = _prepare(db, policy, payload.questions)
+
+    packed: Dict[int, PackedContext] = {i: pack_context(chunks) for i, chunks in retrieved.items()}
+    if retrieved:
+        misses = list(retrieved)
+        try:
+            fresh = await query_groq_many(
+                [payload.questions[i] for i in misses],
+                [packed[i].text for i in misses],
+            )
+        except LLMError as e:
+            raise HTTPException(status_code=500, detail=f"Groq error: {e}")
+        for i, answer in zip(misses, fresh):
+            answers[i] = answer
+
+    _remember(policy, payload.questions, query_embeddings, answers, retrieved, packed)
     return UserQueryResponse(answers=answers)
+
+
+def _sse(event: str, data: Dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _scores(chunks: List[Dict]) -> List[Dict]:
+    return [
+        {"chunk_id": c.get("chunk_id"), "page": c.get("page"), "score": round(float(c["score"]), 4)}
+        for c in chunks
+    ]
+
+
+@router.post("/query/stream")
+async def query_policy_stream(payload: UserQuery, deltas: bool = False, db=Depends(get_db)):
+    # SSE: one "answer" (or "error") event per question as soon as it is ready, then "done";
+    # with ?deltas=true, "delta" events carry the LLM's tokens as they arrive
+    policy = _find_policy(db, payload)
+    query_embeddings, answers, retrieved = _prepare(db, policy, payload.questions)
+    packed: Dict[int, PackedContext] = {i: pack_context(chunks) for i, chunks in retrieved.items()}
+
+    async def answer_one(i: int, events: asyncio.Queue) -> None:
+        question, context = payload.questions[i], packed[i].text
+        try:
+            if deltas:
+                parts = []
+                async with aclosing(stream_groq(question, context)) as stream:
+                    async for delta in stream:
+                        parts.append(delta)
+                        await events.put(("delta", {"index": i, "delta": delta}))
+                answer = "".join(parts).strip()
+            else:
+                answer = await query_groq(question, context)
+            event = ("answer", {"index": i, "answer": answer, "cached": False, "scores": _scores(retrieved[i])})
+        except LLMError as e:
+            await events.put(("error", {"index": i, "detail": f"Groq error: {e}"}))
+            return
+        except Exception as e:
+            # every task must put a final event, or event_stream waits for it forever
+            logger.exception("Streaming answer %d failed", i)
+            await events.put(("error", {"index": i, "detail": f"Server error: {e}"}))
+            return
+        answers[i] = answer
+        await events.put(event)
+
+    async def event_stream():
+        events: asyncio.Queue = asyncio.Queue()
+        tasks = [asyncio.ensure_future(answer_one(i, events)) for i in retrieved]
+        try:
+            for i in range(len(answers)):
+                if i not in retrieved:
+                    yield _sse("answer", {"index": i, "answer": answers[i], "cached": True, "scores": []})
+
+            remaining = len(tasks)
+            while remaining:
+                event, data = await events.get()
+                if event != "delta":
+                    remaining -= 1
+                yield _sse(event, data)
+            yield _sse("done", {"answered": sum(a is not None for a in answers)})
+        finally:
+            # client went away (or we are done): stop any LLM calls still in flight
+            for task in tasks:
+                task.cancel()
+            _remember(policy, payload.questions, query_embeddings, answers, retrieved, packed)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# ---------- policy-agnostic questions over the global index ----------
+
+class GlobalQuery(BaseModel):
+    questions: List[str]
+    insurance_type: str | None = None
+    policy_year: str | None = None
+    top_k: int = Field(5, ge=1, le=20)
+
+
+class PolicyEvidence(BaseModel):
+    policy_id: str
+    insurance_type: str
+    policy_name: str
+    policy_year: str
+    score: float
+
+
+class GlobalAnswer(BaseModel):
+    answer: str
+    policies: List[PolicyEvidence]
+
+
+class GlobalQueryResponse(BaseModel):
+    answers: List[GlobalAnswer]
+
+
+def _search_global(db, payload: GlobalQuery):
+    # blocking part in the threadpool: search waits on the index lock while a sync
+    # loads bundles or retrains, and the chunk reads are Mongo round trips
+    global_index.sync(db)
+    query_embeddings = encode_queries(payload.questions, get_sentence_model())
+    hits = global_index.search(
+        query_embeddings,
+        payload.top_k,
+        insurance_type=payload.insurance_type,
+        policy_year=payload.policy_year,
+    )
+
+    wanted: Dict[str, set] = {}
+    for row in hits:
+        for hit in row:
+            wanted.setdefault(hit.policy_id, set()).add(hit.chunk_id)
+    chunks = {pid: load_chunks_by_id(db, pid, ids) for pid, ids in wanted.items()}
+    return hits, chunks
+
+
+@router.post("/query/global", response_model=GlobalQueryResponse)
+async def query_all_policies(payload: GlobalQuery, db=Depends(get_db)):
+    # one ANN search per insurance_type shard instead of one flat search per policy
+    try:
+        hits, chunks = await run_in_threadpool(_search_global, db, payload)
+    except GlobalIndexNotReady as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    contexts: List[str] = []
+    evidence: List[List[PolicyEvidence]] = []
+    for row in hits:
+        top_chunks: List[Dict] = []
+        best: Dict[str, PolicyEvidence] = {}
+        for hit in row:
+            chunk = chunks.get(hit.policy_id, {}).get(hit.chunk_id)
+            policy = global_index.policy(hit.policy_id)
+            if chunk is None or policy is None:
+                continue  # deleted since the index last synced
+            label = f"{policy.policy_name} {policy.policy_year} ({policy.insurance_type})"
+            top_chunks.append({**chunk, "content": relabel(chunk["content"], label), "score": hit.score})
+            if hit.policy_id not in best:
+                best[hit.policy_id] = PolicyEvidence(
+                    policy_id=hit.policy_id,
+                    insurance_type=policy.insurance_type,
+                    policy_name=policy.policy_name,
+                    policy_year=policy.policy_year,
+                    score=hit.score,
+                )
+        contexts.append(pack_context(top_chunks).text)
+        evidence.append(list(best.values()))
+
+    try:
+        answers = await query_groq_many(payload.questions, contexts)
+    except LLMError as e:
+        raise HTTPException(status_code=500, detail=f"Groq error: {e}")
+
+    return GlobalQueryResponse(
+        answers=[GlobalAnswer(answer=a, policies=p) for a, p in zip(answers, evidence)]
+    )
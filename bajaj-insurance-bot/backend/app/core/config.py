@@ -7,8 +7,102 @@ class Settings:
     PROJECT_NAME: str = "Bajaj Insurance RAG"
     MONGO_URI: str = os.getenv("MONGO_URI", "mongodb://localhost:27017")
     DB_NAME: str = os.getenv("DB_NAME", "bajaj_insurance")
-    EMBEDDING_MODEL: str = "sentence-transformers/all-MiniLM-L6-v2"
+    EMBEDDING_MODEL: str = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+    EMBEDDING_DEVICE: str = os.getenv("EMBEDDING_DEVICE", "cpu")
+    # CPU inference backend: torch | onnx | onnx-int8 (dynamically quantized export);
+    # onnx backends are used only if within PARITY_MAX_DRIFT (1 - cosine) of torch
+    EMBEDDING_BACKEND: str = os.getenv("EMBEDDING_BACKEND", "onnx-int8")
+    EMBEDDING_ONNX_FILE: str = os.getenv("EMBEDDING_ONNX_FILE", "")  # default: per backend
+    EMBEDDING_PARITY_MAX_DRIFT: float = float(os.getenv("EMBEDDING_PARITY_MAX_DRIFT", "0.02"))
+    EMBEDDING_THREADS: int = int(os.getenv("EMBEDDING_THREADS", str(os.cpu_count() or 1)))
+    # adaptive batches: rows * longest row (estimated tokens) stays under BATCH_TOKENS
+    EMBEDDING_BATCH_TOKENS: int = int(os.getenv("EMBEDDING_BATCH_TOKENS", "8192"))
+    EMBEDDING_MAX_BATCH: int = int(os.getenv("EMBEDDING_MAX_BATCH", "128"))
     INDEX_DIR: str = os.getenv("INDEX_DIR", "./indices")
+
+    # per-policy faiss indexes: resident LRU budget and size-based quantization
+    # (auto: flat < SQ8_MIN <= int8 scalar quantizer < PQ_MIN <= product quantizer)
+    INDEX_RESIDENT_MAX_BYTES: int = int(os.getenv("INDEX_RESIDENT_MAX_BYTES", str(512 * 1024**2)))
+    INDEX_QUANTIZATION: str = os.getenv("INDEX_QUANTIZATION", "auto")  # auto | flat | sq8 | pq
+    INDEX_SQ8_MIN_VECTORS: int = int(os.getenv("INDEX_SQ8_MIN_VECTORS", "1000"))
+    INDEX_PQ_MIN_VECTORS: int = int(os.getenv("INDEX_PQ_MIN_VECTORS", "20000"))
+    # quantized indexes fetch top_k * factor candidates, re-scored exactly from the mmapped vectors
+    INDEX_RERANK_FACTOR: int = int(os.getenv("INDEX_RERANK_FACTOR", "4"))
+    INDEX_PQ_RERANK_FACTOR: int = int(os.getenv("INDEX_PQ_RERANK_FACTOR", "20"))
+
+    # PDF download
+    PDF_DOWNLOAD_CONNECT_TIMEOUT: float = float(os.getenv("PDF_DOWNLOAD_CONNECT_TIMEOUT", "5"))
+    PDF_DOWNLOAD_READ_TIMEOUT: float = float(os.getenv("PDF_DOWNLOAD_READ_TIMEOUT", "30"))
+    PDF_MAX_BYTES: int = int(os.getenv("PDF_MAX_BYTES", str(100 * 1024**2)))
+    PDF_SPOOL_MAX_MEMORY: int = int(os.getenv("PDF_SPOOL_MAX_MEMORY", str(8 * 1024**2)))
+    PDF_DOWNLOAD_POOL_SIZE: int = int(os.getenv("PDF_DOWNLOAD_POOL_SIZE", "16"))
+
+    # chunking, in embedding-model tokens (0 = the model's whole window, 254 for MiniLM)
+    CHUNK_MAX_TOKENS: int = int(os.getenv("CHUNK_MAX_TOKENS", "0"))
+    CHUNK_OVERLAP_TOKENS: int = int(os.getenv("CHUNK_OVERLAP_TOKENS", "32"))
+
+    # PDF extraction
+    PDF_EXTRACT_WORKERS: int = int(os.getenv("PDF_EXTRACT_WORKERS", str(os.cpu_count() or 1)))
+    PDF_PAGES_PER_TASK: int = int(os.getenv("PDF_PAGES_PER_TASK", "16"))
+    PDF_PARALLEL_MIN_PAGES: int = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "32"))
+
+    # background ingestion of admin uploads
+    INGEST_CONCURRENCY: int = int(os.getenv("INGEST_CONCURRENCY", "2"))
+    INGEST_STALE_SECONDS: int = int(os.getenv("INGEST_STALE_SECONDS", "900"))
+
+    # /bajaj-model document cache
+    DOC_CACHE_DIR: str = os.getenv("DOC_CACHE_DIR", "./doc_cache")
+    DOC_CACHE_MAX_BYTES: int = int(os.getenv("DOC_CACHE_MAX_BYTES", str(2 * 1024**3)))
+    DOC_CACHE_MEMORY_ITEMS: int = int(os.getenv("DOC_CACHE_MEMORY_ITEMS", "16"))
+
+    # hybrid retrieval: dense + BM25 top-N candidates fused with reciprocal rank fusion
+    HYBRID_RETRIEVAL: bool = os.getenv("HYBRID_RETRIEVAL", "true").lower() == "true"
+    HYBRID_CANDIDATES: int = int(os.getenv("HYBRID_CANDIDATES", "20"))
+    HYBRID_RRF_K: int = int(os.getenv("HYBRID_RRF_K", "60"))
+
+    # cross-policy index (one shard per insurance_type; flat until IVF_MIN_VECTORS)
+    GLOBAL_INDEX_IVF_MIN_VECTORS: int = int(os.getenv("GLOBAL_INDEX_IVF_MIN_VECTORS", "20000"))
+    GLOBAL_INDEX_NPROBE: int = int(os.getenv("GLOBAL_INDEX_NPROBE", "16"))
+    GLOBAL_INDEX_SYNC_SECONDS: float = float(os.getenv("GLOBAL_INDEX_SYNC_SECONDS", "5"))
+
+    # LLM context packing (tiktoken encoding; falls back to the embedding tokenizer)
+    CONTEXT_TOKEN_BUDGET: int = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))
+    CONTEXT_TOKENIZER: str = os.getenv("CONTEXT_TOKENIZER", "cl100k_base")
+
+    # semantic answer cache for /user/query
+    ANSWER_CACHE_THRESHOLD: float = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+    ANSWER_CACHE_TTL_SECONDS: float = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "86400"))
+    ANSWER_CACHE_MAX_PER_POLICY: int = int(os.getenv("ANSWER_CACHE_MAX_PER_POLICY", "500"))
+    ANSWER_CACHE_MAX_POLICIES: int = int(os.getenv("ANSWER_CACHE_MAX_POLICIES", "200"))
+
+    # resolved-user cache for bearer tokens (ttl = max staleness of a role change)
+    AUTH_CACHE_TTL_SECONDS: float = float(os.getenv("AUTH_CACHE_TTL_SECONDS", "60"))
+    AUTH_CACHE_MAX_SIZE: int = int(os.getenv("AUTH_CACHE_MAX_SIZE", "10000"))
+
+    # bcrypt runs in its own process pool; beyond MAX_PENDING requests get a 503
+    PASSWORD_POOL_WORKERS: int = int(os.getenv("PASSWORD_POOL_WORKERS", str(min(4, os.cpu_count() or 1))))
+    PASSWORD_POOL_MAX_PENDING: int = int(os.getenv("PASSWORD_POOL_MAX_PENDING", "64"))
+    PASSWORD_POOL_RETRY_AFTER: int = int(os.getenv("PASSWORD_POOL_RETRY_AFTER", "2"))
+
+    # buffered query-log writer
+    QUERY_LOG_QUEUE_SIZE: int = int(os.getenv("QUERY_LOG_QUEUE_SIZE", "10000"))
+    QUERY_LOG_BATCH_SIZE: int = int(os.getenv("QUERY_LOG_BATCH_SIZE", "500"))
+    QUERY_LOG_FLUSH_INTERVAL: float = float(os.getenv("QUERY_LOG_FLUSH_INTERVAL", "1.0"))
+    QUERY_LOG_PUT_TIMEOUT: float = float(os.getenv("QUERY_LOG_PUT_TIMEOUT", "0"))
+
+    # observability: Server-Timing header with per-stage durations on every response
+    SERVER_TIMING: bool = os.getenv("SERVER_TIMING", "false").lower() == "true"
+
+    # Groq / LLM dispatch
+    GROQ_API_KEY: str | None = os.getenv("GROQ_API_KEY")
+    GROQ_API_URL: str = os.getenv("GROQ_API_URL", "https://api.groq.com/openai/v1/chat/completions")
+    GROQ_REQUESTS_PER_MINUTE: float = float(os.getenv("GROQ_REQUESTS_PER_MINUTE", "30"))
+    GROQ_TOKENS_PER_MINUTE: float = float(os.getenv("GROQ_TOKENS_PER_MINUTE", "12000"))
+    GROQ_MAX_CONCURRENCY: int = int(os.getenv("GROQ_MAX_CONCURRENCY", "8"))
+    GROQ_MAX_RETRIES: int = int(os.getenv("GROQ_MAX_RETRIES", "5"))
+    GROQ_BACKOFF_BASE: float = float(os.getenv("GROQ_BACKOFF_BASE", "0.5"))
+    GROQ_BACKOFF_MAX: float = float(os.getenv("GROQ_BACKOFF_MAX", "20"))
+    GROQ_TIMEOUT: float = float(os.getenv("GROQ_TIMEOUT", "30"))
     # Fixed JSON I/O behavior is enforced in api/json_gateway.py
 
 settings = Settings()
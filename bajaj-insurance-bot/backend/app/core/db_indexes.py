@@ -0,0 +1,120 @@
+from typing import Dict, Iterable, List
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+from app.core.logger import logger
+
+# collection -> indexes the hot paths rely on
+INDEXES: Dict[str, List[IndexModel]] = {
+    "policies": [
+        # /user/query lookup and create_policy duplicate check
+        IndexModel(
+            [("insurance_type", ASCENDING), ("policy_name", ASCENDING), ("policy_year", ASCENDING)],
+            name="policy_version_unique",
+            unique=True,
+        ),
+        # /admin/policies?published=... paginated by _id
+        IndexModel([("published", ASCENDING), ("_id", ASCENDING)], name="published_id"),
+        # global index incremental sync
+        IndexModel([("updated_at", ASCENDING)], name="updated_at"),
+    ],
+    "users": [
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+    ],
+    "queries": [
+        # /admin/analytics/recent
+        IndexModel([("created_at", DESCENDING)], name="created_at_desc"),
+        IndexModel([("policy_id", ASCENDING), ("created_at", DESCENDING)], name="policy_created_at"),
+    ],
+    # analytics rollups
+    "question_totals": [
+        IndexModel([("count", DESCENDING)], name="count_desc"),
+    ],
+    "question_rollups_daily": [
+        IndexModel(
+            [("day", ASCENDING), ("policy_id", ASCENDING), ("question_key", ASCENDING)],
+            name="day_policy_question_unique",
+            unique=True,
+        ),
+        IndexModel([("policy_id", ASCENDING), ("day", ASCENDING)], name="policy_day"),
+    ],
+    "query_buckets": [
+        IndexModel(
+            [("granularity", ASCENDING), ("bucket_start", ASCENDING), ("policy_id", ASCENDING)],
+            name="granularity_bucket_policy_unique",
+            unique=True,
+        ),
+    ],
+    "policy_chunks": [
+        IndexModel(
+            [("policy_id", ASCENDING), ("chunk_id", ASCENDING)],
+            name="policy_chunk_unique",
+            unique=True,
+        ),
+    ],
+    "ingest_jobs": [
+        IndexModel([("status", ASCENDING), ("updated_at", ASCENDING)], name="status_updated_at"),
+    ],
+}
+
+# representative hot queries: (collection, filter, sort)
+HOT_QUERIES = [
+    (
+        "policies",
+        {"insurance_type": "", "policy_name": "", "policy_year": "", "published": True},
+        None,
+    ),
+    ("policies", {"published": True}, {"_id": 1}),
+    ("policies", {"updated_at": {"$gte": ""}}, None),
+    ("users", {"email": ""}, None),
+    ("queries", {}, {"created_at": -1}),
+    ("policy_chunks", {"policy_id": "", "chunk_id": {"$in": [0]}}, None),
+    ("ingest_jobs", {"status": "queued"}, None),
+]
+
+
+def ensure_indexes(db) -> None:
+    # create_indexes is a no-op for indexes that already exist with the same spec
+    for collection, indexes in INDEXES.items():
+        try:
+            created = db[collection].create_indexes(indexes)
+            logger.info("Indexes on %s: %s", collection, ", ".join(created))
+        except OperationFailure as e:
+            # e.g. duplicates blocking a unique index, or an index with the same name but other keys
+            logger.warning("Could not create indexes on %s: %s", collection, e)
+
+
+def _plan_stages(plan: Dict) -> Iterable[str]:
+    yield plan.get("stage", "")
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            yield from _plan_stages(plan[key])
+    for child in plan.get("inputStages", []):
+        yield from _plan_stages(child)
+
+
+def check_query_plans(db) -> List[str]:
+    # warn (once, at startup) when a hot query would scan a whole collection
+    scans = []
+    for collection, query_filter, sort in HOT_QUERIES:
+        command = {"find": collection, "filter": query_filter}
+        if sort:
+            command["sort"] = sort
+        try:
+            explain = db.command("explain", command, verbosity="queryPlanner")
+        except Exception as e:
+            # advisory only: never block startup on an explain failure
+            logger.warning("Could not explain query on %s: %s", collection, e)
+            continue
+
+        winning = explain.get("queryPlanner", {}).get("winningPlan", {})
+        if "COLLSCAN" in set(_plan_stages(winning)):
+            scans.append(collection)
+            logger.warning(
+                "Query on %s falls back to a collection scan: filter=%s sort=%s",
+                collection,
+                query_filter,
+                sort,
+            )
+    return scans
@@ -0,0 +1,103 @@
+import contextvars
+import re
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+from app.core.config import settings
+from app.core.logger import logger, request_id_var
+from app.core.metrics import HTTP_DURATION, HTTP_REQUESTS, STAGE_DURATION
+
+# per-request stage totals: stage -> [seconds, calls]; None outside a request
+_stages_var: contextvars.ContextVar[Optional[Dict[str, List[float]]]] = contextvars.ContextVar(
+    "stages", default=None
+)
+_REQUEST_ID = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+
+def observe(stage: str, seconds: float) -> None:
+    # record time spent in a stage: process-wide histogram + this request's Server-Timing
+    STAGE_DURATION.observe(seconds, stage=stage)
+    stages = _stages_var.get()
+    if stages is not None:
+        entry = stages.get(stage)
+        if entry is None:
+            stages[stage] = [seconds, 1]
+        else:
+            entry[0] += seconds
+            entry[1] += 1
+
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(stage, time.perf_counter() - start)
+
+
+def _server_timing(stages: Dict[str, List[float]], total: float) -> str:
+    parts = [
+        f'{stage};dur={seconds * 1000:.1f};desc="{int(calls)}x"' for stage, (seconds, calls) in stages.items()
+    ]
+    parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
+
+
+class TracingMiddleware:
+    # pure ASGI (no BaseHTTPMiddleware task per request): request id, per-route
+    # count/latency, optional Server-Timing header and one access line per request
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        incoming = None
+        for name, value in scope.get("headers", ()):
+            if name == b"x-request-id":
+                incoming = value.decode("latin-1")
+                break
+        request_id = incoming if incoming and _REQUEST_ID.match(incoming) else uuid.uuid4().hex[:16]
+        request_id_token = request_id_var.set(request_id)
+        stages: Dict[str, List[float]] = {}
+        stages_token = _stages_var.set(stages)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", ()))
+                headers.append((b"x-request-id", request_id.encode("latin-1")))
+                if settings.SERVER_TIMING:
+                    # stages finished so far (for streamed responses: up to the first byte)
+                    timing = _server_timing(stages, time.perf_counter() - start)
+                    headers.append((b"server-timing", timing.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            method = scope.get("method", "")
+            HTTP_REQUESTS.inc(method=method, route=route, status=str(status))
+            HTTP_DURATION.observe(elapsed, method=method, route=route)
+            if route != "/metrics":
+                logger.info(
+                    "request method=%s route=%s status=%d ms=%.1f %s",
+                    method,
+                    route,
+                    status,
+                    elapsed * 1000,
+                    " ".join(f"{stage}_ms={seconds * 1000:.1f}" for stage, (seconds, _) in stages.items()),
+                )
+            _stages_var.reset(stages_token)
+            request_id_var.reset(request_id_token)
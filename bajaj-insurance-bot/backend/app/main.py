@@ -68,16 +68,54 @@
 # app.include_router(user_routes.router)
 
 
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
 
 from app.api import json_gateway, admin_routes, user_routes
 from app.api import auth_routes
+from app.services import embedder
+from app.services.llm_dispatcher import close_dispatcher
+from app.services.pdf_processor import shutdown_pdf_pool
+from app.services.password_pool import shutdown_password_pool
+from app.services.ingestion import resume_pending_jobs, shutdown_ingestion
+from app.services.chunk_store import migrate_embedded_chunks
+from app.services.query_log_writer import query_log_writer
+from app.services.global_index import global_index
+from app.api.deps import get_db
+from app.core.db_indexes import check_query_plans, ensure_indexes
+from app.core.metrics import CONTENT_TYPE, CallbackGauge, render_metrics
+from app.core.tracing import TracingMiddleware
+from app.services.index_store import resident_indexes
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await run_in_threadpool(ensure_indexes, get_db())
+    await run_in_threadpool(check_query_plans, get_db())
+    # load + warm the embedding model once per worker, before serving traffic
+    await run_in_threadpool(embedder.warm_up)
+    await run_in_threadpool(migrate_embedded_chunks, get_db())
+    await run_in_threadpool(resume_pending_jobs, get_db())
+    query_log_writer.start()
+    # cross-policy index builds in the background; /user/query/global answers 503 until then
+    global_index.start_background_build(get_db)
+    yield
+    shutdown_ingestion()
+    await run_in_threadpool(query_log_writer.stop)
+    await close_dispatcher()
+    shutdown_pdf_pool()
+    shutdown_password_pool()
+
 
 app = FastAPI(
     title="Bajaj Insurance RAG Backend",
     description="Enterprise-grade insurance document analysis backend for Bajaj.",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -86,9 +124,35 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Request-ID", "Server-Timing"],
 )
+# outermost: request ids and timings cover everything below, CORS included
+app.add_middleware(TracingMiddleware)
 
 app.include_router(auth_routes.router)
 app.include_router(json_gateway.router)
 app.include_router(admin_routes.router)
 app.include_router(user_routes.router)
+
+
+# scrape-time gauges from existing stats
+CallbackGauge("resident_index_bytes", "Bytes of per-policy indexes held in memory",
+              lambda: resident_indexes.stats()["bytes"])
+CallbackGauge("query_log_queue_depth", "Query log records waiting to be written",
+              lambda: query_log_writer.stats()["queued"])
+CallbackGauge("query_log_dropped", "Query log records dropped since start (queue full)",
+              lambda: query_log_writer.stats()["dropped"])
+CallbackGauge("global_index_policies", "Policies searchable through the global index",
+              lambda: global_index.stats()["policies"])
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return Response(render_metrics(), media_type=CONTENT_TYPE)
+
+
+@app.get("/health/ready")
+def readiness():
+    if not embedder.is_ready():
+        return JSONResponse(status_code=503, content={"status": "loading"})
+    return {"status": "ready", "embedding": embedder.backend_info()}
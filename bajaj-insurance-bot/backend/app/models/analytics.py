@@ -0,0 +1,17 @@
+from datetime import datetime
+from typing import Literal
+
+from pydantic import BaseModel
+
+
+Granularity = Literal["hour", "day"]
+
+
+class TopQuestion(BaseModel):
+    question: str
+    count: int
+
+
+class TrendPoint(BaseModel):
+    bucket_start: datetime
+    count: int
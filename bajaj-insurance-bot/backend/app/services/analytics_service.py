@@ -0,0 +1,181 @@
+import hashlib
+import re
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from pymongo import DESCENDING, UpdateOne
+
+from app.core.logger import logger
+from app.models.analytics import Granularity, TopQuestion, TrendPoint
+
+# Rollup collections, all maintained incrementally as queries are logged:
+#   question_totals         one doc per normalized question (all-time count)
+#   question_rollups_daily  one doc per (day, policy, normalized question)
+#   query_buckets           one doc per (granularity, bucket start, policy)
+
+_PUNCT = re.compile(r"[^\w\s]")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_question(question: str) -> str:
+    return _SPACES.sub(" ", _PUNCT.sub(" ", question.lower())).strip()
+
+
+def _question_key(normalized: str) -> str:
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+
+def _bucket_start(ts: datetime, granularity: Granularity) -> datetime:
+    if granularity == "hour":
+        return ts.replace(minute=0, second=0, microsecond=0)
+    return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def record_queries(db, logs: Iterable[Dict]) -> None:
+    # fold a batch of query logs into the rollups: one upsert per distinct key
+    totals: Counter = Counter()
+    daily: Counter = Counter()
+    buckets: Counter = Counter()
+    sample: Dict[str, str] = {}
+    last_seen: Dict[str, datetime] = {}
+
+    for log in logs:
+        normalized = normalize_question(log["question"])
+        if not normalized:
+            continue
+        key = _question_key(normalized)
+        ts = log["created_at"]
+        policy_id = log.get("policy_id")
+
+        sample.setdefault(key, log["question"])
+        last_seen[key] = max(last_seen.get(key, ts), ts)
+        totals[key] += 1
+        daily[(_bucket_start(ts, "day"), policy_id, key)] += 1
+        for granularity in ("hour", "day"):
+            buckets[(granularity, _bucket_start(ts, granularity), policy_id)] += 1
+
+    if not totals:
+        return
+
+    db.question_totals.bulk_write(
+        [
+            UpdateOne(
+                {"_id": key},
+                {
+                    "$inc": {"count": count},
+                    "$max": {"last_seen": last_seen[key]},
+                    "$setOnInsert": {"question": sample[key]},
+                },
+                upsert=True,
+            )
+            for key, count in totals.items()
+        ],
+        ordered=False,
+    )
+    db.question_rollups_daily.bulk_write(
+        [
+            UpdateOne(
+                {"day": day, "policy_id": policy_id, "question_key": key},
+                {"$inc": {"count": count}, "$setOnInsert": {"question": sample[key]}},
+                upsert=True,
+            )
+            for (day, policy_id, key), count in daily.items()
+        ],
+        ordered=False,
+    )
+    db.query_buckets.bulk_write(
+        [
+            UpdateOne(
+                {"granularity": granularity, "bucket_start": start, "policy_id": policy_id},
+                {"$inc": {"count": count}},
+                upsert=True,
+            )
+            for (granularity, start, policy_id), count in buckets.items()
+        ],
+        ordered=False,
+    )
+
+
+def top_questions(
+    db,
+    limit: int = 10,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    policy_id: Optional[str] = None,
+) -> List[TopQuestion]:
+    if since is None and until is None and policy_id is None:
+        docs = db.question_totals.find({}, {"question": 1, "count": 1}).sort("count", DESCENDING).limit(limit)
+        return [TopQuestion(question=d["question"], count=d["count"]) for d in docs]
+
+    # windowed: sum the (small) daily rollups instead of the raw log
+    match: Dict = {}
+    if since is not None or until is not None:
+        match["day"] = {}
+        if since is not None:
+            match["day"]["$gte"] = _bucket_start(since, "day")
+        if until is not None:
+            match["day"]["$lt"] = until
+    if policy_id is not None:
+        match["policy_id"] = policy_id
+
+    pipeline = [
+        {"$match": match},
+        {"$group": {"_id": "$question_key", "question": {"$first": "$question"}, "count": {"$sum": "$count"}}},
+        {"$sort": {"count": -1}},
+        {"$limit": limit},
+    ]
+    return [TopQuestion(question=r["question"], count=r["count"]) for r in db.question_rollups_daily.aggregate(pipeline)]
+
+
+def query_trend(
+    db,
+    granularity: Granularity = "day",
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    policy_id: Optional[str] = None,
+) -> List[TrendPoint]:
+    match: Dict = {"granularity": granularity}
+    if since is not None or until is not None:
+        match["bucket_start"] = {}
+        if since is not None:
+            match["bucket_start"]["$gte"] = _bucket_start(since, granularity)
+        if until is not None:
+            match["bucket_start"]["$lt"] = until
+    if policy_id is not None:
+        match["policy_id"] = policy_id
+
+    pipeline = [
+        {"$match": match},
+        {"$group": {"_id": "$bucket_start", "count": {"$sum": "$count"}}},
+        {"$sort": {"_id": 1}},
+    ]
+    return [TrendPoint(bucket_start=r["_id"], count=r["count"]) for r in db.query_buckets.aggregate(pipeline)]
+
+
+def window_start(days: Optional[int] = None, hours: Optional[int] = None) -> Optional[datetime]:
+    if days is None and hours is None:
+        return None
+    return datetime.utcnow() - timedelta(days=days or 0, hours=hours or 0)
+
+
+def rebuild_rollups(db, batch_size: int = 5000) -> int:
+    # backfill from the raw log, e.g. for queries logged before rollups existed
+    for name in ("question_totals", "question_rollups_daily", "query_buckets"):
+        db[name].delete_many({})
+
+    processed = 0
+    batch: List[Dict] = []
+    projection = {"question": 1, "policy_id": 1, "created_at": 1}
+    for log in db.queries.find({"created_at": {"$ne": None}}, projection):
+        batch.append(log)
+        if len(batch) >= batch_size:
+            record_queries(db, batch)
+            processed += len(batch)
+            batch = []
+    if batch:
+        record_queries(db, batch)
+        processed += len(batch)
+
+    logger.info("Rebuilt analytics rollups from %d query logs", processed)
+    return processed
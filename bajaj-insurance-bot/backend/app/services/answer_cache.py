@@ -0,0 +1,96 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional
+
+import numpy as np
+
+from app.core.config import settings
+
+
+class _PolicyAnswers:
+    def __init__(self, version: str, dim: int):
+        self.version = version
+        self.embeddings = np.zeros((0, dim), dtype="float32")
+        self.answers: List[str] = []
+        self.stored_at: List[float] = []
+
+    def prune(self, ttl: float, max_entries: int) -> None:
+        now = time.monotonic()
+        keep = [i for i, t in enumerate(self.stored_at) if now - t < ttl]
+        keep = keep[-max_entries:]
+        if len(keep) != len(self.answers):
+            self.embeddings = self.embeddings[keep]
+            self.answers = [self.answers[i] for i in keep]
+            self.stored_at = [self.stored_at[i] for i in keep]
+
+
+class SemanticAnswerCache:
+    # per-policy cache of answers keyed by (normalized) question embedding
+    def __init__(self, threshold: float, ttl_seconds: float, max_per_policy: int, max_policies: int):
+        self.threshold = threshold
+        self.ttl = ttl_seconds
+        self.max_per_policy = max_per_policy
+        self.max_policies = max_policies
+        self._lock = threading.Lock()
+        self._policies: "OrderedDict[str, _PolicyAnswers]" = OrderedDict()
+
+    def lookup(self, policy_id: str, version: str, query_embeddings: np.ndarray) -> List[Optional[str]]:
+        misses: List[Optional[str]] = [None] * len(query_embeddings)
+        with self._lock:
+            entry = self._policies.get(policy_id)
+            if entry is None:
+                return misses
+            if entry.version != version:
+                # policy changed since these answers were produced
+                del self._policies[policy_id]
+                return misses
+            self._policies.move_to_end(policy_id)
+            entry.prune(self.ttl, self.max_per_policy)
+            if not entry.answers:
+                return misses
+
+            # embeddings are L2-normalized, so the dot product is the cosine
+            sims = np.asarray(query_embeddings, dtype="float32") @ entry.embeddings.T
+            best = sims.argmax(axis=1)
+            return [
+                entry.answers[j] if sims[i, j] >= self.threshold else None
+                for i, j in enumerate(best)
+            ]
+
+    def store(
+        self,
+        policy_id: str,
+        version: str,
+        query_embeddings: np.ndarray,
+        answers: List[str],
+    ) -> None:
+        if len(answers) == 0:
+            return
+        query_embeddings = np.asarray(query_embeddings, dtype="float32")
+        with self._lock:
+            entry = self._policies.get(policy_id)
+            if entry is None or entry.version != version:
+                entry = _PolicyAnswers(version, query_embeddings.shape[1])
+                self._policies[policy_id] = entry
+            self._policies.move_to_end(policy_id)
+
+            entry.embeddings = np.vstack([entry.embeddings, query_embeddings])
+            entry.answers.extend(answers)
+            entry.stored_at.extend([time.monotonic()] * len(answers))
+            entry.prune(self.ttl, self.max_per_policy)
+
+            while len(self._policies) > self.max_policies:
+                self._policies.popitem(last=False)
+
+    def invalidate(self, policy_id: str) -> None:
+        with self._lock:
+            self._policies.pop(policy_id, None)
+
+
+answer_cache = SemanticAnswerCache(
+    threshold=settings.ANSWER_CACHE_THRESHOLD,
+    ttl_seconds=settings.ANSWER_CACHE_TTL_SECONDS,
+    max_per_policy=settings.ANSWER_CACHE_MAX_PER_POLICY,
+    max_policies=settings.ANSWER_CACHE_MAX_POLICIES,
+)
@@ -0,0 +1,57 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+from app.core.config import settings
+
+
+class ResolvedUserCache:
+    # token (sub, iat) -> resolved user, so authenticated requests skip the users lookup
+    def __init__(self, ttl_seconds: float, max_size: int):
+        self.ttl = ttl_seconds
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()  # key -> (stored_at, user)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        if self.ttl <= 0:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, user = entry
+            if time.monotonic() - stored_at >= self.ttl:
+                # ttl bounds how stale a role can be if an invalidation is missed
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return user
+
+    def put(self, key: Hashable, user: Any) -> None:
+        if self.ttl <= 0 or self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic(), user)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate_user(self, user_id: str) -> int:
+        # drops every cached token of this user (keys are (sub, iat))
+        with self._lock:
+            stale = [key for key in self._entries if key[0] == user_id]
+            for key in stale:
+                del self._entries[key]
+            return len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+user_cache = ResolvedUserCache(
+    ttl_seconds=settings.AUTH_CACHE_TTL_SECONDS,
+    max_size=settings.AUTH_CACHE_MAX_SIZE,
+)
@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from pymongo import InsertOne
+
+from app.core.logger import logger
+from app.core.tracing import span
+
+# what a chunk looks like to retrieval/QA; storage keys (_id, policy_id) stay in Mongo
+CHUNK_PROJECTION = {"_id": 0, "chunk_id": 1, "source": 1, "page": 1, "page_end": 1, "policy": 1, "content": 1}
+
+_WRITE_BATCH = 1000
+# a claim older than this belongs to a worker that died mid-migration
+_MIGRATION_CLAIM_TTL = timedelta(minutes=10)
+
+
+def save_policy_chunks(db, policy_id: str, chunks: Iterable[Dict]) -> int:
+    # chunk_id doubles as the row number in the policy's FAISS index
+    policy_id = str(policy_id)
+    db.policy_chunks.delete_many({"policy_id": policy_id})
+
+    written = 0
+    batch: List[InsertOne] = []
+    for chunk in chunks:
+        batch.append(InsertOne({**chunk, "policy_id": policy_id}))
+        if len(batch) >= _WRITE_BATCH:
+            written += db.policy_chunks.bulk_write(batch, ordered=False).inserted_count
+            batch = []
+    if batch:
+        written += db.policy_chunks.bulk_write(batch, ordered=False).inserted_count
+    return written
+
+
+def load_policy_chunks(db, policy_id: str, chunk_ids: Optional[Iterable[int]] = None) -> List[Dict]:
+    query: Dict = {"policy_id": str(policy_id)}
+    if chunk_ids is not None:
+        query["chunk_id"] = {"$in": [int(i) for i in chunk_ids]}
+    with span("mongo"):
+        return list(db.policy_chunks.find(query, CHUNK_PROJECTION).sort("chunk_id", 1))
+
+
+def load_chunks_by_id(db, policy_id: str, chunk_ids: Iterable[int]) -> Dict[int, Dict]:
+    return {c["chunk_id"]: c for c in load_policy_chunks(db, policy_id, set(chunk_ids))}
+
+
+def delete_policy_chunks(db, policy_id: str) -> None:
+    db.policy_chunks.delete_many({"policy_id": str(policy_id)})
+
+
+def migrate_embedded_chunks(db) -> int:
+    # one-off move of the legacy policies.chunks arrays into policy_chunks
+    moved = 0
+    while True:
+        # claim with a marker so concurrent workers skip the policy; the embedded
+        # array stays in place until its copy is written
+        now = datetime.utcnow()
+        policy = db.policies.find_one_and_update(
+            {
+                "chunks": {"$exists": True},
+                "$or": [
+                    {"chunks_migrating": {"$exists": False}},
+                    {"chunks_migrating": {"$lt": now - _MIGRATION_CLAIM_TTL}},
+                ],
+            },
+            {"$set": {"chunks_migrating": now}},
+            projection={"_id": 1, "chunks": 1},
+        )
+        if policy is None:
+            break
+        save_policy_chunks(db, str(policy["_id"]), policy.get("chunks") or [])
+        db.policies.update_one(
+            {"_id": policy["_id"], "chunks": {"$exists": True}},
+            {"$unset": {"chunks": "", "chunks_migrating": ""}},
+        )
+        moved += 1
+    if moved:
+        logger.info("Moved embedded chunks of %d policies into policy_chunks", moved)
+    return moved
@@ -0,0 +1,133 @@
+import re
+import threading
+import time
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from app.core.config import settings
+from app.core.tracing import observe
+
+# sentence / clause ends; page text arrives with newlines already collapsed
+_SENTENCE_END = re.compile(r"(?<=[.;:!?])\s+(?=[\"'(\[]?[A-Z0-9])")
+_WHITESPACE = re.compile(r"\s+")
+
+# special tokens ([CLS], [SEP]) the model adds around every chunk
+_SPECIAL_TOKENS = 2
+
+
+class TextChunk(NamedTuple):
+    text: str
+    tokens: int
+    page: int  # page the chunk starts on
+    page_end: int  # page it ends on (chunks flow across page breaks)
+
+
+class _Unit(NamedTuple):
+    text: str
+    tokens: int
+    page: int
+
+
+class TokenChunker:
+    # packs whole sentences into chunks of at most max_tokens model tokens, carrying
+    # ~overlap_tokens of trailing sentences into the next chunk; reusable across documents
+    def __init__(self, tokenizer, max_tokens: int, overlap_tokens: int = 0):
+        if max_tokens <= 0:
+            raise ValueError("max_tokens must be positive")
+        self.tokenizer = tokenizer
+        self.max_tokens = max_tokens
+        self.overlap_tokens = min(overlap_tokens, max_tokens // 2)
+
+    def count(self, texts: List[str]) -> List[int]:
+        if not texts:
+            return []
+        ids = self.tokenizer(texts, add_special_tokens=False, verbose=False)["input_ids"]
+        return [len(i) for i in ids]
+
+    def _units(self, text: str, page: int, budget: int) -> List[_Unit]:
+        sentences = [s for s in _SENTENCE_END.split(text) if s]
+        units: List[_Unit] = []
+        for sentence, tokens in zip(sentences, self.count(sentences)):
+            if tokens <= budget:
+                units.append(_Unit(sentence, tokens, page))
+                continue
+            # a run-on "sentence" (tables, lists): fall back to word windows
+            words = _WHITESPACE.split(sentence)
+            piece: List[str] = []
+            piece_tokens = 0
+            for word, word_tokens in zip(words, self.count(words)):
+                if piece and piece_tokens + word_tokens > budget:
+                    units.append(_Unit(" ".join(piece), piece_tokens, page))
+                    piece, piece_tokens = [], 0
+                piece.append(word)
+                piece_tokens += word_tokens
+            if piece:
+                units.append(_Unit(" ".join(piece), piece_tokens, page))
+        return units
+
+    def chunk_pages(
+        self,
+        pages: Iterable[Tuple[int, str]],
+        reserved_tokens: int = 0,
+    ) -> Iterator[TextChunk]:
+        # pages: (page number, text) in order; reserved_tokens: room kept for a header
+        budget = max(1, self.max_tokens - reserved_tokens)
+        window: List[_Unit] = []
+        used = 0
+
+        def emit() -> TextChunk:
+            return TextChunk(
+                " ".join(u.text for u in window),
+                used,
+                window[0].page,
+                window[-1].page,
+            )
+
+        for page, text in pages:
+            start = time.perf_counter()
+            units = self._units(text, page, budget)
+            observe("chunk", time.perf_counter() - start)
+            for unit in units:
+                if window and used + unit.tokens > budget:
+                    yield emit()
+                    # keep the last sentences (up to overlap_tokens) as the next chunk's lead-in
+                    carry: List[_Unit] = []
+                    carried = 0
+                    for previous in reversed(window):
+                        total = carried + previous.tokens
+                        if total > self.overlap_tokens or total + unit.tokens > budget:
+                            break
+                        carry.insert(0, previous)
+                        carried += previous.tokens
+                    window, used = carry, carried
+                window.append(unit)
+                used += unit.tokens
+        if window:
+            yield emit()
+
+    def chunk_text(self, text: str, page: int = 1) -> List[TextChunk]:
+        return list(self.chunk_pages([(page, text)]))
+
+
+_lock = threading.Lock()
+_chunker: Optional[TokenChunker] = None
+
+
+def chunker_signature() -> str:
+    # stored with cached chunks, so a chunking change invalidates them
+    return f"tokens:{settings.CHUNK_MAX_TOKENS}:{settings.CHUNK_OVERLAP_TOKENS}"
+
+
+def get_chunker() -> TokenChunker:
+    # sized to the embedding model's window, so every chunk token is actually embedded
+    global _chunker
+    if _chunker is None:
+        with _lock:
+            if _chunker is None:
+                # imported here: pdf extraction workers import this module and never chunk
+                from app.services.embedder import get_model
+
+                model = get_model()
+                window = (getattr(model, "max_seq_length", None) or 256) - _SPECIAL_TOKENS
+                max_tokens = min(settings.CHUNK_MAX_TOKENS or window, window)
+                _chunker = TokenChunker(model.tokenizer, max_tokens, settings.CHUNK_OVERLAP_TOKENS)
+    return _chunker
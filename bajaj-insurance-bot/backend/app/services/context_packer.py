@@ -0,0 +1,172 @@
+import re
+import threading
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from app.core.config import settings
+from app.core.logger import logger
+from app.core.tracing import span
+
+_POLICY_PREFIX = re.compile(r"^\[Policy:\s*([^\]]*)\]\s*")
+# how much of the next chunk's head we look for in the previous chunk's tail
+_OVERLAP_PROBE = 50
+_OVERLAP_WINDOW = 1500
+
+_encoder_lock = threading.Lock()
+_count_fn: Optional[Callable[[str], int]] = None
+
+
+class PackedContext(NamedTuple):
+    text: str
+    tokens: int
+    raw_tokens: int  # what joining the raw chunks would have cost
+    chunks: int
+    segments: int
+
+    @property
+    def tokens_saved(self) -> int:
+        return max(0, self.raw_tokens - self.tokens)
+
+
+def _load_counter() -> Callable[[str], int]:
+    try:
+        import tiktoken
+
+        encoding = tiktoken.get_encoding(settings.CONTEXT_TOKENIZER)
+        return lambda text: len(encoding.encode(text, disallowed_special=()))
+    except Exception as e:
+        # no tiktoken / encoding not downloadable: the embedder's tokenizer is local
+        logger.warning("tiktoken %s unavailable (%s), counting with the embedding tokenizer", settings.CONTEXT_TOKENIZER, e)
+
+    from app.services.embedder import get_model
+
+    tokenizer = get_model().tokenizer
+    return lambda text: len(tokenizer.tokenize(text))
+
+
+def count_tokens(text: str) -> int:
+    global _count_fn
+    if _count_fn is None:
+        with _encoder_lock:
+            if _count_fn is None:
+                _count_fn = _load_counter()
+    return _count_fn(text) if text else 0
+
+
+def _strip_header(content: str) -> str:
+    return _POLICY_PREFIX.sub("", content, count=1)
+
+
+def relabel(content: str, policy: str) -> str:
+    # swap a chunk's "[Policy: ...]" header (from the PDF) for the given label
+    return f"[Policy: {policy}]\n{_strip_header(content)}"
+
+
+def _policy_of(content: str) -> Optional[str]:
+    match = _POLICY_PREFIX.match(content)
+    return match.group(1) if match else None
+
+
+def _join_overlapping(head: str, tail: str) -> str:
+    # splitter overlap: tail starts with the last few hundred chars of head
+    probe = tail[:_OVERLAP_PROBE]
+    if probe:
+        window_start = max(0, len(head) - _OVERLAP_WINDOW)
+        pos = head.find(probe, window_start)
+        while pos != -1:
+            if tail.startswith(head[pos:]):
+                return head[:pos] + tail
+            pos = head.find(probe, pos + 1)
+    return f"{head} {tail}"
+
+
+def _merge_segments(chunks: List[Dict]) -> List[Dict]:
+    # consecutive chunk_ids of one document are neighbours, even across a page break
+    ordered = sorted(
+        enumerate(chunks),
+        key=lambda item: (item[1].get("source"), item[1].get("page"), item[1].get("chunk_id", item[0])),
+    )
+    segments: List[Dict] = []
+    for position, chunk in ordered:
+        text = _strip_header(chunk["content"]).strip()
+        chunk_id = chunk.get("chunk_id")
+        last = segments[-1] if segments else None
+        if (
+            last is not None
+            and chunk_id is not None
+            and last["source"] == chunk.get("source")
+            and last["policy"] == _policy_of(chunk["content"])
+            and chunk_id - last["last_id"] in (0, 1)
+        ):
+            if chunk_id != last["last_id"]:
+                last["text"] = _join_overlapping(last["text"], text)
+            last["last_id"] = chunk_id
+            last["score"] = max(last["score"], chunk.get("score") or 0.0)
+            last["rank"] = min(last["rank"], position)
+            continue
+        segments.append(
+            {
+                "policy": _policy_of(chunk["content"]),
+                "source": chunk.get("source"),
+                "page": chunk.get("page"),
+                "last_id": chunk_id,
+                "text": text,
+                "score": chunk.get("score") or 0.0,
+                "rank": position,
+            }
+        )
+    # best first; retrieval order breaks ties
+    segments.sort(key=lambda s: (-s["score"], s["rank"]))
+    return segments
+
+
+def _truncate_to(text: str, budget: int) -> str:
+    while text and count_tokens(text) > budget:
+        text = text[: int(len(text) * 0.9)].rstrip()
+    return text
+
+
+def pack_context(results: List[Dict], token_budget: Optional[int] = None) -> PackedContext:
+    with span("pack_context"):
+        return _pack(results, token_budget)
+
+
+def _pack(results: List[Dict], token_budget: Optional[int]) -> PackedContext:
+    if not results:
+        return PackedContext("", 0, 0, 0, 0)
+    budget = token_budget or settings.CONTEXT_TOKEN_BUDGET
+
+    policies = []
+    for chunk in results:
+        name = _policy_of(chunk["content"])
+        if name and name not in policies:
+            policies.append(name)
+    # one policy: a single header up front; several: each segment keeps its own label
+    labelled = len(policies) > 1
+    header = "" if labelled else "".join(f"[Policy: {name}]\n" for name in policies)
+
+    separator_tokens = count_tokens("\n\n")
+    used = count_tokens(header)
+    parts: List[str] = []
+    segments = _merge_segments(results)
+    for segment in segments:
+        remaining = budget - used - (separator_tokens if parts else 0)
+        if remaining <= 0:
+            break
+        text = segment["text"]
+        if labelled and segment["policy"]:
+            text = f"[Policy: {segment['policy']}]\n{text}"
+        tokens = count_tokens(text)
+        if tokens > remaining:
+            if parts:
+                continue  # a smaller, lower-scored segment may still fit
+            segment_text = _truncate_to(text, remaining)
+            tokens = count_tokens(segment_text)
+        else:
+            segment_text = text
+        if segment_text:
+            parts.append(segment_text)
+            used += tokens + (separator_tokens if len(parts) > 1 else 0)
+
+    text = header + "\n\n".join(parts)
+    raw_tokens = count_tokens("\n\n".join(chunk["content"] for chunk in results))
+    return PackedContext(text, count_tokens(text), raw_tokens, len(results), len(parts))
@@ -0,0 +1,214 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import uuid
+from collections import OrderedDict
+from typing import IO, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import faiss
+import numpy as np
+
+from app.core.config import settings
+from app.core.logger import logger
+from app.core.metrics import CACHE_LOOKUPS
+from app.services.chunker import chunker_signature
+from app.services.index_store import (
+    LEXICAL_FILE,
+    read_bundle_manifest,
+    read_index_bundle,
+    write_index_bundle,
+)
+from app.services.lexical_index import BM25Index
+from app.services.pdf_processor import PDFDownloadError, download_pdf
+
+CHUNKS_FILE = "chunks.json"
+
+
+class CachedDocument(NamedTuple):
+    content_hash: str
+    chunks: List[Dict]
+    embeddings: np.ndarray
+    index: faiss.Index
+    lexical: BM25Index
+
+
+BuildFn = Callable[[IO[bytes]], Tuple[List[Dict], np.ndarray, faiss.Index]]
+
+_lock = threading.Lock()
+_memory: "OrderedDict[str, CachedDocument]" = OrderedDict()
+
+
+def _entries_dir() -> str:
+    return os.path.join(settings.DOC_CACHE_DIR, "entries")
+
+
+def _entry_dir(content_hash: str) -> str:
+    return os.path.join(_entries_dir(), content_hash)
+
+
+def _url_meta_path(url: str) -> str:
+    url_key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+    return os.path.join(settings.DOC_CACHE_DIR, "urls", f"{url_key}.json")
+
+
+def _read_url_meta(url: str) -> Optional[Dict]:
+    try:
+        with open(_url_meta_path(url)) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def _write_url_meta(url: str, meta: Dict) -> None:
+    path = _url_meta_path(url)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp-{uuid.uuid4().hex}"
+    with open(tmp_path, "w") as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, path)
+
+
+# ---------- memory LRU ----------
+
+def _memory_get(content_hash: str) -> Optional[CachedDocument]:
+    with _lock:
+        doc = _memory.get(content_hash)
+        if doc is not None:
+            _memory.move_to_end(content_hash)
+        return doc
+
+
+def _memory_put(doc: CachedDocument) -> None:
+    with _lock:
+        _memory[doc.content_hash] = doc
+        _memory.move_to_end(doc.content_hash)
+        while len(_memory) > settings.DOC_CACHE_MEMORY_ITEMS:
+            _memory.popitem(last=False)
+
+
+# ---------- disk entries ----------
+
+def _load_entry(content_hash: str) -> Optional[CachedDocument]:
+    doc = _memory_get(content_hash)
+    if doc is not None:
+        return doc
+
+    target_dir = _entry_dir(content_hash)
+    manifest = read_bundle_manifest(target_dir)
+    if (
+        manifest is None
+        or manifest.get("model") != settings.EMBEDDING_MODEL
+        or manifest.get("chunker") != chunker_signature()
+    ):
+        return None
+    try:
+        with open(os.path.join(target_dir, CHUNKS_FILE)) as f:
+            chunks = json.load(f)
+        embeddings, index = read_index_bundle(target_dir)
+    except FileNotFoundError:
+        # evicted by another worker between the manifest read and now
+        return None
+    try:
+        with open(os.path.join(target_dir, LEXICAL_FILE)) as f:
+            lexical = BM25Index.from_json(json.load(f))
+    except (FileNotFoundError, json.JSONDecodeError):
+        # entry cached before lexical indexes existed; cheap to rebuild from the chunks
+        lexical = BM25Index.build(c["content"] for c in chunks)
+
+    # mtime doubles as the LRU clock for disk eviction
+    os.utime(target_dir)
+    doc = CachedDocument(content_hash, chunks, embeddings, index, lexical)
+    _memory_put(doc)
+    return doc
+
+
+def _store_entry(doc: CachedDocument) -> None:
+    write_index_bundle(
+        _entry_dir(doc.content_hash),
+        doc.embeddings,
+        doc.index,
+        {"content_hash": doc.content_hash, "model": settings.EMBEDDING_MODEL, "chunker": chunker_signature()},
+        extra_json={CHUNKS_FILE: doc.chunks, LEXICAL_FILE: doc.lexical.to_json()},
+    )
+    _memory_put(doc)
+    _enforce_disk_budget()
+
+
+def _dir_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def _enforce_disk_budget() -> None:
+    root = _entries_dir()
+    if not os.path.isdir(root):
+        return
+
+    entries = []
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+        if os.path.isdir(path) and "." not in name:
+            entries.append((os.path.getmtime(path), _dir_size(path), name, path))
+
+    total = sum(size for _, size, _, _ in entries)
+    # oldest access first; always keep the most recent entry
+    for _, size, name, path in sorted(entries)[:-1]:
+        if total <= settings.DOC_CACHE_MAX_BYTES:
+            break
+        shutil.rmtree(path, ignore_errors=True)
+        with _lock:
+            _memory.pop(name, None)
+        total -= size
+        logger.info("Document cache evicted %s (%d bytes)", name, size)
+
+
+# ---------- public API ----------
+
+def get_or_build_document(url: str, build: BuildFn) -> CachedDocument:
+    meta = _read_url_meta(url)
+
+    download = download_pdf(
+        url,
+        etag=meta.get("etag") if meta else None,
+        last_modified=meta.get("last_modified") if meta else None,
+        checksum=True,
+    )
+    if download.file is None:
+        # 304: the bytes we hashed last time are still current
+        # (only if we sent validators: some servers/proxies answer 304 to a plain GET)
+        if meta is not None:
+            doc = _load_entry(meta["content_hash"])
+            if doc is not None:
+                CACHE_LOOKUPS.inc(cache="document", result="hit")
+                return doc
+        download = download_pdf(url, checksum=True)
+        if download.file is None:
+            raise PDFDownloadError("Failed to download PDF: 304 to an unconditional request")
+
+    # hash was computed while streaming, so a known document is never parsed again
+    with download.file as pdf_file:
+        doc = _load_entry(download.sha256)
+        CACHE_LOOKUPS.inc(cache="document", result="hit" if doc is not None else "miss")
+        if doc is None:
+            chunks, embeddings, index = build(pdf_file)
+            lexical = BM25Index.build(c["content"] for c in chunks)
+            doc = CachedDocument(download.sha256, chunks, embeddings, index, lexical)
+            _store_entry(doc)
+
+    _write_url_meta(
+        url,
+        {
+            "etag": download.etag,
+            "last_modified": download.last_modified,
+            "content_hash": download.sha256,
+        },
+    )
+    return doc
@@ -0,0 +1,184 @@
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sentence_transformers import SentenceTransformer
+
+from app.core.config import settings
+from app.core.logger import logger
+from app.core.tracing import span
+
+_lock = threading.Lock()
+_models: Dict[Tuple[str, str], SentenceTransformer] = {}
+_backends: Dict[Tuple[str, str], Dict] = {}
+_ready = threading.Event()
+
+# exported files shipped with the sentence-transformers MiniLM checkpoints
+_ONNX_FILES = {
+    "onnx": "onnx/model.onnx",
+    "onnx-int8": "onnx/model_quint8_avx2.onnx",
+}
+
+# parity probes: short queries and clause-like text, like what we actually embed
+_PARITY_TEXTS = [
+    "What is the waiting period for pre-existing diseases?",
+    "Is maternity covered under this policy?",
+    "Sum insured",
+    "4.1.2 Hospitalisation expenses: room rent up to 1% of the sum insured per day, "
+    "ICU charges up to 2% of the sum insured per day.",
+    "Exclusions: any treatment arising from war, invasion, nuclear contamination or "
+    "self-inflicted injury is not payable under Section 3.",
+    "The insured person must notify the TPA within 48 hours of an emergency admission.",
+]
+
+
+def _resolve(model_name: Optional[str], device: Optional[str]) -> Tuple[str, str]:
+    return model_name or settings.EMBEDDING_MODEL, device or settings.EMBEDDING_DEVICE
+
+
+def _load_torch(name: str, device: str) -> SentenceTransformer:
+    if settings.EMBEDDING_THREADS > 0:
+        import torch
+
+        torch.set_num_threads(settings.EMBEDDING_THREADS)
+    return SentenceTransformer(name, device=device)
+
+
+def _load_onnx(name: str, device: str, backend: str) -> SentenceTransformer:
+    import onnxruntime as ort
+
+    options = ort.SessionOptions()
+    if settings.EMBEDDING_THREADS > 0:
+        options.intra_op_num_threads = settings.EMBEDDING_THREADS
+    # one graph at a time per model; parallelism comes from intra-op threads
+    options.inter_op_num_threads = 1
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    return SentenceTransformer(
+        name,
+        device=device,
+        backend="onnx",
+        model_kwargs={
+            "file_name": settings.EMBEDDING_ONNX_FILE or _ONNX_FILES[backend],
+            "provider": "CPUExecutionProvider",
+            "session_options": options,
+        },
+    )
+
+
+def _cosine_drift(model: SentenceTransformer, reference: SentenceTransformer) -> float:
+    # worst 1 - cos(optimized, torch) over the probe texts
+    a = model.encode(_PARITY_TEXTS, convert_to_numpy=True, normalize_embeddings=True)
+    b = reference.encode(_PARITY_TEXTS, convert_to_numpy=True, normalize_embeddings=True)
+    return float(1.0 - np.min(np.sum(a * b, axis=1)))
+
+
+def _load(key: Tuple[str, str]) -> SentenceTransformer:
+    name, device = key
+    backend = settings.EMBEDDING_BACKEND
+    if backend == "torch" or device != "cpu":
+        _backends[key] = {"backend": "torch", "drift": 0.0}
+        return _load_torch(name, device)
+
+    try:
+        model = _load_onnx(name, device, backend)
+    except Exception as e:
+        logger.warning("Embedding backend %s unavailable (%s), using torch", backend, e)
+        _backends[key] = {"backend": "torch", "drift": 0.0}
+        return _load_torch(name, device)
+
+    # vectors must stay interchangeable with stored (torch-built) indexes and caches
+    reference = _load_torch(name, device)
+    drift = _cosine_drift(model, reference)
+    if drift > settings.EMBEDDING_PARITY_MAX_DRIFT:
+        logger.warning(
+            "Embedding backend %s drifts %.4f from torch (max %.4f), using torch",
+            backend,
+            drift,
+            settings.EMBEDDING_PARITY_MAX_DRIFT,
+        )
+        _backends[key] = {"backend": "torch", "drift": 0.0, "rejected": backend, "rejected_drift": drift}
+        return reference
+
+    logger.info("Embedding backend %s within parity (cosine drift %.5f)", backend, drift)
+    _backends[key] = {"backend": backend, "drift": drift}
+    return model
+
+
+def get_model(model_name: Optional[str] = None, device: Optional[str] = None) -> SentenceTransformer:
+    key = _resolve(model_name, device)
+    model = _models.get(key)
+    if model is not None:
+        return model
+
+    with _lock:
+        # another thread may have finished loading while we waited
+        model = _models.get(key)
+        if model is None:
+            logger.info("Loading embedding model %s on %s (%s)", key[0], key[1], settings.EMBEDDING_BACKEND)
+            model = _load(key)
+            _models[key] = model
+    return model
+
+
+def backend_info(model_name: Optional[str] = None, device: Optional[str] = None) -> Optional[Dict]:
+    return _backends.get(_resolve(model_name, device))
+
+
+def _batches(texts: Sequence[str], max_seq_length: int) -> List[List[int]]:
+    # longest first, each batch capped by padded tokens (rows * longest row), so short
+    # queries go through in large batches and long clauses in small ones
+    estimate = [min(max_seq_length, len(t) // 4 + 2) for t in texts]
+    order = sorted(range(len(texts)), key=lambda i: estimate[i], reverse=True)
+    batches: List[List[int]] = []
+    current: List[int] = []
+    for i in order:
+        longest = estimate[current[0]] if current else estimate[i]
+        if current and (
+            len(current) >= settings.EMBEDDING_MAX_BATCH
+            or (len(current) + 1) * longest > settings.EMBEDDING_BATCH_TOKENS
+        ):
+            batches.append(current)
+            current = []
+        current.append(i)
+    if current:
+        batches.append(current)
+    return batches
+
+
+def encode(texts: Sequence[str], model: Optional[SentenceTransformer] = None) -> np.ndarray:
+    # normalized float32 embeddings, in input order
+    model = model or get_model()
+    with span("embed"):
+        return _encode(texts, model)
+
+
+def _encode(texts: Sequence[str], model: SentenceTransformer) -> np.ndarray:
+    texts = list(texts)
+    if len(texts) <= 1:
+        return model.encode(texts, convert_to_numpy=True, normalize_embeddings=True).astype("float32")
+
+    max_seq_length = getattr(model, "max_seq_length", None) or 256
+    out: Optional[np.ndarray] = None
+    for batch in _batches(texts, max_seq_length):
+        vectors = model.encode(
+            [texts[i] for i in batch],
+            batch_size=len(batch),
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+        )
+        if out is None:
+            out = np.empty((len(texts), vectors.shape[1]), dtype="float32")
+        out[batch] = vectors
+    return out
+
+
+def warm_up(model_name: Optional[str] = None, device: Optional[str] = None) -> None:
+    model = get_model(model_name, device)
+    # first encode pays for lazy kernel/tokenizer init; do it before traffic arrives
+    model.encode(["warm-up"], convert_to_numpy=True, normalize_embeddings=True)
+    _ready.set()
+    logger.info("Embedding model ready")
+
+
+def is_ready() -> bool:
+    return _ready.is_set()
@@ -0,0 +1,92 @@
+import hashlib
+from typing import Dict, List, NamedTuple, Tuple
+
+import numpy as np
+from bson.binary import Binary
+from pymongo.errors import BulkWriteError
+from sentence_transformers import SentenceTransformer
+
+from app.core.logger import logger
+from app.core.metrics import CACHE_LOOKUPS
+from app.core.tracing import span
+from app.services.embedder import encode
+
+
+class EmbeddingCacheStats(NamedTuple):
+    total: int
+    hits: int
+    encoded: int
+
+    @property
+    def hit_ratio(self) -> float:
+        return self.hits / self.total if self.total else 0.0
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _cache_id(model_name: str, digest: str) -> str:
+    return f"{model_name}:{digest}"
+
+
+def encode_with_cache(
+    texts: List[str],
+    model: SentenceTransformer,
+    model_name: str,
+    db,
+) -> Tuple[np.ndarray, EmbeddingCacheStats]:
+    # reuse stored vectors for chunk text seen before (e.g. last year's wording)
+    if not texts:
+        dim = model.get_sentence_embedding_dimension()
+        return np.zeros((0, dim), dtype="float32"), EmbeddingCacheStats(0, 0, 0)
+
+    digests = [content_hash(t) for t in texts]
+    unique = list(dict.fromkeys(digests))
+
+    found: Dict[str, np.ndarray] = {}
+    with span("mongo"):
+        cursor = db.embedding_cache.find(
+            {"_id": {"$in": [_cache_id(model_name, d) for d in unique]}},
+            {"vector": 1},
+        )
+        for doc in cursor:
+            digest = doc["_id"][len(model_name) + 1:]
+            found[digest] = np.frombuffer(doc["vector"], dtype="float32")
+
+    missing = [d for d in unique if d not in found]
+    CACHE_LOOKUPS.inc(len(unique) - len(missing), cache="embedding", result="hit")
+    CACHE_LOOKUPS.inc(len(missing), cache="embedding", result="miss")
+    if missing:
+        text_for = dict(zip(digests, texts))
+        vectors = encode([text_for[d] for d in missing], model)
+        for d, vec in zip(missing, vectors):
+            found[d] = vec
+        try:
+            db.embedding_cache.insert_many(
+                [
+                    {
+                        "_id": _cache_id(model_name, d),
+                        "model": model_name,
+                        "dim": int(vec.shape[0]),
+                        "vector": Binary(vec.tobytes()),
+                    }
+                    for d, vec in zip(missing, vectors)
+                ],
+                ordered=False,
+            )
+        except BulkWriteError:
+            # another ingest stored some of the same chunks concurrently
+            pass
+
+    embeddings = np.vstack([found[d] for d in digests])
+    missing_set = set(missing)
+    fresh = sum(1 for d in digests if d in missing_set)
+    stats = EmbeddingCacheStats(total=len(texts), hits=len(texts) - fresh, encoded=len(missing))
+    logger.info(
+        "Embedding cache: %d chunks, %d encoded, hit ratio %.1f%%",
+        stats.total,
+        stats.encoded,
+        stats.hit_ratio * 100,
+    )
+    return embeddings, stats
@@ -0,0 +1,303 @@
+import math
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, NamedTuple, Optional, Set, Tuple
+
+import faiss
+import numpy as np
+from bson import ObjectId
+
+from app.core.config import settings
+from app.core.logger import logger
+from app.core.tracing import span
+from app.services.index_store import load_policy_embeddings
+
+# faiss id = slot << _CHUNK_BITS | chunk_id, so a policy's rows are one contiguous id range
+_CHUNK_BITS = 24
+
+# what the global index needs to know about a policy
+GLOBAL_POLICY_PROJECTION = {
+    "insurance_type": 1,
+    "policy_name": 1,
+    "policy_year": 1,
+    "published": 1,
+    "index_ready": 1,
+    "index_version": 1,
+    "updated_at": 1,
+}
+
+
+class GlobalIndexNotReady(Exception):
+    pass
+
+
+class GlobalHit(NamedTuple):
+    policy_id: str
+    chunk_id: int
+    score: float
+
+
+class _PolicySlot(NamedTuple):
+    slot: int
+    policy_id: str
+    insurance_type: str
+    policy_name: str
+    policy_year: str
+    version: str
+
+
+def _id_range(slot: int) -> Tuple[int, int]:
+    return slot << _CHUNK_BITS, (slot + 1) << _CHUNK_BITS
+
+
+class _Shard:
+    # all published policies of one insurance_type: flat while small, IVF once large
+    def __init__(self, dim: int):
+        self.dim = dim
+        self.index: faiss.Index = faiss.IndexIDMap2(faiss.IndexFlatIP(dim))
+        self.trained_on = 0  # vectors the IVF quantizer was trained on; 0 = flat
+        self.vectors: Dict[int, np.ndarray] = {}  # slot -> that policy's (mmapped) embeddings
+
+    @property
+    def ntotal(self) -> int:
+        return int(self.index.ntotal)
+
+    def add(self, slot: int, embeddings: np.ndarray) -> None:
+        start, _ = _id_range(slot)
+        ids = np.arange(start, start + len(embeddings), dtype="int64")
+        self.index.add_with_ids(np.ascontiguousarray(embeddings, dtype="float32"), ids)
+        self.vectors[slot] = embeddings
+        self._maybe_retrain()
+
+    def remove(self, slot: int) -> None:
+        if self.vectors.pop(slot, None) is not None:
+            self.index.remove_ids(faiss.IDSelectorRange(*_id_range(slot)))
+
+    def _maybe_retrain(self) -> None:
+        n = self.ntotal
+        if n < settings.GLOBAL_INDEX_IVF_MIN_VECTORS:
+            return
+        if self.trained_on and n < 4 * self.trained_on:
+            return  # centroids still representative enough
+
+        # ~4*sqrt(n) lists, but keep the ~39 training points per centroid faiss wants
+        nlist = max(1, min(int(4 * math.sqrt(n)), n // 39))
+        quantizer = faiss.IndexFlatIP(self.dim)
+        ivf = faiss.IndexIVFFlat(quantizer, self.dim, nlist, faiss.METRIC_INNER_PRODUCT)
+        slots = sorted(self.vectors)
+        vectors = np.concatenate([np.asarray(self.vectors[s], dtype="float32") for s in slots])
+        ids = np.concatenate(
+            [np.arange(_id_range(s)[0], _id_range(s)[0] + len(self.vectors[s]), dtype="int64") for s in slots]
+        )
+        ivf.train(vectors)
+        ivf.add_with_ids(vectors, ids)
+        ivf.nprobe = settings.GLOBAL_INDEX_NPROBE
+        self.index = ivf
+        self.trained_on = n
+        logger.info("Global index shard retrained: %d vectors, %d lists", n, nlist)
+
+    def search(self, query_embeddings: np.ndarray, top_k: int, slots: Optional[Set[int]]):
+        selector = None
+        if slots is not None:
+            ids = [
+                np.arange(_id_range(s)[0], _id_range(s)[0] + len(self.vectors[s]), dtype="int64")
+                for s in slots
+                if s in self.vectors
+            ]
+            if not ids:
+                return None
+            selector = faiss.IDSelectorBatch(np.concatenate(ids))
+
+        if isinstance(self.index, faiss.IndexIVF):
+            params = faiss.SearchParametersIVF(sel=selector, nprobe=settings.GLOBAL_INDEX_NPROBE)
+        else:
+            params = faiss.SearchParameters(sel=selector) if selector is not None else None
+        k = min(top_k, self.ntotal)
+        return self.index.search(np.ascontiguousarray(query_embeddings, dtype="float32"), k, params=params)
+
+
+class GlobalIndex:
+    # one ANN index per insurance_type over every published, ingested policy;
+    # kept current incrementally from policies.updated_at, plus a check for deleted ids
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._shards: Dict[str, _Shard] = {}
+        self._policies: Dict[str, _PolicySlot] = {}
+        self._by_slot: Dict[int, _PolicySlot] = {}
+        self._next_slot = 0
+        self._synced_until: Optional[datetime] = None
+        self._last_sync = 0.0
+        self._ready = threading.Event()
+
+    def is_ready(self) -> bool:
+        return self._ready.is_set()
+
+    def _remove(self, policy_id: str) -> None:
+        entry = self._policies.pop(policy_id, None)
+        if entry is None:
+            return
+        self._by_slot.pop(entry.slot, None)
+        shard = self._shards.get(entry.insurance_type)
+        if shard is not None:
+            shard.remove(entry.slot)
+
+    def remove_policy(self, policy_id: str) -> None:
+        with self._lock:
+            self._remove(str(policy_id))
+
+    def apply_policy(self, policy: Dict) -> None:
+        # add, replace or drop one policy according to its current state
+        policy_id = str(policy["_id"])
+        version = policy.get("index_version")
+        searchable = policy.get("published") and policy.get("index_ready", True) and version
+        with self._lock:
+            current = self._policies.get(policy_id)
+            if not searchable:
+                self._remove(policy_id)
+                return
+            if (
+                current is not None
+                and current.version == version
+                and current.insurance_type == policy["insurance_type"]
+            ):
+                return
+
+            embeddings = load_policy_embeddings(policy_id, version)
+            if embeddings is None or len(embeddings) == 0:
+                self._remove(policy_id)
+                return
+            if len(embeddings) >= 1 << _CHUNK_BITS:
+                logger.warning("Policy %s has too many chunks for the global index", policy_id)
+                return
+
+            self._remove(policy_id)
+            entry = _PolicySlot(
+                slot=self._next_slot,
+                policy_id=policy_id,
+                insurance_type=policy["insurance_type"],
+                policy_name=policy["policy_name"],
+                policy_year=policy["policy_year"],
+                version=version,
+            )
+            self._next_slot += 1
+            shard = self._shards.get(entry.insurance_type)
+            if shard is None:
+                shard = self._shards[entry.insurance_type] = _Shard(embeddings.shape[1])
+            shard.add(entry.slot, embeddings)
+            self._policies[policy_id] = entry
+            self._by_slot[entry.slot] = entry
+
+    def sync(self, db, force: bool = False) -> int:
+        # apply every policy changed since the last sync (cheap: indexed on updated_at)
+        with self._lock:
+            now = time.monotonic()
+            if not force and now - self._last_sync < settings.GLOBAL_INDEX_SYNC_SECONDS:
+                return 0
+            self._last_sync = now
+
+            query: Dict = {}
+            if self._synced_until is not None:
+                query["updated_at"] = {"$gte": self._synced_until}
+            else:
+                query["published"] = True
+            started = datetime.utcnow()
+
+            applied = 0
+            for policy in db.policies.find(query, GLOBAL_POLICY_PROJECTION):
+                self.apply_policy(policy)
+                applied += 1
+            applied += self._drop_deleted(db)
+            self._synced_until = started
+            self._ready.set()
+            if applied:
+                logger.info("Global index synced %d policies (%d searchable)", applied, len(self._policies))
+            return applied
+
+    def _drop_deleted(self, db) -> int:
+        # a delete leaves no updated_at to find, and may have run on another worker
+        resident = list(self._policies)
+        if not resident:
+            return 0
+        existing = {
+            str(p["_id"])
+            for p in db.policies.find({"_id": {"$in": [ObjectId(pid) for pid in resident]}}, {"_id": 1})
+        }
+        gone = [pid for pid in resident if pid not in existing]
+        for policy_id in gone:
+            self._remove(policy_id)
+        return len(gone)
+
+    def start_background_build(self, get_db: Callable) -> None:
+        def run():
+            try:
+                self.sync(get_db(), force=True)
+            except Exception:
+                logger.exception("Global index build failed")
+
+        threading.Thread(target=run, name="global-index-build", daemon=True).start()
+
+    def policy(self, policy_id: str) -> Optional[_PolicySlot]:
+        return self._policies.get(policy_id)
+
+    def search(
+        self,
+        query_embeddings: np.ndarray,
+        top_k: int = 5,
+        insurance_type: Optional[str] = None,
+        policy_year: Optional[str] = None,
+    ) -> List[List[GlobalHit]]:
+        if not self.is_ready():
+            raise GlobalIndexNotReady("Global index is still being built")
+
+        results: List[List[GlobalHit]] = [[] for _ in range(len(query_embeddings))]
+        with self._lock:
+            shards = (
+                [(insurance_type, self._shards.get(insurance_type))]
+                if insurance_type is not None
+                else list(self._shards.items())
+            )
+            for shard_type, shard in shards:
+                if shard is None or shard.ntotal == 0:
+                    continue
+                slots = None
+                if policy_year is not None:
+                    slots = {
+                        p.slot
+                        for p in self._policies.values()
+                        if p.insurance_type == shard_type and p.policy_year == policy_year
+                    }
+                with span("faiss_search"):
+                    found = shard.search(query_embeddings, top_k, slots)
+                if found is None:
+                    continue
+                scores, ids = found
+                for row, (row_scores, row_ids) in enumerate(zip(scores, ids)):
+                    for score, faiss_id in zip(row_scores, row_ids):
+                        if faiss_id < 0:
+                            continue
+                        entry = self._by_slot.get(int(faiss_id) >> _CHUNK_BITS)
+                        if entry is not None:
+                            chunk_id = int(faiss_id) & ((1 << _CHUNK_BITS) - 1)
+                            results[row].append(GlobalHit(entry.policy_id, chunk_id, float(score)))
+
+        # merge shards: best top_k overall per question
+        return [sorted(row, key=lambda h: h.score, reverse=True)[:top_k] for row in results]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "ready": self.is_ready(),
+                "policies": len(self._policies),
+                "shards": {
+                    name: {
+                        "vectors": shard.ntotal,
+                        "policies": len(shard.vectors),
+                        "kind": "ivf" if shard.trained_on else "flat",
+                    }
+                    for name, shard in self._shards.items()
+                },
+            }
+
+
+global_index = GlobalIndex()
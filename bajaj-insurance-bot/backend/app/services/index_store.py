@@ -0,0 +1,195 @@
+import json
+import os
+import shutil
+import uuid
+from typing import Any, Dict, Optional, Tuple
+
+import faiss
+import numpy as np
+
+from app.core.config import settings
+from app.core.tracing import span
+from app.services.lexical_index import BM25Index
+from app.services.resident_index import ResidentIndexCache
+
+INDEX_FILE = "index.faiss"
+EMBEDDINGS_FILE = "embeddings.npy"
+MANIFEST_FILE = "manifest.json"
+LEXICAL_FILE = "lexical.json"
+
+# read-only + mmap: workers share the page cache instead of each holding a copy
+_MMAP_FLAGS = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY | getattr(faiss, "IO_FLAG_MMAP_IFC", 0)
+
+# hot policies' faiss + BM25 indexes, LRU under one INDEX_RESIDENT_MAX_BYTES budget;
+# keys are ("dense", policy_id) -> (embeddings, index) and ("lexical", policy_id) -> BM25Index
+resident_indexes = ResidentIndexCache(settings.INDEX_RESIDENT_MAX_BYTES)
+
+
+def new_index_version() -> str:
+    return uuid.uuid4().hex
+
+
+def policy_index_dir(policy_id: str) -> str:
+    return os.path.join(settings.INDEX_DIR, str(policy_id))
+
+
+# ---------- generic bundle helpers (index + embeddings + manifest) ----------
+
+def write_index_bundle(
+    target_dir: str,
+    embeddings: np.ndarray,
+    index: faiss.Index,
+    manifest: Dict,
+    extra_json: Optional[Dict[str, Any]] = None,
+) -> None:
+    # write into a sibling temp dir and swap it in, so readers never see half a bundle
+    parent = os.path.dirname(os.path.abspath(target_dir))
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = f"{target_dir}.tmp-{uuid.uuid4().hex}"
+    os.makedirs(tmp_dir)
+    try:
+        faiss.write_index(index, os.path.join(tmp_dir, INDEX_FILE))
+        np.save(
+            os.path.join(tmp_dir, EMBEDDINGS_FILE),
+            np.ascontiguousarray(embeddings, dtype="float32"),
+        )
+        manifest = {
+            **manifest,
+            "count": int(index.ntotal),
+            "dim": int(index.d),
+            "kind": type(index).__name__,
+        }
+        for name, payload in (extra_json or {}).items():
+            with open(os.path.join(tmp_dir, name), "w") as f:
+                json.dump(payload, f)
+        with open(os.path.join(tmp_dir, MANIFEST_FILE), "w") as f:
+            json.dump(manifest, f)
+
+        old_dir = None
+        if os.path.isdir(target_dir):
+            old_dir = f"{target_dir}.old-{uuid.uuid4().hex}"
+            os.replace(target_dir, old_dir)
+        os.replace(tmp_dir, target_dir)
+        if old_dir:
+            shutil.rmtree(old_dir, ignore_errors=True)
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+
+def read_bundle_manifest(target_dir: str) -> Optional[Dict]:
+    try:
+        with open(os.path.join(target_dir, MANIFEST_FILE)) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def read_index_bundle(target_dir: str) -> Tuple[np.ndarray, faiss.Index]:
+    embeddings = np.load(os.path.join(target_dir, EMBEDDINGS_FILE), mmap_mode="r")
+    index = faiss.read_index(os.path.join(target_dir, INDEX_FILE), _MMAP_FLAGS)
+    return embeddings, index
+
+
+# ---------- per-policy store ----------
+
+def save_policy_index(
+    policy_id: str,
+    embeddings: np.ndarray,
+    index: faiss.Index,
+    version: str,
+    lexical: Optional[BM25Index] = None,
+) -> None:
+    write_index_bundle(
+        policy_index_dir(policy_id),
+        embeddings,
+        index,
+        {"policy_id": str(policy_id), "version": version},
+        extra_json={LEXICAL_FILE: lexical.to_json()} if lexical is not None else None,
+    )
+    evict_policy_index(policy_id)
+
+
+def load_policy_index(
+    policy_id: str,
+    version: Optional[str] = None,
+) -> Optional[Tuple[np.ndarray, faiss.Index]]:
+    # returns None when nothing is stored or the stored bundle is stale for `version`
+    policy_id = str(policy_id)
+    target_dir = policy_index_dir(policy_id)
+    manifest = read_bundle_manifest(target_dir)
+    if manifest is None:
+        evict_policy_index(policy_id)
+        return None
+    if version is not None and manifest.get("version") != version:
+        return None
+
+    cached = resident_indexes.get(("dense", policy_id), manifest.get("version"))
+    if cached is not None:
+        return cached
+
+    with span("index_load"):
+        embeddings, index = read_index_bundle(target_dir)
+    # embeddings stay mmapped (page cache); the index itself is what lives on the heap
+    nbytes = os.path.getsize(os.path.join(target_dir, INDEX_FILE))
+    resident_indexes.put(("dense", policy_id), manifest.get("version"), (embeddings, index), nbytes)
+    return embeddings, index
+
+
+def load_policy_embeddings(policy_id: str, version: str) -> Optional[np.ndarray]:
+    # just the (mmapped) vectors, without making the policy's index resident
+    target_dir = policy_index_dir(policy_id)
+    manifest = read_bundle_manifest(target_dir)
+    if manifest is None or manifest.get("version") != version:
+        return None
+    try:
+        return np.load(os.path.join(target_dir, EMBEDDINGS_FILE), mmap_mode="r")
+    except FileNotFoundError:
+        return None
+
+
+def load_policy_lexical(policy_id: str, version: str) -> Optional[BM25Index]:
+    # None when the stored bundle predates lexical indexes (or is stale for `version`)
+    policy_id = str(policy_id)
+    cached = resident_indexes.get(("lexical", policy_id), version)
+    if cached is not None:
+        return cached
+
+    target_dir = policy_index_dir(policy_id)
+    manifest = read_bundle_manifest(target_dir)
+    if manifest is None or manifest.get("version") != version:
+        return None
+    path = os.path.join(target_dir, LEXICAL_FILE)
+    try:
+        with open(path) as f:
+            lexical = BM25Index.from_json(json.load(f))
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+    resident_indexes.put(("lexical", policy_id), version, lexical, os.path.getsize(path))
+    return lexical
+
+
+def save_policy_lexical(policy_id: str, version: str, lexical: BM25Index) -> None:
+    # add a lexical index to an existing bundle (backfill for older bundles)
+    policy_id = str(policy_id)
+    target_dir = policy_index_dir(policy_id)
+    manifest = read_bundle_manifest(target_dir)
+    if manifest is None or manifest.get("version") != version:
+        return
+    path = os.path.join(target_dir, LEXICAL_FILE)
+    tmp_path = f"{path}.tmp-{uuid.uuid4().hex}"
+    with open(tmp_path, "w") as f:
+        json.dump(lexical.to_json(), f)
+    os.replace(tmp_path, path)
+    resident_indexes.put(("lexical", policy_id), version, lexical, os.path.getsize(path))
+
+
+def evict_policy_index(policy_id: str) -> None:
+    resident_indexes.evict(("dense", str(policy_id)))
+    resident_indexes.evict(("lexical", str(policy_id)))
+
+
+def delete_policy_index(policy_id: str) -> None:
+    evict_policy_index(policy_id)
+    shutil.rmtree(policy_index_dir(policy_id), ignore_errors=True)
@@ -0,0 +1,225 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from bson import ObjectId
+
+from app.core.config import settings
+from app.core.logger import logger
+from app.services.chunk_store import delete_policy_chunks, save_policy_chunks
+from app.services.index_store import delete_policy_index, new_index_version, save_policy_index
+from app.services.lexical_index import BM25Index
+from app.services.pdf_processor import download_pdf, iter_text_chunks_with_metadata
+from app.services.vector_store import embed_chunk_stream, get_sentence_model
+
+STAGES = ["download", "extract", "embed", "persist"]
+
+# dedicated threads: ingestion never competes for FastAPI's shared threadpool
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.INGEST_CONCURRENCY,
+                thread_name_prefix="ingest",
+            )
+        return _executor
+
+
+def shutdown_ingestion() -> None:
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            # queued jobs stay "queued" in Mongo and are picked up on next start
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+# ---------- job documents ----------
+
+def create_job(db, policy_id, document_url: str) -> str:
+    now = datetime.utcnow()
+    job = {
+        "policy_id": str(policy_id),
+        "document_url": document_url,
+        "status": "queued",
+        "stages": {stage: {"status": "pending", "progress": 0.0} for stage in STAGES},
+        "error": None,
+        "created_at": now,
+        "updated_at": now,
+    }
+    return str(db.ingest_jobs.insert_one(job).inserted_id)
+
+
+def get_job(db, job_id: str) -> Optional[Dict]:
+    try:
+        oid = ObjectId(job_id)
+    except Exception:
+        return None
+    return db.ingest_jobs.find_one({"_id": oid})
+
+
+def cancel_jobs(db, policy_id) -> int:
+    # a running job notices at its next checkpoint or, at the latest, when it persists
+    res = db.ingest_jobs.update_many(
+        {"policy_id": str(policy_id), "status": {"$in": ["queued", "running"]}},
+        {"$set": {"status": "cancelled", "updated_at": datetime.utcnow()}},
+    )
+    return res.modified_count
+
+
+def _is_cancelled(db, job_oid: ObjectId) -> bool:
+    job = db.ingest_jobs.find_one({"_id": job_oid}, {"status": 1})
+    return job is None or job["status"] == "cancelled"
+
+
+def _update_stage(db, job_oid: ObjectId, stage: str, **fields) -> None:
+    update = {f"stages.{stage}.{key}": value for key, value in fields.items()}
+    update["updated_at"] = datetime.utcnow()
+    db.ingest_jobs.update_one({"_id": job_oid}, {"$set": update})
+
+
+class _Progress:
+    # rate-limits progress writes so a 300-page PDF is not 300 Mongo updates
+    def __init__(self, db, job_oid: ObjectId, stage: str, interval: float = 1.0):
+        self.db = db
+        self.job_oid = job_oid
+        self.stage = stage
+        self.interval = interval
+        self.last = 0.0
+
+    def __call__(self, progress: float, **fields) -> None:
+        now = time.monotonic()
+        if now - self.last >= self.interval:
+            self.last = now
+            _update_stage(self.db, self.job_oid, self.stage, progress=round(progress, 3), **fields)
+
+
+# ---------- pipeline ----------
+
+def _run_job(db, job_id: str) -> None:
+    job_oid = ObjectId(job_id)
+    job = db.ingest_jobs.find_one_and_update(
+        {"_id": job_oid, "status": "queued"},
+        {"$set": {"status": "running", "updated_at": datetime.utcnow()}},
+        return_document=True,
+    )
+    if not job:
+        return  # claimed by another worker
+
+    policy_oid = ObjectId(job["policy_id"])
+    db.policies.update_one({"_id": policy_oid}, {"$set": {"ingest_status": "running"}})
+    running = ["download"]
+    try:
+        _update_stage(db, job_oid, "download", status="running", started_at=datetime.utcnow())
+        download = download_pdf(job["document_url"], checksum=True)
+        _update_stage(
+            db, job_oid, "download",
+            status="done", progress=1.0, bytes=download.size, finished_at=datetime.utcnow(),
+        )
+
+        # extract and embed overlap: batches are embedded while later pages are still parsed
+        model = get_sentence_model()
+        running = ["extract", "embed"]
+        for stage in running:
+            _update_stage(db, job_oid, stage, status="running", started_at=datetime.utcnow())
+        extract_progress = _Progress(db, job_oid, "extract")
+        embed_progress = _Progress(db, job_oid, "embed")
+        pages_done = {"fraction": 0.0}
+
+        def on_page(page: int, count: int) -> None:
+            pages_done["fraction"] = page / count
+            extract_progress(page / count, pages=count)
+
+        with download.file as pdf_file:
+            chunk_stream = iter_text_chunks_with_metadata(job["document_url"], pdf_file, on_page=on_page)
+            chunks, embeddings, index, cache_stats = embed_chunk_stream(
+                chunk_stream,
+                model,
+                db,
+                on_batch=lambda done: embed_progress(pages_done["fraction"], chunks=done),
+            )
+        now = datetime.utcnow()
+        _update_stage(db, job_oid, "extract", status="done", progress=1.0, finished_at=now)
+        _update_stage(
+            db, job_oid, "embed",
+            status="done", progress=1.0, chunks=len(chunks), finished_at=now,
+        )
+
+        if _is_cancelled(db, job_oid):
+            logger.info("Ingestion job %s cancelled before persist", job_id)
+            return
+
+        running = ["persist"]
+        _update_stage(db, job_oid, "persist", status="running", started_at=datetime.utcnow())
+        index_version = new_index_version()
+        save_policy_chunks(db, job["policy_id"], chunks)
+        lexical = BM25Index.build(chunk["content"] for chunk in chunks)
+        save_policy_index(job["policy_id"], embeddings, index, index_version, lexical)
+        res = db.policies.update_one(
+            {"_id": policy_oid},
+            {
+                "$set": {
+                    "index_version": index_version,
+                    "index_ready": True,
+                    "ingest_status": "ready",
+                    "ingest_stats": {
+                        "chunks": cache_stats.total,
+                        "embedded": cache_stats.encoded,
+                        "embedding_cache_hit_ratio": cache_stats.hit_ratio,
+                    },
+                    "updated_at": datetime.utcnow(),
+                }
+            },
+        )
+        if res.matched_count == 0:
+            # policy deleted while we were persisting: drop what was just written
+            delete_policy_chunks(db, job["policy_id"])
+            delete_policy_index(job["policy_id"])
+            db.ingest_jobs.update_one(
+                {"_id": job_oid},
+                {"$set": {"status": "cancelled", "updated_at": datetime.utcnow()}},
+            )
+            logger.info("Ingestion job %s cancelled: policy %s was deleted", job_id, job["policy_id"])
+            return
+
+        _update_stage(db, job_oid, "persist", status="done", progress=1.0, finished_at=datetime.utcnow())
+        db.ingest_jobs.update_one(
+            {"_id": job_oid, "status": "running"},
+            {"$set": {"status": "done", "updated_at": datetime.utcnow()}},
+        )
+        logger.info("Ingestion job %s done: %d chunks", job_id, len(chunks))
+
+    except Exception as e:
+        failed_in = "/".join(running)
+        logger.exception("Ingestion job %s failed in %s", job_id, failed_in)
+        for stage in running:
+            _update_stage(db, job_oid, stage, status="failed")
+        db.ingest_jobs.update_one(
+            {"_id": job_oid, "status": "running"},
+            {"$set": {"status": "failed", "error": f"{failed_in}: {e}", "updated_at": datetime.utcnow()}},
+        )
+        db.policies.update_one({"_id": policy_oid}, {"$set": {"ingest_status": "failed"}})
+
+
+def enqueue_job(db, job_id: str) -> None:
+    _get_executor().submit(_run_job, db, job_id)
+
+
+def resume_pending_jobs(db) -> int:
+    # jobs left "running" by a dead process are retried once they look abandoned
+    stale_before = datetime.utcnow() - timedelta(seconds=settings.INGEST_STALE_SECONDS)
+    db.ingest_jobs.update_many(
+        {"status": "running", "updated_at": {"$lt": stale_before}},
+        {"$set": {"status": "queued"}},
+    )
+    job_ids = [str(j["_id"]) for j in db.ingest_jobs.find({"status": "queued"}, {"_id": 1})]
+    for job_id in job_ids:
+        enqueue_job(db, job_id)
+    return len(job_ids)
@@ -0,0 +1,121 @@
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# words plus dotted/hyphenated codes kept whole: "4.1.2", "e11.9", "covid-19"
+_TOKEN = re.compile(r"[a-z0-9]+(?:[./-][a-z0-9]+)*")
+_CODE_SPLIT = re.compile(r"[./-]")
+_POLICY_PREFIX = re.compile(r"^\[Policy:[^\]]*\]\s*")
+
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have if in into is it its of on or "
+    "that the their there this to was were what when which who will with".split()
+)
+
+
+def tokenize(text: str) -> Iterator[str]:
+    for token in _TOKEN.findall(text.lower()):
+        if token in _STOPWORDS:
+            continue
+        yield token
+        # also index the parts, so "covid 19" still matches "covid-19"
+        if not token.isalnum():
+            for part in _CODE_SPLIT.split(token):
+                if part and part not in _STOPWORDS:
+                    yield part
+
+
+class BM25Index:
+    # sparse inverted index over chunk contents; doc id == chunk_id == FAISS row
+    def __init__(
+        self,
+        postings: Dict[str, Tuple[Sequence[int], Sequence[int]]],
+        doc_len: Sequence[int],
+        k1: float = 1.2,
+        b: float = 0.75,
+    ):
+        self.k1 = k1
+        self.b = b
+        self.doc_len = np.asarray(doc_len, dtype="float32")
+        self.avgdl = float(self.doc_len.mean()) if len(self.doc_len) else 0.0
+        self._raw = postings
+        self._postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+
+    @classmethod
+    def build(cls, contents: Iterable[str], k1: float = 1.2, b: float = 0.75) -> "BM25Index":
+        ids: Dict[str, List[int]] = defaultdict(list)
+        tfs: Dict[str, List[int]] = defaultdict(list)
+        doc_len: List[int] = []
+        for doc_id, content in enumerate(contents):
+            # the "[Policy: X]" prefix is on every chunk and carries no signal
+            counts = Counter(tokenize(_POLICY_PREFIX.sub("", content)))
+            doc_len.append(sum(counts.values()))
+            for term, tf in counts.items():
+                ids[term].append(doc_id)
+                tfs[term].append(tf)
+        return cls({t: (ids[t], tfs[t]) for t in ids}, doc_len, k1, b)
+
+    @property
+    def size(self) -> int:
+        return len(self.doc_len)
+
+    def _posting(self, term: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        posting = self._postings.get(term)
+        if posting is None:
+            raw = self._raw.get(term)
+            if raw is None:
+                return None
+            posting = (np.asarray(raw[0], dtype="int64"), np.asarray(raw[1], dtype="float32"))
+            self._postings[term] = posting
+        return posting
+
+    def search(self, query: str, top_k: int) -> List[Tuple[int, float]]:
+        if self.size == 0 or top_k <= 0:
+            return []
+        scores = np.zeros(self.size, dtype="float32")
+        norm = self.k1 * (1 - self.b + self.b * self.doc_len / (self.avgdl or 1.0))
+        for term in set(tokenize(query)):
+            posting = self._posting(term)
+            if posting is None:
+                continue
+            ids, tf = posting
+            idf = math.log(1 + (self.size - len(ids) + 0.5) / (len(ids) + 0.5))
+            scores[ids] += idf * tf * (self.k1 + 1) / (tf + norm[ids])
+
+        matched = np.flatnonzero(scores)
+        if len(matched) == 0:
+            return []
+        if len(matched) > top_k:
+            matched = matched[np.argpartition(-scores[matched], top_k - 1)[:top_k]]
+        matched = matched[np.argsort(-scores[matched], kind="stable")]
+        return [(int(i), float(scores[i])) for i in matched]
+
+    def to_json(self) -> Dict:
+        return {
+            "k1": self.k1,
+            "b": self.b,
+            "doc_len": [int(n) for n in self.doc_len],
+            "postings": {t: [list(map(int, p[0])), list(map(int, p[1]))] for t, p in self._raw.items()},
+        }
+
+    @classmethod
+    def from_json(cls, payload: Dict) -> "BM25Index":
+        postings = {t: (p[0], p[1]) for t, p in payload["postings"].items()}
+        return cls(postings, payload["doc_len"], payload.get("k1", 1.2), payload.get("b", 0.75))
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Sequence[Tuple[int, float]]],
+    k: int = 60,
+    top_k: Optional[int] = None,
+) -> List[Tuple[int, float]]:
+    # score(d) = sum over rankings of 1 / (k + rank); only ranks matter, not raw scores
+    fused: Dict[int, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, (doc_id, _) in enumerate(ranking):
+            fused[doc_id] += 1.0 / (k + rank + 1)
+    ordered = sorted(fused.items(), key=lambda item: item[1], reverse=True)
+    return ordered[:top_k] if top_k is not None else ordered
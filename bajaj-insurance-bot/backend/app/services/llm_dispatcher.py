@@ -0,0 +1,294 @@
+import asyncio
+import json
+import random
+import re
+import time
+from typing import AsyncIterator, Dict, Optional
+
+import httpx
+
+from app.core.config import settings
+from app.core.logger import logger
+from app.core.metrics import LLM_REQUESTS, LLM_TOKENS
+from app.core.tracing import span
+
+
+class LLMError(Exception):
+    pass
+
+
+class TokenBucket:
+    # continuous-refill bucket sized for one minute of budget
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.rate = float(per_minute) / 60.0
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float = 1.0) -> None:
+        amount = min(float(amount), self.capacity)
+        # waiters queue on the lock, so the bucket is served FIFO
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+    def adjust(self, delta: float) -> None:
+        # settle an estimate once the real usage is known (negative delta refunds)
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens - delta)
+
+
+_DURATION_PART = re.compile(r"([0-9]*\.?[0-9]+)(ms|h|m|s)")
+_TRY_AGAIN = re.compile(r"try again in ((?:[0-9]*\.?[0-9]+(?:ms|h|m|s))+)")
+
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    # "7", "7.5s", "2m59.56s", "450ms" -> seconds
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    scale = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+    return sum(float(num) * scale[unit] for num, unit in parts)
+
+
+def retry_after_hint(response: httpx.Response) -> Optional[float]:
+    hint = parse_duration(response.headers.get("retry-after"))
+    if hint is not None:
+        return hint
+    match = _TRY_AGAIN.search(response.text or "")
+    if match:
+        return parse_duration(match.group(1))
+    resets = [
+        parse_duration(response.headers.get(h))
+        for h in ("x-ratelimit-reset-requests", "x-ratelimit-reset-tokens")
+    ]
+    resets = [r for r in resets if r is not None]
+    return max(resets) if resets else None
+
+
+def estimate_tokens(body: Dict) -> int:
+    # rough prompt size (~4 chars/token) plus the completion we reserve for
+    prompt_chars = sum(len(m.get("content", "")) for m in body.get("messages", []))
+    return prompt_chars // 4 + int(body.get("max_tokens", 0))
+
+
+class LLMDispatcher:
+    def __init__(
+        self,
+        url: str,
+        api_key: Optional[str],
+        requests_per_minute: float,
+        tokens_per_minute: float,
+        max_concurrency: int,
+        max_retries: int,
+        backoff_base: float,
+        backoff_max: float,
+        timeout: float,
+    ):
+        self.url = url
+        self.api_key = api_key
+        self.requests_bucket = TokenBucket(requests_per_minute)
+        self.tokens_bucket = TokenBucket(tokens_per_minute)
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._paused_until = 0.0
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency,
+                    max_keepalive_connections=self.max_concurrency,
+                ),
+            )
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _backoff(self, attempt: int) -> float:
+        delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return delay * (0.5 + random.random() / 2)
+
+    async def _wait_for_pause(self) -> None:
+        # a 429 on any request pauses all of them until the server's hint expires
+        delay = self._paused_until - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def _headers(self) -> Dict[str, str]:
+        return {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+        }
+
+    async def _should_retry(self, response: httpx.Response, attempt: int) -> bool:
+        LLM_REQUESTS.inc(outcome="rate_limited" if response.status_code == 429 else "error")
+        if response.status_code == 429:
+            hint = retry_after_hint(response)
+            delay = hint + random.uniform(0, 0.25) if hint is not None else self._backoff(attempt)
+            if delay > self.backoff_max * 4:
+                return False
+            self._paused_until = max(self._paused_until, time.monotonic() + delay)
+            logger.warning("LLM rate limited, retrying in %.2fs (attempt %d)", delay, attempt + 1)
+            LLM_REQUESTS.inc(outcome="retry")
+            return True
+        if response.status_code >= 500:
+            await asyncio.sleep(self._backoff(attempt))
+            LLM_REQUESTS.inc(outcome="retry")
+            return True
+        return False
+
+    @staticmethod
+    def _record_usage(usage: Optional[Dict], estimate: int) -> None:
+        LLM_REQUESTS.inc(outcome="ok")
+        usage = usage or {}
+        LLM_TOKENS.inc(usage.get("prompt_tokens", estimate), kind="prompt")
+        LLM_TOKENS.inc(usage.get("completion_tokens", 0), kind="completion")
+
+    async def complete(self, body: Dict) -> str:
+        with span("llm"):
+            return await self._complete(body)
+
+    async def _complete(self, body: Dict) -> str:
+        estimate = estimate_tokens(body)
+
+        last_error = "no attempts made"
+        for attempt in range(self.max_retries + 1):
+            await self._wait_for_pause()
+            await self.requests_bucket.acquire(1)
+            await self.tokens_bucket.acquire(estimate)
+
+            try:
+                async with self._semaphore:
+                    response = await self._get_client().post(self.url, headers=self._headers(), json=body)
+            except httpx.TransportError as e:
+                self.tokens_bucket.adjust(-estimate)
+                LLM_REQUESTS.inc(outcome="error")
+                last_error = f"transport error: {e!r}"
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+
+            if response.status_code == 200:
+                data = response.json()
+                self._record_usage(data.get("usage"), estimate)
+                used = (data.get("usage") or {}).get("total_tokens")
+                if used is not None:
+                    self.tokens_bucket.adjust(used - estimate)
+                return data["choices"][0]["message"]["content"]
+
+            self.tokens_bucket.adjust(-estimate)
+            last_error = f"{response.status_code}\n{response.text}"
+            if not await self._should_retry(response, attempt):
+                break
+
+        raise LLMError(f"Groq API error: {last_error}")
+
+    async def stream(self, body: Dict) -> AsyncIterator[str]:
+        # yields content deltas; retries only until the first delta has been yielded
+        with span("llm"):
+            async for delta in self._stream(body):
+                yield delta
+
+    async def _stream(self, body: Dict) -> AsyncIterator[str]:
+        body = {**body, "stream": True}
+        estimate = estimate_tokens(body)
+
+        last_error = "no attempts made"
+        for attempt in range(self.max_retries + 1):
+            await self._wait_for_pause()
+            await self.requests_bucket.acquire(1)
+            await self.tokens_bucket.acquire(estimate)
+
+            started = False
+            usage = None
+            try:
+                async with self._semaphore:
+                    async with self._get_client().stream(
+                        "POST", self.url, headers=self._headers(), json=body
+                    ) as response:
+                        if response.status_code == 200:
+                            async for line in response.aiter_lines():
+                                if not line.startswith("data:"):
+                                    continue
+                                payload = line[len("data:"):].strip()
+                                if payload == "[DONE]":
+                                    break
+                                event = json.loads(payload)
+                                # groq reports usage on the last chunk under x_groq
+                                usage = event.get("usage") or (event.get("x_groq") or {}).get("usage") or usage
+                                for choice in event.get("choices") or []:
+                                    delta = (choice.get("delta") or {}).get("content")
+                                    if delta:
+                                        started = True
+                                        yield delta
+                            self._record_usage(usage, estimate)
+                            used = (usage or {}).get("total_tokens")
+                            self.tokens_bucket.adjust((used - estimate) if used is not None else 0)
+                            return
+                        await response.aread()
+            except httpx.TransportError as e:
+                self.tokens_bucket.adjust(-estimate)
+                LLM_REQUESTS.inc(outcome="error")
+                if started:
+                    raise LLMError(f"Groq API error: stream interrupted: {e!r}")
+                last_error = f"transport error: {e!r}"
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+
+            self.tokens_bucket.adjust(-estimate)
+            last_error = f"{response.status_code}\n{response.text}"
+            if not await self._should_retry(response, attempt):
+                break
+
+        raise LLMError(f"Groq API error: {last_error}")
+
+
+_dispatcher: Optional[LLMDispatcher] = None
+
+
+def get_dispatcher() -> LLMDispatcher:
+    global _dispatcher
+    if _dispatcher is None:
+        _dispatcher = LLMDispatcher(
+            url=settings.GROQ_API_URL,
+            api_key=settings.GROQ_API_KEY,
+            requests_per_minute=settings.GROQ_REQUESTS_PER_MINUTE,
+            tokens_per_minute=settings.GROQ_TOKENS_PER_MINUTE,
+            max_concurrency=settings.GROQ_MAX_CONCURRENCY,
+            max_retries=settings.GROQ_MAX_RETRIES,
+            backoff_base=settings.GROQ_BACKOFF_BASE,
+            backoff_max=settings.GROQ_BACKOFF_MAX,
+            timeout=settings.GROQ_TIMEOUT,
+        )
+    return _dispatcher
+
+
+async def close_dispatcher() -> None:
+    if _dispatcher is not None:
+        await _dispatcher.aclose()
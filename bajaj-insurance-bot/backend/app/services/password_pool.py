@@ -0,0 +1,85 @@
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Optional
+
+from passlib.context import CryptContext
+
+from app.core.config import settings
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+class PasswordPoolBusy(Exception):
+    def __init__(self, retry_after: int):
+        super().__init__("Password hashing pool is saturated")
+        self.retry_after = retry_after
+
+
+def hash_password(pw: str) -> str:
+    # optional safety for bcrypt 72‑byte limit
+    if len(pw) > 72:
+        pw = pw[:72]
+    return pwd_context.hash(pw)
+
+
+def verify_password(plain: str, hashed: str) -> bool:
+    return pwd_context.verify(plain, hashed)
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+_pending = 0
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # separate from the pdf pool and from FastAPI's threadpool, so a login
+            # burst only ever occupies these workers
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.PASSWORD_POOL_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+def shutdown_password_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(cancel_futures=True)
+            _pool = None
+
+
+def _release(_future) -> None:
+    global _pending
+    with _pool_lock:
+        _pending -= 1
+
+
+async def _submit(fn: Callable, *args):
+    global _pending
+    pool = _get_pool()
+    with _pool_lock:
+        if _pending >= settings.PASSWORD_POOL_MAX_PENDING:
+            # reject immediately rather than queue behind a storm of logins
+            raise PasswordPoolBusy(settings.PASSWORD_POOL_RETRY_AFTER)
+        _pending += 1
+    try:
+        future = pool.submit(fn, *args)
+    except Exception:
+        _release(None)
+        raise
+    future.add_done_callback(_release)
+    return await asyncio.wrap_future(future)
+
+
+async def hash_password_async(pw: str) -> str:
+    return await _submit(hash_password, pw)
+
+
+async def verify_password_async(plain: str, hashed: str) -> bool:
+    return await _submit(verify_password, plain, hashed)
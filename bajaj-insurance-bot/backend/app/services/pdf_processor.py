@@ -1,32 +1,125 @@
 import re
 import os
-from typing import List, Dict
-from io import BytesIO
+import hashlib
+import multiprocessing
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import groupby
+from typing import IO, Callable, List, Dict, Iterator, NamedTuple, Optional, Tuple, Union
 from urllib.parse import urlparse
 
 import pdfplumber
 import requests
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+import requests.adapters
 
+from app.core.config import settings
+from app.core.tracing import observe, span
+from app.services.chunker import TokenChunker, get_chunker
 
-def download_pdf_from_url(url: str) -> BytesIO:
-    response = requests.get(url)
-    if response.status_code != 200:
-        raise Exception(f"Failed to download PDF: {response.status_code}")
-    return BytesIO(response.content)
 
+class PDFDownloadError(Exception):
+    pass
 
-def smart_chunk_text(text: str, chunk_size=1000, chunk_overlap=200) -> List[str]:
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=chunk_size,
-        chunk_overlap=chunk_overlap,
-        separators=["\n\n", "\n", ".", " ", ""],
+
+class DownloadedPDF(NamedTuple):
+    file: Optional[IO[bytes]]  # None when the server answered 304 Not Modified
+    size: int
+    sha256: Optional[str]
+    etag: Optional[str]
+    last_modified: Optional[str]
+
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def _get_session() -> requests.Session:
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(
+                pool_connections=settings.PDF_DOWNLOAD_POOL_SIZE,
+                pool_maxsize=settings.PDF_DOWNLOAD_POOL_SIZE,
+            )
+            _session.mount("http://", adapter)
+            _session.mount("https://", adapter)
+        return _session
+
+
+def download_pdf(
+    url: str,
+    etag: Optional[str] = None,
+    last_modified: Optional[str] = None,
+    checksum: bool = False,
+    max_bytes: Optional[int] = None,
+) -> DownloadedPDF:
+    with span("download"):
+        return _download_pdf(url, etag, last_modified, checksum, max_bytes)
+
+
+def _download_pdf(
+    url: str,
+    etag: Optional[str],
+    last_modified: Optional[str],
+    checksum: bool,
+    max_bytes: Optional[int],
+) -> DownloadedPDF:
+    # streams into a spooled temp file: small PDFs stay in memory, large ones go to disk
+    max_bytes = settings.PDF_MAX_BYTES if max_bytes is None else max_bytes
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+
+    timeout = (settings.PDF_DOWNLOAD_CONNECT_TIMEOUT, settings.PDF_DOWNLOAD_READ_TIMEOUT)
+    with _get_session().get(url, headers=headers, stream=True, timeout=timeout) as response:
+        new_etag = response.headers.get("ETag") or etag
+        new_last_modified = response.headers.get("Last-Modified") or last_modified
+        if response.status_code == 304:
+            return DownloadedPDF(None, 0, None, new_etag, new_last_modified)
+        if response.status_code != 200:
+            raise PDFDownloadError(f"Failed to download PDF: {response.status_code}")
+
+        declared = response.headers.get("Content-Length")
+        if declared and declared.isdigit() and int(declared) > max_bytes:
+            raise PDFDownloadError(f"PDF too large: {declared} bytes (limit {max_bytes})")
+
+        digest = hashlib.sha256() if checksum else None
+        size = 0
+        spooled = tempfile.SpooledTemporaryFile(max_size=settings.PDF_SPOOL_MAX_MEMORY)
+        try:
+            for block in response.iter_content(chunk_size=64 * 1024):
+                size += len(block)
+                if size > max_bytes:
+                    raise PDFDownloadError(f"PDF too large: over {max_bytes} bytes")
+                if digest is not None:
+                    digest.update(block)
+                spooled.write(block)
+        except Exception:
+            spooled.close()
+            raise
+
+    spooled.seek(0)
+    return DownloadedPDF(
+        spooled,
+        size,
+        digest.hexdigest() if digest is not None else None,
+        new_etag,
+        new_last_modified,
     )
-    return splitter.split_text(text)
+
+
+def download_pdf_from_url(url: str) -> IO[bytes]:
+    return download_pdf(url).file
 
 
 def extract_policy_name(text: str) -> str:
-    matches = re.findall(r"\b(?:[A-Z][a-z]+\s?){1,6}Policy\b", text)
+    matches = _POLICY_NAME.findall(text)
     blacklist = {"Policyholder", "Policy Terms", "Policy Document", "Policy Year", "Policy Period"}
 
     for match in matches:
@@ -36,42 +129,164 @@ def extract_policy_name(text: str) -> str:
     return None
 
 
-def extract_text_chunks_with_metadata(
-    pdfurl: str,
-    pdf_path: BytesIO,
-    chunk_size: int = 1000,
-    overlap: int = 200,
-) -> List[Dict]:
-    chunks = []
-    chunk_id = 0
-    current_policy = None
+# ---------- page text extraction (serial or process-parallel) ----------
+
+_POLICY_NAME = re.compile(r"\b(?:[A-Z][a-z]+\s?){1,6}Policy\b")
+_NEWLINES = re.compile(r"\n+")
+_SPACES = re.compile(r"\s{2,}")
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
 
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: forking a threaded server process is not safe
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.PDF_EXTRACT_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+def shutdown_pdf_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(cancel_futures=True)
+            _pool = None
+
+
+def _clean_page_text(text: Optional[str]) -> str:
+    if not text:
+        return ""
+    cleaned_text = _NEWLINES.sub(" ", text).strip()
+    return _SPACES.sub(" ", cleaned_text)
+
+
+def _extract_page_range(pdf_path: str, start: int, end: int) -> List[Tuple[int, str]]:
+    # runs in a worker process; pages are 0-based [start, end)
     with pdfplumber.open(pdf_path) as pdf:
-        for page_number, page in enumerate(pdf.pages, start=1):
-            text = page.extract_text()
-            if not text:
-                continue
+        return [
+            (page_number + 1, _clean_page_text(pdf.pages[page_number].extract_text()))
+            for page_number in range(start, end)
+        ]
+
+
+def iter_page_texts(
+    pdf_file: Union[IO[bytes], str],
+    workers: Optional[int] = None,
+    on_page: Optional[Callable[[int, int], None]] = None,
+) -> Iterator[Tuple[int, str]]:
+    # yields (1-based page number, cleaned text) in page order;
+    # on_page(page_number, page_count) is called as each page is handed out.
+    # pdf_extract time excludes whatever the consumer does between pages
+    workers = settings.PDF_EXTRACT_WORKERS if workers is None else workers
+    extract_s = 0.0
+    start = time.perf_counter()
+    try:
+        with pdfplumber.open(pdf_file) as pdf:
+            page_count = len(pdf.pages)
+            if workers <= 1 or page_count < settings.PDF_PARALLEL_MIN_PAGES:
+                for page_number, page in enumerate(pdf.pages, start=1):
+                    if on_page:
+                        on_page(page_number, page_count)
+                    text = _clean_page_text(page.extract_text())
+                    extract_s += time.perf_counter() - start
+                    yield page_number, text
+                    start = time.perf_counter()
+                return
+        extract_s += time.perf_counter() - start
+        for page in _iter_pages_parallel(pdf_file, page_count, on_page):
+            extract_s += time.perf_counter() - start
+            yield page
+            start = time.perf_counter()
+    finally:
+        observe("pdf_extract", extract_s)
+
+
+def _iter_pages_parallel(
+    pdf_file: Union[IO[bytes], str],
+    page_count: int,
+    on_page: Optional[Callable[[int, int], None]],
+) -> Iterator[Tuple[int, str]]:
+    # workers need a path they can open themselves
+    tmp_path = None
+    if isinstance(pdf_file, str):
+        pdf_path = pdf_file
+    else:
+        pdf_file.seek(0)
+        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
+            shutil.copyfileobj(pdf_file, tmp)
+            tmp_path = pdf_path = tmp.name
 
-            cleaned_text = re.sub(r"\n+", " ", text).strip()
-            cleaned_text = re.sub(r"\s{2,}", " ", cleaned_text)
+    try:
+        step = settings.PDF_PAGES_PER_TASK
+        ranges = [(start, min(start + step, page_count)) for start in range(0, page_count, step)]
+        # map() submits every range up front and yields results in order,
+        # so later ranges keep extracting while the caller consumes earlier ones
+        results = _get_pool().map(
+            _extract_page_range,
+            [pdf_path] * len(ranges),
+            [start for start, _ in ranges],
+            [end for _, end in ranges],
+        )
+        for page_texts in results:
+            for page_number, text in page_texts:
+                if on_page:
+                    on_page(page_number, page_count)
+                yield page_number, text
+    finally:
+        if tmp_path:
+            os.remove(tmp_path)
 
+
+def iter_text_chunks_with_metadata(
+    pdfurl: str,
+    pdf_path: Union[IO[bytes], str],
+    chunker: Optional[TokenChunker] = None,
+    workers: Optional[int] = None,
+    on_page: Optional[Callable[[int, int], None]] = None,
+) -> Iterator[Dict]:
+    # streaming variant: chunks are yielded as soon as their text is extracted.
+    # chunks are sized in embedding-model tokens and flow across page breaks;
+    # "page"/"page_end" give the pages a chunk starts and ends on
+    chunker = chunker or get_chunker()
+    source = os.path.basename(urlparse(pdfurl).path)
+
+    def tagged_pages() -> Iterator[Tuple[Optional[str], int, str]]:
+        current_policy = None
+        for page_number, cleaned_text in iter_page_texts(pdf_path, workers, on_page):
+            if not cleaned_text:
+                continue
             detected_policy = extract_policy_name(cleaned_text)
             if detected_policy:
                 current_policy = detected_policy
+            yield current_policy, page_number, cleaned_text
+
+    chunk_id = 0
+    # a new policy name starts a new run of chunks (no text flows between policies)
+    for current_policy, run in groupby(tagged_pages(), key=lambda page: page[0]):
+        header = f"[Policy: {current_policy}]\n" if current_policy else ""
+        reserved = chunker.count([header])[0] if header else 0
+        for chunk in chunker.chunk_pages(((page, text) for _, page, text in run), reserved):
+            yield {
+                "source": source,
+                "page": chunk.page,
+                "page_end": chunk.page_end,
+                "chunk_id": chunk_id,
+                "policy": current_policy,
+                "content": header + chunk.text,
+            }
+            chunk_id += 1
+
 
-            chunked_texts = smart_chunk_text(cleaned_text, chunk_size, overlap)
-
-            for chunk in chunked_texts:
-                policy_tagged_chunk = f"[Policy: {current_policy}]\n{chunk}" if current_policy else chunk
-                chunks.append(
-                    {
-                        "source": os.path.basename(urlparse(pdfurl).path),
-                        "page": page_number,
-                        "chunk_id": chunk_id,
-                        "policy": current_policy,
-                        "content": policy_tagged_chunk,
-                    }
-                )
-                chunk_id += 1
-
-    return chunks
+def extract_text_chunks_with_metadata(
+    pdfurl: str,
+    pdf_path: Union[IO[bytes], str],
+    chunker: Optional[TokenChunker] = None,
+    workers: Optional[int] = None,
+) -> List[Dict]:
+    return list(iter_text_chunks_with_metadata(pdfurl, pdf_path, chunker, workers))
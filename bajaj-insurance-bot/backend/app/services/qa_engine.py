@@ -1,15 +1,16 @@
-import os
 import asyncio
-from typing import List
+from contextlib import aclosing
+from typing import AsyncIterator, List
 
-import requests
-from dotenv import load_dotenv
+from app.core.config import settings
+from app.core.logger import logger
+from app.services.context_packer import pack_context
+from app.services.llm_dispatcher import get_dispatcher
 
-load_dotenv()
+GROQ_API_KEY = settings.GROQ_API_KEY
 
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-
-print("GROQ_API_KEY from env:", GROQ_API_KEY[:5] if GROQ_API_KEY else None)
+if not GROQ_API_KEY:
+    logger.warning("GROQ_API_KEY is not set; LLM calls will be rejected")
 
 
 system_prompt = (
@@ -32,16 +33,9 @@ system_prompt = (
 )
 
 
-async def query_groq(question: str, context: str, model: str = "llama-3.3-70b-versatile") -> str:
-    url = "https://api.groq.com/openai/v1/chat/completions"
-    headers = {
-        "Authorization": f"Bearer {GROQ_API_KEY}",
-        "Content-Type": "application/json",
-    }
-
+def _build_body(question: str, context: str, model: str) -> dict:
     user_prompt = f"Context:\n{context}\n\nQuestion: {question}"
-
-    body = {
+    return {
         "model": model,
         "messages": [
             {"role": "system", "content": system_prompt},
@@ -51,19 +45,51 @@ async def query_groq(question: str, context: str, model: str = "llama-3.3-70b-ve
         "max_tokens": 700,
     }
 
-    await asyncio.sleep(1.5)
-
-    response = requests.post(url, headers=headers, json=body)
-    if response.status_code != 200:
-        raise Exception(f"Groq API error: {response.status_code}\n{response.text}")
-
-    answer = response.json()["choices"][0]["message"]["content"].strip()
 
+def _finalize_answer(answer: str) -> str:
+    answer = answer.strip()
     # enforce single sentence
     if "." in answer:
         answer = answer.split(".")[0].strip() + "."
     return answer
 
 
+async def query_groq(question: str, context: str, model: str = "llama-3.3-70b-versatile") -> str:
+    answer = await get_dispatcher().complete(_build_body(question, context, model))
+    return _finalize_answer(answer)
+
+
+async def stream_groq(
+    question: str,
+    context: str,
+    model: str = "llama-3.3-70b-versatile",
+) -> AsyncIterator[str]:
+    # answer deltas as they arrive; stops at the first sentence end, like _finalize_answer
+    async with aclosing(get_dispatcher().stream(_build_body(question, context, model))) as deltas:
+        async for delta in deltas:
+            if "." in delta:
+                yield delta.split(".")[0] + "."
+                return
+            yield delta
+
+
+async def query_groq_many(
+    questions: List[str],
+    contexts: List[str],
+    model: str = "llama-3.3-70b-versatile",
+) -> List[str]:
+    # fan out concurrently (the dispatcher enforces limits); answers keep question order
+    tasks = [
+        asyncio.ensure_future(query_groq(q, c, model))
+        for q, c in zip(questions, contexts)
+    ]
+    try:
+        return list(await asyncio.gather(*tasks))
+    finally:
+        for t in tasks:
+            t.cancel()
+
+
 def build_context_from_chunks(results: List[dict]) -> str:
-    return "\n\n".join([doc["content"] for doc in results])
+    # overlapping/adjacent hits merged, one policy header, capped at CONTEXT_TOKEN_BUDGET
+    return pack_context(results).text
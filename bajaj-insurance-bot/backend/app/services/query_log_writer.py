@@ -0,0 +1,108 @@
+import queue
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from app.api.deps import get_db
+from app.core.config import settings
+from app.core.logger import logger
+from app.services.analytics_service import record_queries
+
+
+class QueryLogWriter:
+    # takes query logs off the request path: bounded queue -> batched unordered inserts
+    def __init__(
+        self,
+        get_db: Callable,
+        max_queue: int,
+        batch_size: int,
+        flush_interval: float,
+        put_timeout: float = 0.0,
+    ):
+        self.get_db = get_db
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self._queue: "queue.Queue[Dict]" = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stats_lock = threading.Lock()
+        self._stats = {"enqueued": 0, "dropped": 0, "written": 0, "failed": 0, "flushes": 0}
+
+    def _count(self, key: str, n: int = 1) -> None:
+        with self._stats_lock:
+            self._stats[key] += n
+
+    def stats(self) -> Dict[str, int]:
+        with self._stats_lock:
+            return {**self._stats, "queued": self._queue.qsize()}
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="query-log-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, records: List[Dict]) -> int:
+        # never blocks longer than put_timeout; overflow is dropped and counted
+        accepted = 0
+        for record in records:
+            try:
+                if self.put_timeout > 0:
+                    self._queue.put(record, timeout=self.put_timeout)
+                else:
+                    self._queue.put_nowait(record)
+                accepted += 1
+            except queue.Full:
+                self._count("dropped")
+        if accepted:
+            self._count("enqueued", accepted)
+        if accepted < len(records):
+            logger.warning("Query log queue full, dropped %d records", len(records) - accepted)
+        return accepted
+
+    def _flush(self, batch: List[Dict]) -> None:
+        if not batch:
+            return
+        db = self.get_db()
+        try:
+            db.queries.insert_many(batch, ordered=False)
+            record_queries(db, batch)
+            self._count("written", len(batch))
+        except Exception:
+            logger.exception("Failed to write %d query logs", len(batch))
+            self._count("failed", len(batch))
+        finally:
+            self._count("flushes")
+
+    def _run(self) -> None:
+        batch: List[Dict] = []
+        deadline = time.monotonic() + self.flush_interval
+        while not (self._stop.is_set() and self._queue.empty()):
+            try:
+                batch.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+            except queue.Empty:
+                pass
+
+            if len(batch) >= self.batch_size or time.monotonic() >= deadline:
+                self._flush(batch)
+                batch = []
+                deadline = time.monotonic() + self.flush_interval
+        self._flush(batch)
+
+    def stop(self, timeout: float = 10.0) -> None:
+        # drains whatever is queued before returning
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+
+query_log_writer = QueryLogWriter(
+    get_db=get_db,
+    max_queue=settings.QUERY_LOG_QUEUE_SIZE,
+    batch_size=settings.QUERY_LOG_BATCH_SIZE,
+    flush_interval=settings.QUERY_LOG_FLUSH_INTERVAL,
+    put_timeout=settings.QUERY_LOG_PUT_TIMEOUT,
+)
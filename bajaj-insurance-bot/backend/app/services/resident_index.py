@@ -0,0 +1,61 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from app.core.metrics import CACHE_LOOKUPS
+
+
+class ResidentIndexCache:
+    # key -> (version, value, nbytes); least recently used goes first once the
+    # resident values (faiss indexes, BM25 postings) exceed max_bytes
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Tuple[str, Any, int]]" = OrderedDict()
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, key: Hashable, version: Optional[str]) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or (version is not None and entry[0] != version):
+                self._misses += 1
+                CACHE_LOOKUPS.inc(cache="resident_index", result="miss")
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+        CACHE_LOOKUPS.inc(cache="resident_index", result="hit")
+        return entry[1]
+
+    def put(self, key: Hashable, version: str, value: Any, nbytes: int) -> None:
+        with self._lock:
+            self._pop(key)
+            self._entries[key] = (version, value, nbytes)
+            self._bytes += nbytes
+            # always keep the entry just loaded, even if it alone is over budget
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                oldest = next(iter(self._entries))
+                self._pop(oldest)
+                self._evictions += 1
+
+    def _pop(self, key: Hashable) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+
+    def evict(self, key: Hashable) -> None:
+        with self._lock:
+            self._pop(key)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "resident": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+            }
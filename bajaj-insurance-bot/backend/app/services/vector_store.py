@@ -1,33 +1,217 @@
-from typing import List, Dict, Tuple
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
 
 import faiss
 import numpy as np
 from sentence_transformers import SentenceTransformer
 
+from app.core.config import settings
+from app.core.tracing import span
+from app.services.embedder import encode, get_model
+from app.services.embedding_cache import EmbeddingCacheStats, encode_with_cache
+from app.services.lexical_index import BM25Index, reciprocal_rank_fusion
+
 
 def get_sentence_model() -> SentenceTransformer:
-    # reuse model instead of reloading many times in future
-    return SentenceTransformer("all-MiniLM-L6-v2")
+    # process-wide instance from the embedder registry
+    return get_model()
 
 
 def embed_chunks_and_build_faiss_index(
     chunks: List[Dict],
     model: SentenceTransformer,
-) -> Tuple[np.ndarray, faiss.IndexFlatIP]:
+) -> Tuple[np.ndarray, faiss.Index]:
     texts = [chunk["content"] for chunk in chunks]
-    embeddings = model.encode(texts, convert_to_numpy=True, normalize_embeddings=True)
-    index = faiss.IndexFlatIP(embeddings.shape[1])
+    embeddings = encode(texts, model)
+    return embeddings, build_faiss_index(embeddings)
+
+
+def choose_index_kind(count: int) -> str:
+    if settings.INDEX_QUANTIZATION != "auto":
+        return settings.INDEX_QUANTIZATION
+    if count >= settings.INDEX_PQ_MIN_VECTORS:
+        return "pq"
+    if count >= settings.INDEX_SQ8_MIN_VECTORS:
+        return "sq8"
+    return "flat"
+
+
+_PQ_NBITS = 8
+_PQ_TRAIN_SAMPLE = (1 << _PQ_NBITS) * 40
+
+
+def _pq_subquantizers(dim: int) -> int:
+    # 4 dims per 1-byte code (384-d MiniLM -> 96 bytes per vector); coarser codes
+    # lose too much recall for the rerank to win back
+    m = max(1, dim // 4)
+    while dim % m:
+        m -= 1
+    return m
+
+
+def build_faiss_index(embeddings: np.ndarray, kind: Optional[str] = None) -> faiss.Index:
+    # flat (4 bytes/dim), int8 scalar quantizer (1 byte/dim) or PQ (1 byte per 4 dims)
+    embeddings = np.ascontiguousarray(embeddings, dtype="float32")
+    dim = embeddings.shape[1]
+    kind = kind or choose_index_kind(len(embeddings))
+    if kind == "pq" and len(embeddings) < 1 << _PQ_NBITS:
+        # PQ training needs at least one point per centroid, even when pq is forced
+        kind = "sq8"
+    if kind == "sq8":
+        index = faiss.IndexScalarQuantizer(dim, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_INNER_PRODUCT)
+        index.train(embeddings)
+    elif kind == "pq":
+        index = faiss.IndexPQ(dim, _pq_subquantizers(dim), _PQ_NBITS, faiss.METRIC_INNER_PRODUCT)
+        # 256 centroids per sub-quantizer only need ~39 points each; a sample trains as well
+        sample = embeddings
+        if len(sample) > _PQ_TRAIN_SAMPLE:
+            rows = np.random.default_rng(0).choice(len(sample), _PQ_TRAIN_SAMPLE, replace=False)
+            sample = embeddings[np.sort(rows)]
+        index.train(sample)
+    else:
+        index = faiss.IndexFlatIP(dim)
     index.add(embeddings)
-    return embeddings, index
+    return index
+
+
+def embed_chunk_stream(
+    chunk_stream: Iterable[Dict],
+    model: SentenceTransformer,
+    db,
+    batch_size: int = 256,
+    model_name: str | None = None,
+    on_batch: Optional[Callable[[int], None]] = None,
+) -> Tuple[List[Dict], np.ndarray, faiss.Index, EmbeddingCacheStats]:
+    # embed batches while extraction is still producing later pages
+    model_name = model_name or settings.EMBEDDING_MODEL
+    chunks: List[Dict] = []
+    parts: List[np.ndarray] = []
+    total = hits = encoded = 0
+
+    def flush(batch: List[Dict]) -> None:
+        nonlocal total, hits, encoded
+        embeddings, stats = encode_with_cache([c["content"] for c in batch], model, model_name, db)
+        parts.append(embeddings)
+        total, hits, encoded = total + stats.total, hits + stats.hits, encoded + stats.encoded
+        if on_batch:
+            on_batch(total)
+
+    batch: List[Dict] = []
+    for chunk in chunk_stream:
+        chunks.append(chunk)
+        batch.append(chunk)
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+    if batch or not parts:
+        flush(batch)
+
+    embeddings = np.vstack(parts)
+    return chunks, embeddings, build_faiss_index(embeddings), EmbeddingCacheStats(total, hits, encoded)
+
+
+def encode_queries(queries: List[str], model: SentenceTransformer) -> np.ndarray:
+    # one forward pass for every question of a request
+    return encode(queries, model)
+
+
+def search_top_k(
+    query_embeddings: np.ndarray,
+    index: faiss.Index,
+    top_k: int = 5,
+    embeddings: Optional[np.ndarray] = None,
+) -> List[List[Tuple[int, float]]]:
+    top_k = min(top_k, index.ntotal)
+    if top_k <= 0 or len(query_embeddings) == 0:
+        return [[] for _ in range(len(query_embeddings))]
+
+    with span("faiss_search"):
+        return _search_top_k(np.ascontiguousarray(query_embeddings, dtype="float32"), index, top_k, embeddings)
+
+
+def _search_top_k(
+    query_embeddings: np.ndarray,
+    index: faiss.Index,
+    top_k: int,
+    embeddings: Optional[np.ndarray],
+) -> List[List[Tuple[int, float]]]:
+    # quantized index: over-fetch, then re-score exactly against the float32 vectors
+    rerank = embeddings is not None and not isinstance(index, faiss.IndexFlat)
+    if rerank:
+        factor = settings.INDEX_PQ_RERANK_FACTOR if isinstance(index, faiss.IndexPQ) else settings.INDEX_RERANK_FACTOR
+        k = min(index.ntotal, top_k * factor)
+    else:
+        k = top_k
+    scores, indices = index.search(query_embeddings, k)
+    if not rerank:
+        return [
+            [(int(i), float(s)) for i, s in zip(row_ids, row_scores) if i >= 0]
+            for row_ids, row_scores in zip(indices, scores)
+        ]
+
+    results = []
+    for query, row_ids in zip(query_embeddings, indices):
+        row_ids = row_ids[row_ids >= 0]
+        exact = np.asarray(embeddings[row_ids], dtype="float32") @ query
+        best = np.argsort(-exact, kind="stable")[:top_k]
+        results.append([(int(row_ids[j]), float(exact[j])) for j in best])
+    return results
+
+
+def hybrid_search(
+    queries: List[str],
+    query_embeddings: np.ndarray,
+    index: faiss.Index,
+    lexical: Optional[BM25Index],
+    top_k: int = 5,
+    embeddings: Optional[np.ndarray] = None,
+) -> List[List[Tuple[int, float]]]:
+    # dense + BM25 candidates fused by rank; each hit keeps its dense (cosine) score
+    if lexical is None or not settings.HYBRID_RETRIEVAL:
+        return search_top_k(query_embeddings, index, top_k, embeddings)
+
+    candidates = max(top_k, settings.HYBRID_CANDIDATES)
+    dense = search_top_k(query_embeddings, index, candidates, embeddings)
+    results = []
+    for query, query_emb, dense_row in zip(queries, query_embeddings, dense):
+        with span("bm25_search"):
+            lexical_row = lexical.search(query, candidates)
+        fused = reciprocal_rank_fusion(
+            [dense_row, lexical_row],
+            k=settings.HYBRID_RRF_K,
+            top_k=top_k,
+        )
+        dense_scores = dict(dense_row)
+        lexical_only = [i for i, _ in fused if i not in dense_scores]
+        if lexical_only:
+            ids = np.asarray(lexical_only, dtype="int64")
+            if embeddings is not None:
+                vectors = np.asarray(embeddings[ids], dtype="float32")
+            else:
+                vectors = index.reconstruct_batch(ids)
+            dense_scores.update(zip(lexical_only, (vectors @ query_emb).tolist()))
+        results.append([(i, float(dense_scores[i])) for i, _ in fused])
+    return results
+
+
+def retrieve_top_k_faiss_batch(
+    queries: List[str],
+    chunks: List[Dict],
+    index: faiss.Index,
+    model: SentenceTransformer,
+    top_k: int = 5,
+    lexical: Optional[BM25Index] = None,
+    embeddings: Optional[np.ndarray] = None,
+) -> List[List[Dict]]:
+    query_embeddings = encode_queries(queries, model)
+    hits = hybrid_search(queries, query_embeddings, index, lexical, top_k, embeddings)
+    return [[{**chunks[i], "score": score} for i, score in row] for row in hits]
 
 
 def retrieve_top_k_faiss(
     query: str,
     chunks: List[Dict],
-    index: faiss.IndexFlatIP,
+    index: faiss.Index,
     model: SentenceTransformer,
     top_k: int = 5,
 ) -> List[Dict]:
-    query_embedding = model.encode([query], convert_to_numpy=True, normalize_embeddings=True)
-    scores, indices = index.search(query_embedding, top_k)
-    return [chunks[i] for i in indices[0]]
+    return retrieve_top_k_faiss_batch([query], chunks, index, model, top_k)[0]
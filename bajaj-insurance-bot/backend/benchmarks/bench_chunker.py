@@ -0,0 +1,102 @@
+# Token-aware chunker vs. the old 1000-char RecursiveCharacterTextSplitter (one per page).
+#
+#   cd backend && python -m benchmarks.bench_chunker --pages 200
+#
+# Uses the embedding model's tokenizer when it is available locally; otherwise a
+# WordPiece tokenizer trained on the synthetic pages (same algorithm as MiniLM's).
+# "truncated" is the share of chunk tokens past the model window, i.e. text that is
+# stored and sent to the LLM but never embedded.
+import argparse
+import time
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.chunker import TokenChunker
+
+_WINDOW = 256  # all-MiniLM-L6-v2 max_seq_length
+_WORDS = (
+    "the insured person policy hospitalisation expenses room rent sum insured waiting period "
+    "claim exclusion maternity cover premium deductible co-payment network hospital cashless "
+    "day care pre-existing disease benefit treatment ambulance renewal grace period nominee "
+    "shall be payable subject to limits specified in schedule company will not"
+).split()
+
+
+def _pages(rng, count: int):
+    pages = []
+    for page in range(1, count + 1):
+        sentences = []
+        for _ in range(rng.integers(25, 45)):
+            clause = f"{rng.integers(1, 9)}.{rng.integers(1, 20)} " if rng.random() < 0.2 else ""
+            words = " ".join(rng.choice(_WORDS, rng.integers(8, 30)))
+            sentences.append(f"{clause}{words.capitalize()}.")
+        pages.append((page, " ".join(sentences)))
+    return pages
+
+
+def _tokenizer(pages):
+    try:
+        from transformers import AutoTokenizer
+
+        return AutoTokenizer.from_pretrained(settings.EMBEDDING_MODEL, local_files_only=True), "model"
+    except Exception:
+        from tokenizers import BertWordPieceTokenizer
+        from transformers import PreTrainedTokenizerFast
+
+        trainer = BertWordPieceTokenizer(lowercase=True)
+        trainer.train_from_iterator((text for _, text in pages), vocab_size=2000)
+        return PreTrainedTokenizerFast(tokenizer_object=trainer._tokenizer), "wordpiece (trained locally)"
+
+
+def _old_splitter(pages):
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    chunks = []
+    for _, text in pages:
+        splitter = RecursiveCharacterTextSplitter(
+            chunk_size=1000,
+            chunk_overlap=200,
+            separators=["\n\n", "\n", ".", " ", ""],
+        )
+        chunks.extend(splitter.split_text(text))
+    return chunks
+
+
+def _report(name, seconds, pages, token_counts):
+    counts = np.asarray(token_counts)
+    embedded = np.minimum(counts, _WINDOW - 2).sum()
+    print(
+        f"{name:>8}: {len(pages) / seconds:8.1f} pages/s  {len(counts):5d} chunks  "
+        f"tokens/chunk mean {counts.mean():6.1f} max {counts.max():4d}  "
+        f"truncated {1 - embedded / counts.sum():6.1%}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--overlap", type=int, default=settings.CHUNK_OVERLAP_TOKENS)
+    args = parser.parse_args()
+
+    pages = _pages(np.random.default_rng(0), args.pages)
+    tokenizer, kind = _tokenizer(pages)
+    chunker = TokenChunker(tokenizer, _WINDOW - 2, args.overlap)
+    print(f"pages={args.pages} tokenizer={kind}")
+
+    start = time.perf_counter()
+    old = _old_splitter(pages)
+    old_s = time.perf_counter() - start
+    # counting is not part of the old splitter's cost
+    _report("splitter", old_s, pages, chunker.count(old))
+
+    start = time.perf_counter()
+    new = list(chunker.chunk_pages(pages))
+    new_s = time.perf_counter() - start
+    _report("tokens", new_s, pages, [c.tokens for c in new])
+    spanning = sum(c.page != c.page_end for c in new)
+    print(f"token chunks spanning a page break: {spanning}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,358 @@
+# End-to-end benchmark: the ingest/retrieval stages in isolation, then /user/query,
+# /user/query/stream and /bajaj-model over HTTP (uvicorn) against an in-memory Mongo
+# stand-in and a local Groq-compatible server.
+#
+#   cd backend && python -m benchmarks.bench_e2e --pages 300 --save benchmarks/baselines/local.json
+#   cd backend && python -m benchmarks.bench_e2e --pages 300 --compare benchmarks/baselines/local.json
+#
+# Needs `pip install -r benchmarks/requirements.txt` and the embedding model (HF cache or
+# network). --hash-embedder swaps in a hashing stand-in so the harness itself can be
+# smoke-tested offline; its numbers say nothing about the real model.
+import argparse
+import io
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from benchmarks.fake_groq import FakeGroqServer
+from benchmarks.synthetic_pdf import policy_pdf
+
+_SUBJECTS = [
+    "room rent",
+    "pre-existing diseases",
+    "maternity expenses",
+    "day care treatment",
+    "ambulance charges",
+    "organ donor expenses",
+    "domiciliary hospitalisation",
+    "ICU charges",
+    "cataract surgery",
+    "AYUSH treatment",
+]
+_ASPECTS = [
+    "What is the waiting period for",
+    "Is there a sub-limit on",
+    "What co-payment applies to",
+    "How do I claim",
+    "Are there exclusions for",
+    "What documents are needed for",
+    "Is cashless available for",
+    "How much is covered for",
+]
+
+
+def _questions(count: int) -> List[str]:
+    pairs = [(a, s) for s in _SUBJECTS for a in _ASPECTS]
+    return [f"{pairs[i % len(pairs)][0]} {pairs[i % len(pairs)][1]}?" for i in range(count)]
+
+
+def _percentiles(prefix: str, latencies_s: List[float], metrics: Dict[str, float]) -> None:
+    if not latencies_s:
+        return
+    p50, p95, p99 = np.percentile(np.asarray(latencies_s) * 1000, [50, 95, 99])
+    metrics[f"{prefix}.p50_ms"] = round(float(p50), 2)
+    metrics[f"{prefix}.p95_ms"] = round(float(p95), 2)
+    metrics[f"{prefix}.p99_ms"] = round(float(p99), 2)
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except Exception:
+        return None
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class _HashTokenizer:
+    # whitespace "tokens"; just enough tokenizer surface for the chunker and packer
+    def __call__(self, texts, **kwargs):
+        return {"input_ids": [t.split() for t in texts]}
+
+    def tokenize(self, text):
+        return text.split()
+
+
+class _HashEmbedder:
+    # --hash-embedder: bag of hashed words, 384-d, normalized
+    max_seq_length = 256
+    tokenizer = _HashTokenizer()
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def get_sentence_embedding_dimension(self):
+        return 384
+
+    def encode(self, texts, normalize_embeddings=True, **kwargs):
+        out = np.zeros((len(texts), 384), dtype="float32")
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                out[row, hash(word) % 384] += 1.0
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        return out / np.where(norms == 0, 1, norms)
+
+
+def _configure_env(tmp_dir: str, groq: FakeGroqServer) -> None:
+    # read by app.core.config at import time
+    os.environ.update(
+        {
+            "INDEX_DIR": os.path.join(tmp_dir, "indices"),
+            "DOC_CACHE_DIR": os.path.join(tmp_dir, "doc_cache"),
+            "GROQ_API_URL": groq.chat_url,
+            "GROQ_API_KEY": "bench",
+            # measure the service, not our own client-side rate limiter
+            "GROQ_REQUESTS_PER_MINUTE": "1000000",
+            "GROQ_TOKENS_PER_MINUTE": "1000000000",
+            "GROQ_BACKOFF_BASE": "0.1",
+        }
+    )
+
+
+def _stages(args, metrics: Dict[str, float], pdf: bytes, url: str) -> None:
+    from app.services import embedder
+    from app.services.pdf_processor import extract_text_chunks_with_metadata
+    from app.services.vector_store import embed_chunks_and_build_faiss_index, retrieve_top_k_faiss
+
+    start = time.perf_counter()
+    model = embedder.get_model()
+    embedder.encode(["warm-up"], model)
+    metrics["embedder.load_s"] = round(time.perf_counter() - start, 3)
+
+    start = time.perf_counter()
+    chunks = extract_text_chunks_with_metadata(url, io.BytesIO(pdf))
+    seconds = time.perf_counter() - start
+    metrics["extract.pages_per_s"] = round(args.pages / seconds, 2)
+    metrics["extract.chunks_per_s"] = round(len(chunks) / seconds, 2)
+    metrics["extract.chunks"] = len(chunks)
+
+    start = time.perf_counter()
+    _, index = embed_chunks_and_build_faiss_index(chunks, model)
+    metrics["embed.chunks_per_s"] = round(len(chunks) / (time.perf_counter() - start), 2)
+
+    latencies = []
+    for question in _questions(args.requests):
+        start = time.perf_counter()
+        retrieve_top_k_faiss(question, chunks, index, model)
+        latencies.append(time.perf_counter() - start)
+    _percentiles("retrieve", latencies, metrics)
+
+
+def _drive(
+    name: str,
+    call: Callable[[int], float],
+    requests: int,
+    concurrency: int,
+    metrics: Dict[str, float],
+) -> None:
+    # call(i) -> seconds; raises on a failed request
+    latencies: List[float] = []
+    errors = 0
+
+    def one(i: int):
+        nonlocal errors
+        try:
+            latencies.append(call(i))
+        except Exception as e:
+            errors += 1
+            print(f"  {name} request {i} failed: {e}", file=sys.stderr)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(requests)))
+    metrics[f"{name}.requests_per_s"] = round(requests / (time.perf_counter() - start), 2)
+    metrics[f"{name}.errors"] = errors
+    _percentiles(name, latencies, metrics)
+
+
+def _endpoints(args, metrics: Dict[str, float], groq: FakeGroqServer, policy_url: str, doc_url: str) -> None:
+    import httpx
+    import mongomock
+    import uvicorn
+
+    import app.api.deps as deps
+
+    deps.db = mongomock.MongoClient()[os.environ.get("DB_NAME", "bajaj_insurance")]
+    from app.main import app
+
+    app.dependency_overrides[deps.get_db] = lambda: deps.db
+
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    server.install_signal_handlers = lambda: None  # not on the main thread
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    base = f"http://127.0.0.1:{port}"
+
+    try:
+        with httpx.Client(base_url=base, timeout=300) as client:
+            # ingestion (download, extract, chunk, embed, persist) through the job queue
+            start = time.perf_counter()
+            job = client.post(
+                "/admin/policies",
+                json={
+                    "insurance_type": "Health",
+                    "policy_name": "Care Shield",
+                    "policy_year": "2024",
+                    "document_url": policy_url,
+                    "publish": True,
+                },
+            ).json()
+            while True:
+                status = client.get(f"/admin/jobs/{job['job_id']}").json()
+                if status["status"] in ("done", "failed"):
+                    break
+                time.sleep(0.1)
+            if status["status"] != "done":
+                raise RuntimeError(f"ingestion failed: {status.get('error')}")
+            metrics["ingest.pages_per_s"] = round(args.pages / (time.perf_counter() - start), 2)
+
+            questions = _questions(args.requests)
+            selection = {"insurance_type": "Health", "policy_name": "Care Shield", "policy_year": "2024"}
+
+            def user_query(i: int) -> float:
+                start = time.perf_counter()
+                response = client.post("/user/query", json={**selection, "questions": [questions[i]]})
+                response.raise_for_status()
+                return time.perf_counter() - start
+
+            first_token: List[float] = []
+
+            def user_query_stream(i: int) -> float:
+                # distinct wording from /user/query so the answer cache does not serve it
+                body = {**selection, "questions": [f"Please explain: {questions[i]}"]}
+                start = time.perf_counter()
+                with client.stream("POST", "/user/query/stream", params={"deltas": True}, json=body) as response:
+                    response.raise_for_status()
+                    first = None
+                    for line in response.iter_lines():
+                        if first is None and line.startswith("event: delta"):
+                            first = time.perf_counter() - start
+                first_token.append(first if first is not None else time.perf_counter() - start)
+                return time.perf_counter() - start
+
+            def bajaj_model(i: int) -> float:
+                start = time.perf_counter()
+                response = client.post("/bajaj-model", json={"documents": doc_url, "questions": [questions[i]]})
+                response.raise_for_status()
+                return time.perf_counter() - start
+
+            _drive("user_query", user_query, args.requests, args.concurrency, metrics)
+            _drive("user_query_stream", user_query_stream, args.requests, args.concurrency, metrics)
+            _percentiles("user_query_stream.first_token", first_token, metrics)
+
+            # first /bajaj-model call pays for download + extract + embed; the rest hit the cache
+            metrics["bajaj_model.cold_s"] = round(bajaj_model(0), 3)
+            _drive("bajaj_model", bajaj_model, args.requests, args.concurrency, metrics)
+    finally:
+        server.should_exit = True
+        thread.join(timeout=30)
+
+    metrics["llm.requests"] = groq.requests
+    metrics["llm.throttled"] = groq.throttled
+
+
+def _lower_is_better(metric: str) -> bool:
+    return metric.endswith(("_ms", "_s", ".errors", ".throttled")) and not metric.endswith("_per_s")
+
+
+def compare(baseline: Dict, current: Dict) -> None:
+    old, new = baseline["metrics"], current["metrics"]
+    print(f"\nvs. baseline {baseline['meta'].get('revision')} ({baseline['meta'].get('created_at')})")
+    print(f"{'metric':<38}{'baseline':>12}{'current':>12}{'change':>10}")
+    for metric in sorted(set(old) | set(new)):
+        a, b = old.get(metric), new.get(metric)
+        if a is None or b is None:
+            print(f"{metric:<38}{str(a):>12}{str(b):>12}{'':>10}")
+            continue
+        change = (b - a) / a * 100 if a else 0.0
+        worse = change > 0 if _lower_is_better(metric) else change < 0
+        flag = " !" if worse and abs(change) >= 10 else ""
+        print(f"{metric:<38}{a:>12}{b:>12}{change:>+9.1f}%{flag}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=300)
+    parser.add_argument("--requests", type=int, default=50, help="requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="fake Groq latency (s)")
+    parser.add_argument("--llm-jitter", type=float, default=0.05)
+    parser.add_argument("--llm-429-rate", type=float, default=0.05, help="share of LLM calls answered 429")
+    parser.add_argument("--llm-retry-after", type=float, default=0.5)
+    parser.add_argument("--hash-embedder", action="store_true", help="offline smoke test of the harness")
+    parser.add_argument("--skip-stages", action="store_true")
+    parser.add_argument("--skip-endpoints", action="store_true")
+    parser.add_argument("--save", help="write results as a JSON baseline")
+    parser.add_argument("--compare", help="diff results against a saved JSON baseline")
+    args = parser.parse_args()
+
+    groq = FakeGroqServer(args.llm_latency, args.llm_jitter, args.llm_429_rate, args.llm_retry_after).start()
+    tmp_dir = tempfile.mkdtemp(prefix="bench-e2e-")
+    _configure_env(tmp_dir, groq)
+
+    if args.hash_embedder:
+        import app.services.embedder as embedder
+
+        embedder.SentenceTransformer = _HashEmbedder
+
+    pdf = policy_pdf(args.pages, seed=0)
+    policy_url = groq.add_file("policy.pdf", pdf)
+    doc_url = groq.add_file("document.pdf", policy_pdf(args.pages, seed=1, name="Family Floater"))
+
+    metrics: Dict[str, float] = {}
+    try:
+        if not args.skip_stages:
+            _stages(args, metrics, pdf, policy_url)
+        if not args.skip_endpoints:
+            _endpoints(args, metrics, groq, policy_url, doc_url)
+    finally:
+        groq.stop()
+
+    from app.core.config import settings
+    from app.services import embedder
+
+    result = {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "revision": _git_revision(),
+            "python": sys.version.split()[0],
+            "cpus": os.cpu_count(),
+            "embedding_model": settings.EMBEDDING_MODEL,
+            "embedding": embedder.backend_info(),
+            "hash_embedder": args.hash_embedder,
+            "args": {k: v for k, v in vars(args).items() if k not in ("save", "compare")},
+        },
+        "metrics": metrics,
+    }
+    for metric, value in metrics.items():
+        print(f"{metric:<38}{value:>12}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), result)
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"\nbaseline written to {args.save}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# Embedding backends on CPU: ingest throughput, per-question latency, drift vs. torch.
+#
+#   cd backend && python -m benchmarks.bench_embedder --backends torch onnx onnx-int8
+#
+# Needs the model files (HF cache or network) and `pip install sentence-transformers[onnx]`.
+import argparse
+import statistics
+import time
+
+import numpy as np
+
+from app.core.config import settings
+from app.services import embedder
+
+_WORDS = (
+    "policy insured hospitalisation expenses room rent sum waiting period claim exclusion "
+    "maternity cover premium deductible co-payment network hospital cashless day care "
+    "pre-existing disease benefit treatment ambulance renewal grace period nominee"
+).split()
+
+
+def _texts(rng, n: int, words: int):
+    return [" ".join(rng.choice(_WORDS, rng.integers(words // 2, words * 2))) for _ in range(n)]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx", "onnx-int8"])
+    parser.add_argument("--chunks", type=int, default=512)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--fixed-batch", type=int, default=32, help="baseline: encode(batch_size=N)")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    chunks = _texts(rng, args.chunks, 120)
+    questions = _texts(rng, args.queries, 8)
+
+    reference = None
+    print(f"threads={settings.EMBEDDING_THREADS} batch_tokens={settings.EMBEDDING_BATCH_TOKENS}")
+    for backend in args.backends:
+        settings.EMBEDDING_BACKEND = backend
+        settings.EMBEDDING_PARITY_MAX_DRIFT = 1.0  # report drift here, don't fall back
+        embedder._models.clear()
+        model = embedder.get_model()
+        info = embedder.backend_info()
+        if info["backend"] != backend:
+            print(f"{backend:>9}: unavailable, skipped")
+            continue
+        embedder.encode(["warm-up"], model)
+
+        start = time.perf_counter()
+        model.encode(chunks, batch_size=args.fixed_batch, convert_to_numpy=True, normalize_embeddings=True)
+        fixed_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        vectors = embedder.encode(chunks, model)
+        adaptive_s = time.perf_counter() - start
+
+        latencies = []
+        for q in questions:
+            start = time.perf_counter()
+            embedder.encode([q], model)
+            latencies.append((time.perf_counter() - start) * 1000)
+        latencies.sort()
+
+        if reference is None:
+            reference = vectors
+        drift = float(1.0 - np.min(np.sum(vectors * reference, axis=1)))
+        print(
+            f"{backend:>9}: ingest {args.chunks / fixed_s:7.1f} chunks/s (batch {args.fixed_batch}), "
+            f"{args.chunks / adaptive_s:7.1f} chunks/s (adaptive)  "
+            f"question p50 {statistics.median(latencies):.2f} ms p95 {latencies[int(len(latencies) * 0.95) - 1]:.2f} ms  "
+            f"max drift vs {args.backends[0]} {drift:.5f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
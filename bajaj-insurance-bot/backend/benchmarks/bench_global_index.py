@@ -0,0 +1,80 @@
+# One global (sharded, IVF) search vs. N per-policy flat searches.
+#
+#   cd backend && python -m benchmarks.bench_global_index --policies 200 --chunks 400
+#
+# Vectors are synthetic "topics" plus noise (real chunk embeddings cluster the
+# same way); recall is measured against exact search over all policies.
+import argparse
+import time
+
+import faiss
+import numpy as np
+
+from app.core.config import settings
+from app.services.global_index import _Shard
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--policies", type=int, default=200)
+    parser.add_argument("--chunks", type=int, default=400)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--nprobe", type=int, default=settings.GLOBAL_INDEX_NPROBE)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+
+    def normalize(v):
+        return (v / np.linalg.norm(v, axis=1, keepdims=True)).astype("float32")
+
+    topics = normalize(rng.standard_normal((256, args.dim)))
+
+    def unit(n):
+        noise = rng.standard_normal((n, args.dim)) * 0.6 / np.sqrt(args.dim)
+        return normalize(topics[rng.integers(0, len(topics), n)] + noise)
+
+    policies = [unit(args.chunks) for _ in range(args.policies)]
+    queries = unit(args.queries)
+
+    flat = []
+    for emb in policies:
+        index = faiss.IndexFlatIP(args.dim)
+        index.add(emb)
+        flat.append(index)
+
+    settings.GLOBAL_INDEX_NPROBE = args.nprobe
+    shard = _Shard(args.dim)
+    start = time.perf_counter()
+    for slot, emb in enumerate(policies):
+        shard.add(slot, emb)
+    build_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    per_policy = []
+    for index in flat:
+        per_policy.append(index.search(queries, args.top_k))
+    flat_s = time.perf_counter() - start
+    # exact global top-k from the per-policy results
+    all_scores = np.concatenate([s for s, _ in per_policy], axis=1)
+    all_ids = np.concatenate(
+        [(slot << 24) + ids for slot, (_, ids) in enumerate(per_policy)], axis=1
+    )
+    order = np.argsort(-all_scores, axis=1)[:, : args.top_k]
+    exact = np.take_along_axis(all_ids, order, axis=1)
+
+    start = time.perf_counter()
+    _, ids = shard.search(queries, args.top_k, None)
+    global_s = time.perf_counter() - start
+
+    recall = np.mean([len(set(a) & set(b)) / args.top_k for a, b in zip(exact, ids)])
+    kind = "ivf" if shard.trained_on else "flat"
+    print(f"policies={args.policies} chunks/policy={args.chunks} vectors={shard.ntotal} shard={kind}")
+    print(f"shard build: {build_s:.2f}s")
+    print(f"{args.policies} flat searches: {flat_s * 1000 / args.queries:.2f} ms/query")
+    print(f"global shard search:    {global_s * 1000 / args.queries:.2f} ms/query  recall@{args.top_k}={recall:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# Flat vs. int8 scalar-quantized vs. PQ per-policy indexes: size, recall, latency.
+#
+#   cd backend && python -m benchmarks.bench_index_quantization --chunks 20000
+#
+# Recall@k is against exact (flat) search, with and without the exact rerank
+# from the float32 embeddings that search_top_k does for quantized indexes.
+import argparse
+import os
+import tempfile
+import time
+
+import faiss
+import numpy as np
+
+from app.core.config import settings
+from app.services.vector_store import build_faiss_index, search_top_k
+
+
+def _index_bytes(index: faiss.Index) -> int:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "index.faiss")
+        faiss.write_index(index, path)
+        return os.path.getsize(path)
+
+
+def _recall(exact, found, top_k: int) -> float:
+    return float(np.mean([len(set(a) & {i for i, _ in b}) / top_k for a, b in zip(exact, found)]))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--rerank-factor", type=int, default=settings.INDEX_RERANK_FACTOR)
+    parser.add_argument("--pq-rerank-factor", type=int, default=settings.INDEX_PQ_RERANK_FACTOR)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+
+    def normalize(v):
+        return (v / np.linalg.norm(v, axis=1, keepdims=True)).astype("float32")
+
+    # clustered like real chunk embeddings: topics plus noise
+    topics = normalize(rng.standard_normal((128, args.dim)))
+
+    def unit(n):
+        noise = rng.standard_normal((n, args.dim)) * 0.6 / np.sqrt(args.dim)
+        return normalize(topics[rng.integers(0, len(topics), n)] + noise)
+
+    embeddings = unit(args.chunks)
+    queries = unit(args.queries)
+    settings.INDEX_RERANK_FACTOR = args.rerank_factor
+    settings.INDEX_PQ_RERANK_FACTOR = args.pq_rerank_factor
+
+    exact = None
+    print(f"chunks={args.chunks} dim={args.dim} queries={args.queries} top_k={args.top_k}")
+    for kind in ("flat", "sq8", "pq"):
+        start = time.perf_counter()
+        index = build_faiss_index(embeddings, kind)
+        build_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        plain = search_top_k(queries, index, args.top_k)
+        plain_ms = (time.perf_counter() - start) * 1000 / args.queries
+        if exact is None:
+            exact = [[i for i, _ in row] for row in plain]
+
+        start = time.perf_counter()
+        reranked = search_top_k(queries, index, args.top_k, embeddings)
+        rerank_ms = (time.perf_counter() - start) * 1000 / args.queries
+
+        size = _index_bytes(index) / 1024**2
+        print(
+            f"{kind:>4}: {size:7.2f} MB  build {build_s:5.2f}s  "
+            f"search {plain_ms:.3f} ms recall@{args.top_k}={_recall(exact, plain, args.top_k):.3f}  "
+            f"+rerank {rerank_ms:.3f} ms recall@{args.top_k}={_recall(exact, reranked, args.top_k):.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
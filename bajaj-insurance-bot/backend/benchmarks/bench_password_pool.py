@@ -0,0 +1,73 @@
+# Logins/sec for bcrypt verification vs. number of pool workers.
+#
+#   cd backend && python -m benchmarks.bench_password_pool --logins 200 --workers 1 2 4 8
+#
+# Each run pushes --logins verifications through a fresh pool and reports
+# throughput, p95 latency and how many were rejected with PasswordPoolBusy.
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+from app.core.config import settings
+from app.services import password_pool
+
+
+async def _one(plain: str, hashed: str, latencies: list) -> bool:
+    start = time.perf_counter()
+    try:
+        await password_pool.verify_password_async(plain, hashed)
+    except password_pool.PasswordPoolBusy:
+        return False
+    latencies.append(time.perf_counter() - start)
+    return True
+
+
+async def _run(workers: int, logins: int, max_pending: int, hashed: str) -> dict:
+    settings.PASSWORD_POOL_WORKERS = workers
+    settings.PASSWORD_POOL_MAX_PENDING = max_pending
+    password_pool.shutdown_password_pool()
+
+    # spin the workers up outside the timed section
+    await asyncio.gather(*[password_pool.verify_password_async("x", hashed) for _ in range(workers)])
+
+    latencies: list = []
+    start = time.perf_counter()
+    results = await asyncio.gather(*[_one("correct horse", hashed, latencies) for _ in range(logins)])
+    elapsed = time.perf_counter() - start
+    password_pool.shutdown_password_pool()
+
+    accepted = sum(results)
+    latencies.sort()
+    return {
+        "workers": workers,
+        "accepted": accepted,
+        "rejected": logins - accepted,
+        "logins_per_sec": accepted / elapsed if elapsed else 0.0,
+        "p50_ms": statistics.median(latencies) * 1000 if latencies else 0.0,
+        "p95_ms": latencies[int(0.95 * (len(latencies) - 1))] * 1000 if latencies else 0.0,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, os.cpu_count() or 1])
+    parser.add_argument("--max-pending", type=int, default=None, help="defaults to --logins (no rejections)")
+    args = parser.parse_args()
+
+    hashed = password_pool.hash_password("correct horse")
+    max_pending = args.max_pending or args.logins
+    print(f"cores={os.cpu_count()} logins={args.logins} max_pending={max_pending}")
+    print(f"{'workers':>8} {'logins/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'rejected':>9}")
+    for workers in sorted(set(args.workers)):
+        r = asyncio.run(_run(workers, args.logins, max_pending, hashed))
+        print(
+            f"{r['workers']:>8} {r['logins_per_sec']:>10.1f} {r['p50_ms']:>9.1f} "
+            f"{r['p95_ms']:>9.1f} {r['rejected']:>9}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+# Local Groq-compatible chat-completions server for benchmarks and tests: configurable
+# latency, random or leading 429s/5xx (with Retry-After), SSE streaming; also serves
+# benchmark PDFs over HTTP.
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+
+class FakeGroqServer:
+    def __init__(
+        self,
+        latency: float = 0.2,
+        jitter: float = 0.05,
+        rate_429: float = 0.0,
+        retry_after: float = 0.5,
+        seed: int = 0,
+        fail_first: int = 0,
+        fail_status: int = 429,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_429 = rate_429
+        self.retry_after = retry_after
+        # the first fail_first chat requests get fail_status, before any random 429s
+        self.fail_first = fail_first
+        self.fail_status = fail_status
+        self.files: Dict[str, bytes] = {}
+        self.requests = 0
+        self.throttled = 0
+        self.request_times: List[float] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    @property
+    def chat_url(self) -> str:
+        return f"{self.base_url}/openai/v1/chat/completions"
+
+    def add_file(self, name: str, payload: bytes) -> str:
+        self.files[name] = payload
+        return f"{self.base_url}/files/{name}"
+
+    def _roll(self) -> Tuple[Optional[int], float]:
+        # status to fail with (None = answer) and the simulated latency
+        with self._lock:
+            self.requests += 1
+            self.request_times.append(time.monotonic())
+            if self.requests <= self.fail_first:
+                failure = self.fail_status
+            elif self._random.random() < self.rate_429:
+                failure = 429
+            else:
+                failure = None
+            if failure == 429:
+                self.throttled += 1
+            delay = max(0.0, self._random.gauss(self.latency, self.jitter))
+        return failure, delay
+
+    def _enter(self) -> None:
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def _leave(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+
+    def start(self) -> "FakeGroqServer":
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status: int, payload: bytes, content_type: str, headers: Optional[Dict] = None):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(payload)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                name = self.path.rsplit("/", 1)[-1]
+                payload = fake.files.get(name)
+                if payload is None:
+                    self._send(404, b"not found", "text/plain")
+                else:
+                    self._send(200, payload, "application/pdf", {"ETag": f'"{len(payload)}-{name}"'})
+
+            def do_POST(self):
+                fake._enter()
+                try:
+                    self._chat()
+                finally:
+                    fake._leave()
+
+            def _chat(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                failure, delay = fake._roll()
+                if failure == 429:
+                    error = json.dumps({"error": {"message": "Rate limit reached", "type": "tokens"}}).encode()
+                    self._send(429, error, "application/json", {"Retry-After": str(fake.retry_after)})
+                    return
+                if failure is not None:
+                    error = json.dumps({"error": {"message": "Internal server error"}}).encode()
+                    self._send(failure, error, "application/json")
+                    return
+
+                question = body["messages"][-1]["content"].rsplit("Question:", 1)[-1].strip()
+                answer = f"As per the policy wording, {question.rstrip('?')} is covered subject to its terms."
+                prompt_tokens = sum(len(m["content"]) for m in body["messages"]) // 4
+                usage = {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": len(answer) // 4,
+                    "total_tokens": prompt_tokens + len(answer) // 4,
+                }
+                if not body.get("stream"):
+                    time.sleep(delay)
+                    payload = json.dumps({"choices": [{"message": {"content": answer}}], "usage": usage}).encode()
+                    self._send(200, payload, "application/json")
+                    return
+
+                # stream: first token after half the latency, the rest spread over the other half
+                words = answer.split(" ")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                time.sleep(delay / 2)
+                for i, word in enumerate(words):
+                    delta = word if i == 0 else f" {word}"
+                    event = {"choices": [{"delta": {"content": delta}}]}
+                    if i == len(words) - 1:
+                        event["x_groq"] = {"usage": usage}
+                    self.wfile.write(f"data: {json.dumps(event)}\n\n".encode())
+                    self.wfile.flush()
+                    time.sleep(delay / 2 / len(words))
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.close_connection = True
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="fake-groq", daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> "FakeGroqServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
@@ -0,0 +1,106 @@
+# Synthetic policy PDFs for benchmarks: a minimal PDF 1.4 writer (Helvetica text
+# pages, no dependencies) and policy-like wording with clauses, tables and codes.
+import textwrap
+from typing import List
+
+import numpy as np
+
+_SECTIONS = [
+    "Definitions",
+    "Scope of Cover",
+    "Hospitalisation Expenses",
+    "Waiting Periods",
+    "Exclusions",
+    "Claims Procedure",
+    "Renewal and Cancellation",
+    "Grievance Redressal",
+]
+_SUBJECTS = [
+    "The Insured Person",
+    "The Company",
+    "Any claim under this Policy",
+    "Room rent and boarding",
+    "Pre-existing diseases",
+    "Day care treatment",
+    "Domiciliary hospitalisation",
+    "Ambulance charges",
+    "Maternity expenses",
+    "Organ donor expenses",
+]
+_VERBS = ["shall be payable", "is covered", "is not covered", "shall be reimbursed", "is subject to"]
+_TERMS = [
+    "up to {pct}% of the Sum Insured per day",
+    "after a waiting period of {months} months from the first policy inception",
+    "subject to a co-payment of {pct}% on every admissible claim",
+    "provided the treatment is taken in a Network Hospital on a cashless basis",
+    "only where hospitalisation exceeds {hours} consecutive hours",
+    "for diseases classified under ICD-10 code {code}",
+    "within {days} days of discharge along with original bills and the discharge summary",
+]
+
+
+def policy_lines(rng: np.random.Generator, pages: int, lines_per_page: int = 48, name: str = "Care Shield") -> List[List[str]]:
+    out: List[List[str]] = []
+    section = 0
+    for page in range(pages):
+        lines: List[str] = []
+        if page == 0:
+            lines += [f"{name} Health Insurance Policy", "Policy Wording", ""]
+        while len(lines) < lines_per_page:
+            if rng.random() < 0.08:
+                section = (section + 1) % len(_SECTIONS)
+                lines += ["", f"Section {section + 1}. {_SECTIONS[section]}"]
+                continue
+            clause = f"{section + 1}.{rng.integers(1, 12)}.{rng.integers(1, 9)}"
+            term = str(rng.choice(_TERMS)).format(
+                pct=rng.integers(1, 30),
+                months=rng.choice([12, 24, 36, 48]),
+                hours=rng.choice([24, 48]),
+                days=rng.choice([15, 30]),
+                code=f"{chr(65 + rng.integers(0, 26))}{rng.integers(0, 99):02d}.{rng.integers(0, 9)}",
+            )
+            sentence = f"{clause} {rng.choice(_SUBJECTS)} {rng.choice(_VERBS)} {term}."
+            lines += textwrap.wrap(sentence, 95)
+        out.append(lines[:lines_per_page])
+    return out
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_pdf(pages: List[List[str]]) -> bytes:
+    # objects: 1 catalog, 2 page tree, 3 font, then (page, content) pairs
+    objects: List[bytes] = []
+    page_ids = [4 + 2 * i for i in range(len(pages))]
+    objects.append(b"<< /Type /Catalog /Pages 2 0 R >>")
+    kids = " ".join(f"{i} 0 R" for i in page_ids)
+    objects.append(f"<< /Type /Pages /Kids [{kids}] /Count {len(pages)} >>".encode())
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+    for page_id, lines in zip(page_ids, pages):
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {page_id + 1} 0 R >>".encode()
+        )
+        body = ["BT", "/F1 10 Tf", "12 TL", "50 750 Td"]
+        for line in lines:
+            body.append(f"({_escape(line)}) '")
+        body.append("ET")
+        stream = "\n".join(body).encode("latin-1", "replace")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, obj)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def policy_pdf(pages: int, seed: int = 0, name: str = "Care Shield") -> bytes:
+    return write_pdf(policy_lines(np.random.default_rng(seed), pages, name=name))
@@ -0,0 +1,97 @@
+# pack_context over chunks made by the real chunking pipeline (TokenChunker overlap,
+# "[Policy: ...]" headers), counting whitespace-separated words as tokens.
+import re
+
+import pytest
+
+from app.services import context_packer, pdf_processor
+from app.services.chunker import TokenChunker
+
+_WORD = re.compile(r"\S+")
+
+
+class _WordTokenizer:
+    def __call__(self, texts, add_special_tokens=False, verbose=False):
+        return {"input_ids": [_WORD.findall(text) for text in texts]}
+
+
+def _count(text: str) -> int:
+    return len(_WORD.findall(text))
+
+
+@pytest.fixture(autouse=True)
+def word_tokens(monkeypatch):
+    monkeypatch.setattr(context_packer, "_count_fn", _count)
+
+
+def _sentences(policy: str, count: int):
+    return [f"{policy} clause {i} covers item {i}." for i in range(count)]
+
+
+def _chunks(monkeypatch, policy: str, source: str, sentences_per_page: int = 12, pages: int = 3):
+    # pages of numbered sentences -> chunk dicts exactly as ingestion stores them
+    sentences = _sentences(policy, sentences_per_page * pages)
+    page_texts = [
+        (page + 1, f"{policy} Policy wording. " + " ".join(sentences[page * sentences_per_page:(page + 1) * sentences_per_page]))
+        for page in range(pages)
+    ]
+    monkeypatch.setattr(pdf_processor, "iter_page_texts", lambda pdf_path, workers, on_page: iter(page_texts))
+    chunker = TokenChunker(_WordTokenizer(), max_tokens=40, overlap_tokens=14)
+    return list(pdf_processor.iter_text_chunks_with_metadata(f"http://x/{source}", "unused.pdf", chunker))
+
+
+def test_adjacent_chunks_merge_without_repeated_text(monkeypatch):
+    chunks = _chunks(monkeypatch, "Care", "care.pdf")
+    picked = [chunks[3], chunks[1], chunks[2]]  # retrieval order, not document order
+    # the chunker's overlap really repeats text between neighbours
+    assert context_packer._strip_header(chunks[2]["content"]).split(".")[0] in chunks[1]["content"]
+
+    packed = context_packer.pack_context([{**c, "score": 0.5} for c in picked], token_budget=10_000)
+
+    assert packed.segments == 1
+    assert packed.tokens < packed.raw_tokens
+    body = packed.text.split("\n", 1)[1]
+    clauses = [int(n) for n in re.findall(r"clause (\d+) ", body)]
+    # every clause of chunks 1..3 once, in document order
+    assert clauses == sorted(set(clauses))
+    assert clauses == list(range(clauses[0], clauses[-1] + 1))
+    for chunk in picked:
+        assert context_packer._strip_header(chunk["content"]) in body
+
+
+def test_non_adjacent_chunks_stay_separate(monkeypatch):
+    chunks = _chunks(monkeypatch, "Care", "care.pdf")
+    packed = context_packer.pack_context([chunks[0], chunks[3]], token_budget=10_000)
+
+    assert packed.segments == 2
+    assert packed.text.count("[Policy: Care Policy]") == 1
+    assert packed.text.startswith("[Policy: Care Policy]\n")
+
+
+@pytest.mark.parametrize("budget", [3, 8, 20, 45, 60, 90, 150])
+def test_output_never_exceeds_token_budget(monkeypatch, budget):
+    care = _chunks(monkeypatch, "Care", "care.pdf")
+    drive = _chunks(monkeypatch, "Drive", "drive.pdf")
+    for results in (care[:4], [care[0], care[4], care[2]], [care[1], drive[2], care[3], drive[0]]):
+        scored = [{**c, "score": 1.0 - i / 10} for i, c in enumerate(results)]
+        packed = context_packer.pack_context(scored, token_budget=budget)
+        assert _count(packed.text) <= budget
+        assert packed.tokens <= budget
+
+
+def test_mixed_policies_keep_one_label_per_segment(monkeypatch):
+    care = _chunks(monkeypatch, "Care", "care.pdf")
+    drive = _chunks(monkeypatch, "Drive", "drive.pdf")
+    results = [care[1], drive[4], care[2], drive[0], care[5]]
+    packed = context_packer.pack_context([{**c, "score": 0.5} for c in results], token_budget=10_000)
+
+    segments = packed.text.split("\n\n")
+    assert packed.segments == len(segments) == 4  # care 1+2 merge
+    labels = [re.findall(r"\[Policy: ([^\]]*)\]", segment) for segment in segments]
+    assert all(len(found) == 1 for found in labels)
+    assert all(segment.startswith("[Policy: ") for segment in segments)
+    assert sorted(found[0] for found in labels) == ["Care Policy"] * 2 + ["Drive Policy"] * 2
+    # the Care text never sits under the Drive label or vice versa
+    for segment in segments:
+        policy = segment[len("[Policy: "):].split(" ", 1)[0]
+        assert re.findall(r"(\w+) clause", segment) == [policy] * len(re.findall(r"clause", segment))
@@ -0,0 +1,149 @@
+# LLMDispatcher against the local Groq-compatible stub (benchmarks/fake_groq.py).
+# Run from backend/: python -m pytest -q tests
+import asyncio
+import time
+
+import pytest
+
+from app.services import qa_engine
+from app.services.llm_dispatcher import LLMDispatcher, LLMError
+from benchmarks.fake_groq import FakeGroqServer
+
+
+def _dispatcher(url: str, **overrides) -> LLMDispatcher:
+    options = dict(
+        api_key="test",
+        requests_per_minute=6000,
+        tokens_per_minute=10_000_000,
+        max_concurrency=4,
+        max_retries=3,
+        backoff_base=0.01,
+        # Retry-After hints up to 4 * backoff_max are waited out
+        backoff_max=0.25,
+        timeout=5,
+    )
+    options.update(overrides)
+    return LLMDispatcher(url, **options)
+
+
+def _body(question: str, max_tokens: int = 50) -> dict:
+    return qa_engine._build_body(question, "Context line.", "test-model") | {"max_tokens": max_tokens}
+
+
+async def _run(dispatcher: LLMDispatcher, coro):
+    try:
+        return await coro
+    finally:
+        await dispatcher.aclose()
+
+
+def _gaps(server: FakeGroqServer):
+    times = server.request_times
+    return [b - a for a, b in zip(times, times[1:])]
+
+
+def test_answers_keep_question_order_under_concurrency(monkeypatch):
+    # jittered latencies finish out of order; the answers must not
+    questions = [f"is benefit {i} covered?" for i in range(12)]
+    with FakeGroqServer(latency=0.05, jitter=0.04, seed=3) as server:
+        dispatcher = _dispatcher(server.chat_url)
+        monkeypatch.setattr(qa_engine, "get_dispatcher", lambda: dispatcher)
+        answers = asyncio.run(
+            _run(dispatcher, qa_engine.query_groq_many(questions, ["Context line."] * len(questions)))
+        )
+
+    assert [f"benefit {i} " in a for i, a in enumerate(answers)] == [True] * len(questions)
+    assert server.requests == len(questions)
+    assert 1 < server.max_in_flight <= 4
+
+
+def test_retry_after_is_honoured():
+    # backoff alone would retry after ~10ms; the 429 asks for 0.4s
+    with FakeGroqServer(latency=0.0, jitter=0.0, fail_first=1, retry_after=0.4) as server:
+        dispatcher = _dispatcher(server.chat_url)
+        answer = asyncio.run(_run(dispatcher, dispatcher.complete(_body("is dental covered?"))))
+
+    assert "dental covered" in answer
+    assert server.requests == 2
+    assert _gaps(server)[0] >= 0.4
+
+
+def test_retry_after_pauses_concurrent_requests():
+    # a request started after someone else's 429 waits out the same Retry-After
+    with FakeGroqServer(latency=0.0, jitter=0.0, fail_first=1, retry_after=0.3) as server:
+        dispatcher = _dispatcher(server.chat_url)
+
+        async def both():
+            first = asyncio.ensure_future(dispatcher.complete(_body("first?")))
+            await asyncio.sleep(0.1)
+            return await asyncio.gather(first, dispatcher.complete(_body("second?")))
+
+        asyncio.run(_run(dispatcher, both()))
+
+    assert server.requests == 3
+    assert all(t - server.request_times[0] >= 0.3 for t in server.request_times[1:])
+
+
+def test_retry_after_beyond_limit_gives_up():
+    # a hint far past the backoff cap fails fast instead of holding the request open
+    with FakeGroqServer(latency=0.0, jitter=0.0, fail_first=1, retry_after=30) as server:
+        dispatcher = _dispatcher(server.chat_url)
+        start = time.monotonic()
+        with pytest.raises(LLMError, match="429"):
+            asyncio.run(_run(dispatcher, dispatcher.complete(_body("is dental covered?"))))
+
+    assert server.requests == 1
+    assert time.monotonic() - start < 1
+
+
+def test_server_errors_back_off_boundedly():
+    with FakeGroqServer(latency=0.0, jitter=0.0, fail_first=100, fail_status=500) as server:
+        dispatcher = _dispatcher(server.chat_url, max_retries=4, backoff_base=0.05, backoff_max=0.1)
+        start = time.monotonic()
+        with pytest.raises(LLMError, match="500"):
+            asyncio.run(_run(dispatcher, dispatcher.complete(_body("is dental covered?"))))
+        elapsed = time.monotonic() - start
+
+    # max_retries + 1 attempts, each wait capped at backoff_max
+    assert server.requests == 5
+    assert all(gap <= 0.1 + 0.05 for gap in _gaps(server))
+    assert elapsed < 5 * 0.1 + 0.5
+
+
+def test_requests_per_minute_bucket_throttles():
+    # 600 rpm = one request per 100ms once the initial burst is spent
+    with FakeGroqServer(latency=0.0, jitter=0.0) as server:
+        dispatcher = _dispatcher(server.chat_url, requests_per_minute=600)
+        dispatcher.requests_bucket.tokens = 0
+        start = time.monotonic()
+
+        async def burst():
+            return await asyncio.gather(*(dispatcher.complete(_body(f"q{i}?")) for i in range(5)))
+
+        asyncio.run(_run(dispatcher, burst()))
+
+    assert server.requests == 5
+    # request i leaves the bucket at (i + 1) * 100ms, however fast the stub answers
+    assert all(t - start >= (i + 1) * 0.1 - 0.02 for i, t in enumerate(server.request_times))
+
+
+def test_tokens_per_minute_bucket_throttles():
+    # each request reserves ~prompt/4 + max_tokens; 60k tpm refills 1000 tokens/s
+    body = _body("is dental covered?", max_tokens=200)
+    prompt = sum(len(m["content"]) for m in body["messages"]) // 4
+    reserve = prompt + 200
+    with FakeGroqServer(latency=0.0, jitter=0.0) as server:
+        dispatcher = _dispatcher(server.chat_url, tokens_per_minute=60_000)
+        dispatcher.tokens_bucket.tokens = 0
+        start = time.monotonic()
+
+        async def burst():
+            return await asyncio.gather(*(dispatcher.complete(dict(body)) for _ in range(3)))
+
+        asyncio.run(_run(dispatcher, burst()))
+
+    assert server.requests == 3
+    # the first reservation has to refill completely; later ones get back the unused
+    # completion of earlier requests, so at least reserve + 2 * prompt must refill
+    assert server.request_times[0] - start >= reserve / 1000 - 0.02
+    assert server.request_times[-1] - start >= (reserve + 2 * prompt) / 1000 - 0.02
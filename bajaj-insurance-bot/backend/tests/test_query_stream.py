@@ -0,0 +1,95 @@
+# /user/query/stream event flow with a failing LLM call: every question still gets a
+# final "answer" or "error" event, and the stream always ends with "done".
+import asyncio
+import json
+
+import numpy as np
+import pytest
+
+from app.api import user_routes
+from app.api.user_routes import UserQuery, query_policy_stream
+from app.services import context_packer
+from app.services.llm_dispatcher import LLMError
+
+QUESTIONS = ["is dental covered?", "what is the waiting period?", "is maternity covered?"]
+
+
+@pytest.fixture(autouse=True)
+def stub_retrieval(monkeypatch):
+    # no Mongo / embedder: one retrieved chunk per question, nothing from the answer cache
+    policy = {"_id": "p1", "insurance_type": "Health", "policy_name": "Care", "policy_year": "2024"}
+    chunk = {"chunk_id": 0, "page": 1, "source": "care.pdf", "content": "[Policy: Care]\nClause text.", "score": 0.5}
+
+    def prepare(db, policy, questions):
+        return np.zeros((len(questions), 4), dtype="float32"), [None] * len(questions), {
+            i: [dict(chunk)] for i in range(len(questions))
+        }
+
+    monkeypatch.setattr(user_routes, "_find_policy", lambda db, payload: policy)
+    monkeypatch.setattr(user_routes, "_prepare", prepare)
+    monkeypatch.setattr(user_routes, "_remember", lambda *args: None)
+    monkeypatch.setattr(context_packer, "_count_fn", lambda text: len(text.split()))
+
+
+def _events(deltas: bool = False):
+    async def collect():
+        response = await query_policy_stream(UserQuery(
+            insurance_type="Health", policy_name="Care", policy_year="2024", questions=QUESTIONS,
+        ), deltas=deltas, db=None)
+        events = []
+
+        async def read():
+            async for message in response.body_iterator:
+                event, data = message.strip().split("\n", 1)
+                events.append((event[len("event: "):], json.loads(data[len("data: "):])))
+
+        await asyncio.wait_for(read(), timeout=3)
+        return events
+
+    return asyncio.run(collect())
+
+
+def _final_events(events):
+    return {data["index"]: event for event, data in events if event in ("answer", "error")}
+
+
+def test_unexpected_llm_error_still_ends_the_stream(monkeypatch):
+    async def query_groq(question, context):
+        if question == QUESTIONS[1]:
+            raise ValueError("malformed completion")
+        return f"Answer to {question}"
+
+    monkeypatch.setattr(user_routes, "query_groq", query_groq)
+    events = _events()
+
+    assert _final_events(events) == {0: "answer", 1: "error", 2: "answer"}
+    error = next(data for event, data in events if event == "error")
+    assert "malformed completion" in error["detail"]
+    assert events[-1] == ("done", {"answered": 2})
+
+
+def test_groq_error_is_reported_per_question(monkeypatch):
+    async def query_groq(question, context):
+        raise LLMError("429\nrate limited")
+
+    monkeypatch.setattr(user_routes, "query_groq", query_groq)
+    events = _events()
+
+    assert _final_events(events) == {0: "error", 1: "error", 2: "error"}
+    assert all(data["detail"].startswith("Groq error:") for event, data in events if event == "error")
+    assert events[-1] == ("done", {"answered": 0})
+
+
+def test_stream_failing_mid_answer_still_ends_the_stream(monkeypatch):
+    async def stream_groq(question, context):
+        yield "Partial "
+        if question == QUESTIONS[0]:
+            raise json.JSONDecodeError("Expecting value", "data: {", 6)
+        yield "answer."
+
+    monkeypatch.setattr(user_routes, "stream_groq", stream_groq)
+    events = _events(deltas=True)
+
+    assert _final_events(events) == {0: "error", 1: "answer", 2: "answer"}
+    assert sum(event == "delta" for event, _ in events) == 5
+    assert events[-1] == ("done", {"answered": 2})
@@ -4,3 +4,17 @@ import axios from "axios";
 export const api = axios.create({
   baseURL: import.meta.env.VITE_API_BASE_URL, // change to deployed URL later
 });
+
+// /admin/policies is paginated; follow X-Next-Cursor until the last page
+export async function fetchAllPolicies(params = {}) {
+  const all = [];
+  let cursor;
+  do {
+    const res = await api.get("/admin/policies", {
+      params: { ...params, ...(cursor ? { cursor } : {}) },
+    });
+    if (Array.isArray(res.data)) all.push(...res.data);
+    cursor = res.headers["x-next-cursor"];
+  } while (cursor);
+  return all;
+}
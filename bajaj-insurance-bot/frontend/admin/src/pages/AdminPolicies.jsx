@@ -1,6 +1,6 @@
 // frontend/admin/src/pages/AdminPolicies.jsx
 import React, { useEffect, useState } from "react";
-import { api } from "../api/client";
+import { api, fetchAllPolicies } from "../api/client";
 
 export default function AdminPolicies() {
   const [form, setForm] = useState({
@@ -15,12 +15,7 @@ export default function AdminPolicies() {
 
   const loadPolicies = async () => {
     try {
-      const res = await api.get("/admin/policies");
-      const data = res.data;
-      // if backend returns array directly
-      setPolicies(Array.isArray(data) ? data : []);
-      // if later you change backend to `{ policies: [...] }`, then use:
-      // setPolicies(Array.isArray(data.policies) ? data.policies : []);
+      setPolicies(await fetchAllPolicies());
     } catch (e) {
       console.error("Failed to load policies", e);
       setPolicies([]);
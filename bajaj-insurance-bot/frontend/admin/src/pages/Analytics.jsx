@@ -4,11 +4,25 @@ import { api } from "../api/client";
 export default function Analytics() {
   const [topQuestions, setTopQuestions] = useState([]);
   const [recent, setRecent] = useState([]);
+  const [trend, setTrend] = useState([]);
+  const [days, setDays] = useState(""); // "" = all time
 
   useEffect(() => {
     const load = async () => {
-      const tq = await api.get("/admin/analytics/top-questions");
+      const tq = await api.get("/admin/analytics/top-questions", {
+        params: days ? { days } : {},
+      });
       setTopQuestions(tq.data || []);
+      const tr = await api.get("/admin/analytics/trend", {
+        params: { granularity: "day", days: days || 30 },
+      });
+      setTrend(tr.data || []);
+    };
+    load();
+  }, [days]);
+
+  useEffect(() => {
+    const load = async () => {
       const rq = await api.get("/admin/analytics/recent");
       setRecent(rq.data || []);
     };
@@ -19,6 +33,16 @@ export default function Analytics() {
     <div style={{ padding: "1rem" }}>
       <h2>Analytics</h2>
 
+      <label>
+        Window{" "}
+        <select value={days} onChange={(e) => setDays(e.target.value)}>
+          <option value="">All time</option>
+          <option value="1">Last 24 hours</option>
+          <option value="7">Last 7 days</option>
+          <option value="30">Last 30 days</option>
+        </select>
+      </label>
+
       <h3>Top Questions</h3>
       <table border="1" cellPadding="4">
         <thead>
@@ -37,6 +61,24 @@ export default function Analytics() {
         </tbody>
       </table>
 
+      <h3>Queries per Day</h3>
+      <table border="1" cellPadding="4">
+        <thead>
+          <tr>
+            <th>Day</th>
+            <th>Queries</th>
+          </tr>
+        </thead>
+        <tbody>
+          {trend.map((t, i) => (
+            <tr key={i}>
+              <td>{new Date(t.bucket_start).toLocaleDateString()}</td>
+              <td>{t.count}</td>
+            </tr>
+          ))}
+        </tbody>
+      </table>
+
       <h3>Recent Queries</h3>
       <table border="1" cellPadding="4">
         <thead>
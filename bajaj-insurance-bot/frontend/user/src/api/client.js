@@ -12,3 +12,53 @@ api.interceptors.request.use((config) => {
   }
   return config;
 });
+
+// /admin/policies is paginated; follow X-Next-Cursor until the last page
+export async function fetchAllPolicies(params = {}) {
+  const all = [];
+  let cursor;
+  do {
+    const res = await api.get("/admin/policies", {
+      params: { ...params, ...(cursor ? { cursor } : {}) },
+    });
+    if (Array.isArray(res.data)) all.push(...res.data);
+    cursor = res.headers["x-next-cursor"];
+  } while (cursor);
+  return all;
+}
+
+// POST /user/query/stream and call onEvent(event, data) for each SSE event
+export async function streamQuery(body, { deltas = false, onEvent, signal } = {}) {
+  const token = localStorage.getItem("access_token");
+  const res = await fetch(`${api.defaults.baseURL}/user/query/stream?deltas=${deltas}`, {
+    method: "POST",
+    headers: {
+      "Content-Type": "application/json",
+      ...(token ? { Authorization: `Bearer ${token}` } : {}),
+    },
+    body: JSON.stringify(body),
+    signal,
+  });
+  if (!res.ok) throw new Error(`Query failed: ${res.status}`);
+
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    let sep;
+    while ((sep = buffer.indexOf("\n\n")) !== -1) {
+      const raw = buffer.slice(0, sep);
+      buffer = buffer.slice(sep + 2);
+      let event = "message";
+      let data = "";
+      for (const line of raw.split("\n")) {
+        if (line.startsWith("event:")) event = line.slice(6).trim();
+        else if (line.startsWith("data:")) data += line.slice(5).trim();
+      }
+      if (data) onEvent?.(event, JSON.parse(data));
+    }
+  }
+}
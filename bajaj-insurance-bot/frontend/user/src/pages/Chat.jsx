@@ -1,5 +1,5 @@
-import React, { useEffect, useState } from "react";
-import { api } from "../api/client";
+import React, { useEffect, useRef, useState } from "react";
+import { fetchAllPolicies, streamQuery } from "../api/client";
 import { nodeApi } from "../api/nodeClient"; // NEW
 
 export default function Chat() {
@@ -16,15 +16,15 @@ export default function Chat() {
   // NEW: feedback state
   const [feedback, setFeedback] = useState("");
   const [lastQA, setLastQA] = useState(null); // { question, answer }
+  const abortRef = useRef(null);
+
+  // stop an in-flight stream when leaving the page
+  useEffect(() => () => abortRef.current?.abort(), []);
 
   useEffect(() => {
     const load = async () => {
       try {
-        const res = await api.get("/admin/policies", {
-          params: { published: true },
-        });
-        const data = res.data;
-        setPolicies(Array.isArray(data) ? data : []);
+        setPolicies(await fetchAllPolicies({ published: true }));
       } catch (e) {
         console.error("Failed to load policies", e);
         setPolicies([]);
@@ -50,19 +50,36 @@ export default function Chat() {
       questions: [question],
     };
 
+    // show the question right away; the bot message fills in as the answer streams
+    const asked = question;
+    const botIndex = messages.length + 1;
+    setMessages((prev) => [...prev, { role: "user", text: asked }, { role: "bot", text: "" }]);
+    const setBotText = (update) =>
+      setMessages((prev) =>
+        prev.map((m, idx) => (idx === botIndex ? { ...m, text: update(m.text) } : m))
+      );
+
+    const controller = new AbortController();
+    abortRef.current = controller;
     try {
-      const res = await api.post("/user/query", body);
-      const answer = res.data.answers[0];
-
-      setMessages((prev) => [
-        ...prev,
-        { role: "user", text: question },
-        { role: "bot", text: answer },
-      ]);
-      setLastQA({ question, answer });       // NEW: remember last Q&A
+      await streamQuery(body, {
+        deltas: true,
+        signal: controller.signal,
+        onEvent: (event, data) => {
+          if (event === "delta") {
+            setBotText((text) => text + data.delta);
+          } else if (event === "answer") {
+            setBotText(() => data.answer);
+            setLastQA({ question: asked, answer: data.answer }); // NEW: remember last Q&A
+          } else if (event === "error") {
+            setBotText(() => "Sorry, something went wrong answering this question.");
+          }
+        },
+      });
       setFeedback("");                      // clear old feedback
       setQuestion("");
     } catch (e) {
+      if (e.name === "AbortError") return;
       console.error("Query failed", e);
       alert("Query failed – check console for details.");
     } finally {